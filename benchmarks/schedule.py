@@ -0,0 +1,78 @@
+import sys
+import time
+import argparse
+from typing import Optional
+
+from flamapy.metamodels.fm_metamodel.transformations import FMSecureFeaturesNames
+
+import dd_backend
+from utils import pl_writer, var_order, logic_reader, conjunction_schedule
+from utils.synthetic_fm import generate_feature_model
+
+
+SIZES = [100, 200, 400]  # Number of features of the synthetic models
+CONSTRAINTS_RATIO = 0.05  # Constraints per feature
+SEEDS = 3
+TIMEOUT = 60  # in seconds, for each construction
+
+
+def benchmark(variables: list[str],
+              expressions: list[str],
+              order: list[str],
+              timeout: int = TIMEOUT) -> dict[str, tuple[Optional[float], int, Optional[int]]]:
+    """Build the BDD with each conjunction schedule using the dd backend.
+
+    Return, for each schedule, the construction time (None if timeout), the peak of live nodes
+    during the construction, and the nodes of the final BDD.
+    """
+    order = var_order.complete_order(order, variables)
+    results = {}
+    for schedule in conjunction_schedule.SCHEDULES:
+        builder = dd_backend.DDBuilder(order)
+        start = time.perf_counter()
+        root = builder.conjoin(expressions, schedule, time.monotonic() + timeout)
+        elapsed_time = time.perf_counter() - start
+        if root is None:
+            results[schedule] = (None, builder.peak_nodes, None)
+        else:
+            results[schedule] = (elapsed_time, builder.peak_nodes, root.dag_size)
+    return results
+
+
+def synthetic_models(sizes: list[int], seeds: int) -> list[tuple[str, list[str], list[str], list[str]]]:
+    """Return the name, variables, expressions and (FORCE) order of synthetic models."""
+    models = []
+    for n_features in sizes:
+        for seed in range(seeds):
+            fm = FMSecureFeaturesNames(generate_feature_model(n_features, int(n_features * CONSTRAINTS_RATIO), seed)).transform()
+            variables = var_order.dfs_order(fm)
+            expressions = pl_writer.to_exp(fm)
+            expressions_vars = [logic_reader.get_expression_variables(exp) for exp in expressions]
+            order = var_order.force_order(variables, expressions_vars, variables)
+            models.append((f'synthetic-{n_features}-{seed}', variables, expressions, order))
+    return models
+
+
+if __name__ == '__main__':
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 100000))  # Feature tree traversals of flamapy are recursive
+
+    parser = argparse.ArgumentParser(description='Benchmark of the conjunction schedules (peak of intermediate nodes and time) with the dd backend.')
+    parser.add_argument('-var', metavar='varfile', dest='varfile', type=str, required=False, help='Variable file (.var) of a model (instead of the synthetic models).')
+    parser.add_argument('-exp', metavar='expfile', dest='expfile', type=str, required=False, help='Expression file (.exp) of the model.')
+    parser.add_argument('-order', metavar='orderfile', dest='orderfile', type=str, required=False, help='Order of the variables of the model (default: order of the .var file).')
+    parser.add_argument('-sizes', metavar='n', dest='sizes', type=int, nargs='+', default=SIZES, help='Number of features of the synthetic models.')
+    parser.add_argument('-timeout', metavar='seconds', dest='timeout', type=int, default=TIMEOUT, help='Timeout of each construction.')
+    args = parser.parse_args()
+
+    if args.varfile and args.expfile:
+        variables = logic_reader.read_variables(args.varfile)
+        order = logic_reader.read_variables(args.orderfile) if args.orderfile else variables
+        models = [(args.varfile, variables, logic_reader.read_expressions(args.expfile), order)]
+    else:
+        models = synthetic_models(args.sizes, SEEDS)
+
+    print(f'{"Model":<24} {"Schedule":<10} {"Time (s)":>10} {"Peak nodes":>12} {"BDD nodes":>10}')
+    for name, variables, expressions, order in models:
+        for schedule, (elapsed_time, peak_nodes, nodes) in benchmark(variables, expressions, order, args.timeout).items():
+            time_str = 'Timeout' if elapsed_time is None else f'{elapsed_time:.3f}'
+            print(f'{name:<24} {schedule:<10} {time_str:>10} {peak_nodes:>12} {nodes if nodes is not None else "-":>10}')
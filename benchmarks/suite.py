@@ -0,0 +1,268 @@
+import sys
+import json
+import random
+import pathlib
+import argparse
+import importlib
+import statistics
+import contextlib
+from typing import Any, Iterator, Optional
+
+import uvl2bdd
+import difficulty
+from utils import tracing, utils
+from utils.synthetic_fm import write_uvl_models
+
+
+SAMPLE_SIZE = 50
+BINS = 3  # Quantile bins per stratification dimension (features, constraints, historical time)
+REPETITIONS = 5
+WARMUP = 1
+THRESHOLD = 0.1  # Relative increase of the median time of a stage considered a regression
+MIN_DELTA = 0.05  # in seconds, absolute increase below which a regression is considered noise
+SYNTHETIC_SIZES = [50, 100, 200, 400]
+SYNTHETIC_CONSTRAINTS_RATIO = 0.1
+SYNTHETIC_SEEDS = 3
+DEFAULT_CONFIGURATIONS = [{'name': 'default'}]
+
+# Columns of the results.csv file used for the stratification
+FEATURES_COLUMN = uvl2bdd.CSVHeader.FEATURES.value
+CONSTRAINTS_COLUMN = uvl2bdd.CSVHeader.CONSTRAINTS.value
+TIME_COLUMNS = [uvl2bdd.CSVHeader.UVL2LOGIC_TIME.value, uvl2bdd.CSVHeader.FASTORDER_TIME.value,
+                uvl2bdd.CSVHeader.LOGIC2BDD_TIME.value]
+
+
+def quantile_bins(values: list[float], bins: int) -> list[int]:
+    """Return the quantile bin (0..bins-1) of each value."""
+    ranked = sorted(range(len(values)), key=lambda i: values[i])
+    result = [0] * len(values)
+    for rank, i in enumerate(ranked):
+        result[i] = min(bins - 1, rank * bins // len(values))
+    return result
+
+
+def stratified_sample(results_filepath: str, n: int, bins: int = BINS, seed: int = 0) -> list[str]:
+    """Return a sample of the models of a results file stratified by features, constraints and
+    historical time (fastOrder, Logic2BDD and UVL2Logic times; timeouts and the stages not run
+    after them count as the budget, see difficulty.parse_times).
+
+    The models are allocated to the strata proportionally (largest remainder), with at least one
+    model per stratum when the sample size allows it. Models without times (e.g., non-Boolean
+    FMs) are not sampled.
+    """
+    models, features, constraints, times = [], [], [], []
+    for row in difficulty.read_results(results_filepath):
+        row_times = difficulty.parse_times(row, TIME_COLUMNS)
+        if row_times is None:
+            continue
+        try:
+            features.append(float(row[FEATURES_COLUMN]))
+            constraints.append(float(row[CONSTRAINTS_COLUMN]))
+        except (ValueError, TypeError):
+            continue
+        models.append(row[difficulty.MODEL_COLUMN])
+        times.append(sum(row_times))
+    strata: dict[tuple[int, int, int], list[str]] = {}
+    for model, key in zip(models, zip(quantile_bins(features, bins), quantile_bins(constraints, bins), quantile_bins(times, bins))):
+        strata.setdefault(key, []).append(model)
+    n = min(n, len(models))
+    keys = sorted(strata)
+    quotas = {key: n * len(strata[key]) / len(models) for key in keys}
+    allocation = {key: min(len(strata[key]), max(1 if n >= len(keys) else 0, int(quotas[key]))) for key in keys}
+    while sum(allocation.values()) > n:  # The minimum of one model per stratum may exceed the size
+        allocation[max(keys, key=lambda k: allocation[k])] -= 1
+    for key in sorted(keys, key=lambda k: quotas[k] - int(quotas[k]), reverse=True):
+        if sum(allocation.values()) >= n:
+            break
+        if allocation[key] < len(strata[key]):
+            allocation[key] += 1
+    rng = random.Random(seed)
+    return [model for key in keys for model in sorted(rng.sample(strata[key], allocation[key]))]
+
+
+@contextlib.contextmanager
+def constants(overrides: dict[str, Any]) -> Iterator[None]:
+    """Override module constants (e.g., {'logic2bdd.MIN_NODES': 100000}) temporarily."""
+    previous = {}
+    try:
+        for name, value in overrides.items():
+            module_name, attribute = name.rsplit('.', 1)
+            module = importlib.import_module(module_name)
+            previous[(module, attribute)] = getattr(module, attribute)
+            setattr(module, attribute, value)
+        yield
+    finally:
+        for (module, attribute), value in previous.items():
+            setattr(module, attribute, value)
+
+
+def run_model(model: str, configuration: dict[str, Any], tracer: tracing.Tracer) -> tuple[dict[str, float], str]:
+    """Run uvl2bdd on a model with a configuration.
+
+    Return the time of each stage and the info of the result. An exception of the model
+    (e.g., a model that is not found) is returned as an error in the info.
+    """
+    try:
+        with constants(configuration.get('constants', {})):
+            with tracer.span(tracing.MODEL, model=model):
+                csv_entry = uvl2bdd.main(model, **configuration.get('args', {}))
+    except Exception as e:
+        csv_entry = {uvl2bdd.CSVHeader.INFO.value: f'{uvl2bdd.ERROR_STR}: {e}'}
+    spans, tracer.spans = tracer.spans, []
+    stages: dict[str, float] = {}
+    for span in spans:
+        stages[span.name] = stages.get(span.name, 0.0) + span.duration
+    return (stages, str(csv_entry.get(uvl2bdd.CSVHeader.INFO.value, '')))
+
+
+def run(models: list[str],
+        configurations: list[dict[str, Any]],
+        repetitions: int = REPETITIONS,
+        warmup: int = WARMUP) -> dict[str, Any]:
+    """Run each configuration on the models with warmup runs and repetitions.
+
+    For each configuration and stage, the total time over the models is computed in each
+    repetition, and the median, the interquartile range and the minimum of those totals are
+    reported, together with the number of models that were not built ('OK').
+    """
+    tracer = tracing.configure()  # Spans kept in memory
+    results: dict[str, Any] = {'models': models, 'repetitions': repetitions, 'warmup': warmup, 'configurations': {}}
+    for configuration in configurations:
+        name = configuration['name']
+        totals: dict[str, list[float]] = {}
+        failures = set()
+        for repetition in range(warmup + repetitions):
+            rep_totals: dict[str, float] = {}
+            for model in models:
+                stages, info = run_model(model, configuration, tracer)
+                if not info.startswith('OK'):
+                    failures.add(model)
+                for stage, duration in stages.items():
+                    rep_totals[stage] = rep_totals.get(stage, 0.0) + duration
+            if repetition >= warmup:
+                for stage, total in rep_totals.items():
+                    totals.setdefault(stage, []).append(total)
+        results['configurations'][name] = {
+            'configuration': configuration,
+            'failures': sorted(failures),
+            'stages': {stage: {'median': statistics.median(values),
+                               'iqr': iqr(values),
+                               'min': min(values)}
+                       for stage, values in totals.items()}}
+    return results
+
+
+def iqr(values: list[float]) -> float:
+    if len(values) < 2:
+        return 0.0
+    quartiles = statistics.quantiles(values, n=4)
+    return quartiles[2] - quartiles[0]
+
+
+def compare(results: dict[str, Any],
+            baseline: dict[str, Any],
+            threshold: float = THRESHOLD,
+            min_delta: float = MIN_DELTA) -> list[str]:
+    """Return the regressions of the results with respect to the baseline: stages whose median
+    time increases more than the threshold (and more than min_delta seconds), and models that
+    are not built anymore."""
+    regressions = []
+    for name, config_results in results['configurations'].items():
+        config_baseline = baseline['configurations'].get(name)
+        if config_baseline is None:
+            continue
+        for stage, stats in config_results['stages'].items():
+            base_stats = config_baseline['stages'].get(stage)
+            if base_stats is None:
+                continue
+            delta = stats['median'] - base_stats['median']
+            if delta > min_delta and stats['median'] > base_stats['median'] * (1 + threshold):
+                regressions.append(f'{name}/{stage}: {base_stats["median"]:.3f}s -> {stats["median"]:.3f}s '
+                                   f'(+{delta / max(base_stats["median"], 1e-9) * 100:.1f}%)')
+        new_failures = set(config_results['failures']) - set(config_baseline['failures'])
+        for model in sorted(new_failures):
+            regressions.append(f'{name}: {model} not built anymore')
+    return regressions
+
+
+def print_results(results: dict[str, Any], baseline: Optional[dict[str, Any]] = None) -> None:
+    print(f'{"Configuration":<20} {"Stage":<20} {"Median (s)":>11} {"IQR (s)":>9} {"Min (s)":>9} {"Baseline (s)":>13}')
+    for name, config_results in results['configurations'].items():
+        config_baseline = (baseline or {}).get('configurations', {}).get(name, {'stages': {}})
+        for stage, stats in sorted(config_results['stages'].items(), key=lambda item: -item[1]['median']):
+            base_stats = config_baseline['stages'].get(stage)
+            base_str = f'{base_stats["median"]:.3f}' if base_stats else '-'
+            print(f'{name:<20} {stage:<20} {stats["median"]:>11.3f} {stats["iqr"]:>9.3f} {stats["min"]:>9.3f} {base_str:>13}')
+        if config_results['failures']:
+            print(f'{name:<20} {len(config_results["failures"])} models not built.')
+
+
+def read_models(path: str, models_dirpath: Optional[str] = None) -> list[str]:
+    """Return the models of a sample file (a model per line) or of a directory.
+
+    The models of a sample file (e.g., names of a results file) are resolved by their name
+    to the models of the models directory, if given.
+    """
+    if not path.endswith('.txt'):
+        return sorted(utils.get_filepaths(path, ['uvl']))
+    with open(path, 'r', encoding='utf8') as file:
+        models = [line.strip() for line in file if line.strip()]
+    if models_dirpath is None:
+        return models
+    filepaths = {pathlib.Path(f).name.removesuffix('.uvl'): f for f in sorted(utils.get_filepaths(models_dirpath, ['uvl']))}
+    return [filepaths.get(pathlib.Path(model).name.removesuffix('.uvl'), model) for model in models]
+
+
+if __name__ == '__main__':
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 100000))  # Feature tree traversals of flamapy are recursive
+
+    parser = argparse.ArgumentParser(description='Benchmark suite of the UVL to BDD pipeline.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    parser_sample = subparsers.add_parser('sample', help='Stratified sample of the models of a results file.')
+    parser_sample.add_argument(metavar='results', dest='results', type=str, help='Historical results (.csv).')
+    parser_sample.add_argument('-n', metavar='n', dest='n', type=int, default=SAMPLE_SIZE, help='Number of models of the sample.')
+    parser_sample.add_argument('-bins', metavar='bins', dest='bins', type=int, default=BINS, help='Quantile bins of each dimension.')
+    parser_sample.add_argument('-seed', metavar='seed', dest='seed', type=int, default=0, help='Random seed.')
+    parser_sample.add_argument('-o', metavar='output', dest='output', type=str, required=True, help='Output sample file (.txt).')
+    parser_synthetic = subparsers.add_parser('synthetic', help='Generate synthetic UVL models to run the suite offline.')
+    parser_synthetic.add_argument('-o', metavar='dirpath', dest='output', type=str, required=True, help='Output directory.')
+    parser_synthetic.add_argument('-sizes', metavar='n', dest='sizes', type=int, nargs='+', default=SYNTHETIC_SIZES, help='Number of features of the models.')
+    parser_synthetic.add_argument('-seeds', metavar='seeds', dest='seeds', type=int, default=SYNTHETIC_SEEDS, help='Models per size.')
+    parser_run = subparsers.add_parser('run', help='Run the configurations on the models.')
+    parser_run.add_argument(metavar='models', dest='models', type=str, help='Sample file (.txt) or directory with the models.')
+    parser_run.add_argument('-models', metavar='dirpath', dest='models_dirpath', type=str, required=False, help='Directory of the models of the sample file (resolved by name).')
+    parser_run.add_argument('-configs', metavar='configs', dest='configs', type=str, required=False, help='Configurations (.json): list of {"name", "args" of uvl2bdd.main, "constants" overridden}.')
+    parser_run.add_argument('-r', metavar='repetitions', dest='repetitions', type=int, default=REPETITIONS, help='Repetitions of each configuration.')
+    parser_run.add_argument('-warmup', metavar='warmup', dest='warmup', type=int, default=WARMUP, help='Warmup runs (discarded).')
+    parser_run.add_argument('-o', metavar='output', dest='output', type=str, required=False, help='Output results (.json), usable as a baseline.')
+    parser_run.add_argument('-baseline', metavar='baseline', dest='baseline', type=str, required=False, help='Baseline results (.json) to compare with.')
+    parser_run.add_argument('-threshold', metavar='threshold', dest='threshold', type=float, default=THRESHOLD, help='Relative increase of a stage median considered a regression.')
+    args = parser.parse_args()
+
+    if args.command == 'sample':
+        sample = stratified_sample(args.results, args.n, args.bins, args.seed)
+        with open(args.output, 'w', encoding='utf8') as file:
+            file.write('\n'.join(sample) + '\n')
+        print(f'#Models sampled: {len(sample)}')
+    elif args.command == 'synthetic':
+        filepaths = write_uvl_models(args.output, args.sizes, SYNTHETIC_CONSTRAINTS_RATIO, args.seeds)
+        print(f'#Models generated: {len(filepaths)}')
+    else:
+        configurations = DEFAULT_CONFIGURATIONS
+        if args.configs:
+            with open(args.configs, 'r', encoding='utf8') as file:
+                configurations = json.load(file)
+        results = run(read_models(args.models, args.models_dirpath), configurations, args.repetitions, args.warmup)
+        baseline = None
+        if args.baseline:
+            with open(args.baseline, 'r', encoding='utf8') as file:
+                baseline = json.load(file)
+        print_results(results, baseline)
+        if args.output:
+            with open(args.output, 'w', encoding='utf8') as file:
+                json.dump(results, file, indent=2)
+        if baseline is not None:
+            regressions = compare(results, baseline, args.threshold)
+            for regression in regressions:
+                print(f'REGRESSION {regression}')
+            sys.exit(1 if regressions else 0)
@@ -0,0 +1,53 @@
+import sys
+import time
+import argparse
+import statistics
+from typing import Any, Callable
+
+from utils import pl_writer
+from utils.synthetic_fm import generate_feature_model
+
+
+SIZES = [1000, 10000, 100000]  # Number of features of the synthetic models
+CONSTRAINTS_RATIO = 0.1  # Constraints per feature
+REPETITIONS = 5
+
+
+def measure(function: Callable[[], Any], repetitions: int) -> list[float]:
+    """Return the execution times (in seconds) of the function."""
+    times = []
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def benchmark(n_features: int, repetitions: int) -> dict[str, list[float]]:
+    """Measure the translation functions of the feature model to logic on a synthetic model."""
+    fm = generate_feature_model(n_features, int(n_features * CONSTRAINTS_RATIO))
+    relations = fm.get_relations()
+    constraints = fm.get_constraints()
+    names, encoded_relations = pl_writer.encode_feature_tree(fm)
+    results = {}
+    results['to_exp'] = measure(lambda: pl_writer.to_exp(fm), repetitions)
+    results['encode_feature_tree'] = measure(lambda: pl_writer.encode_feature_tree(fm), repetitions)
+    results['render_relations'] = measure(lambda: pl_writer.render_relations(names, encoded_relations), repetitions)
+    results['get_relation_formula'] = measure(lambda: [pl_writer.get_relation_formula(r) for r in relations], repetitions)
+    results['get_constraint_formula'] = measure(lambda: [pl_writer.get_constraint_formula(c) for c in constraints], repetitions)
+    return results
+
+
+if __name__ == '__main__':
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 100000))  # Feature tree traversals of flamapy are recursive
+
+    parser = argparse.ArgumentParser(description='Microbenchmark of the translation of feature models to logic on synthetic models.')
+    parser.add_argument('-sizes', metavar='n', dest='sizes', type=int, nargs='+', default=SIZES, help='Number of features of the synthetic models.')
+    parser.add_argument('-r', metavar='repetitions', dest='repetitions', type=int, default=REPETITIONS, help='Repetitions of each measure.')
+    args = parser.parse_args()
+
+    print(f'{"Features":>10} {"Function":<24} {"Median (ms)":>12} {"Min (ms)":>10} {"ms/1k features":>15}')
+    for n_features in args.sizes:
+        for function, times in benchmark(n_features, args.repetitions).items():
+            median = statistics.median(times) * 1000
+            print(f'{n_features:>10} {function:<24} {median:>12.3f} {min(times) * 1000:>10.3f} {median / n_features * 1000:>15.3f}')
@@ -0,0 +1,503 @@
+import os
+import re
+import sys
+import json
+import time
+import signal
+import hashlib
+import argparse
+import pathlib
+import logging
+from typing import Any, Optional
+
+from logic2bdd import BDDException
+from utils import logic_reader, conjunction_schedule
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+TIMEOUT = 3600  # in seconds, 1 hour
+REORDERING = False  # Dynamic reordering of CUDD (sifting): slow for thousands of variables with a good initial order
+CHECKPOINT_INTERVAL = 600  # in seconds of construction between checkpoints
+CHECKPOINT_EXTENSION = '.checkpoint.json'
+CHECKPOINT_BDD_EXTENSION = '.checkpoint.dddmp'
+STOPPED_EXIT_CODE = 128 + signal.SIGTERM
+
+# Construction backends of the BDD: the Logic2BDD tool (subprocess) or the dd library (in-process)
+LOGIC2BDD_BACKEND = 'logic2bdd'
+DD_BACKEND = 'dd'
+BACKENDS = [LOGIC2BDD_BACKEND, DD_BACKEND]
+
+# Syntax of the expressions (.exp files) and precedence of the binary operators
+TOKEN_REGEX = re.compile(r'<->|->|\(|\)|[A-Za-z0-9_]+')
+PRECEDENCE = {'<->': 1, '->': 2, 'or': 3, 'XOR': 4, 'and': 5}
+
+
+class DDBuilder():
+    """In-process construction of the BDD of a model with the CUDD bindings of the dd library.
+
+    The expressions are translated into BDDs and conjoined incrementally, optionally with
+    dynamic reordering (sifting) enabled in the BDD manager.
+    """
+
+    def __init__(self, variables: list[str], reordering: bool = REORDERING) -> None:
+        try:
+            from dd import cudd  # Imported here because it is slow to import (only needed with this backend)
+        except ImportError:
+            raise BDDException('The dd library with the CUDD bindings is required (pip install dd).')
+        self.bdd = cudd.BDD()
+        self.bdd.configure(reordering=False)
+        self.bdd.declare(*variables)
+        self.bdd.configure(reordering=reordering)
+        self.variables = variables
+        self.peak_nodes = 0
+        self.stop_requested = False  # Set (e.g., by a signal handler) to checkpoint the construction and stop
+        self._cudd = cudd
+
+    def expression(self, expression: str) -> Any:
+        """Return the BDD of an expression."""
+        tokens = TOKEN_REGEX.findall(expression)
+        if not tokens:
+            return self.bdd.true
+        node, pos = self._parse(tokens, 0, 0)
+        if pos != len(tokens):
+            raise BDDException(f'Invalid expression: {expression}')
+        return node
+
+    def conjoin(self, expressions: list[str],
+                schedule: str = conjunction_schedule.BUCKET_SCHEDULE,
+                deadline: Optional[float] = None,
+                checkpoint_filepath: Optional[str] = None,
+                resume: bool = False) -> Optional[Any]:
+        """Return the conjunction of the expressions, or None if the deadline is exceeded.
+
+        The expressions are conjoined following the schedule (see utils.conjunction_schedule)
+        under the declared order of the variables.
+        The deadline is checked between conjunctions (time.monotonic() value).
+        With a checkpoint file, the partial conjunctions are saved every CHECKPOINT_INTERVAL
+        seconds and when the deadline is exceeded, and the construction is resumed from the
+        checkpoint (if it is of the same expressions, schedule and variables) with resume. If a
+        stop is requested, the checkpoint is saved and the process exits (STOPPED_EXIT_CODE).
+        """
+        if schedule not in conjunction_schedule.SCHEDULES:
+            raise BDDException(f'Unknown schedule: {schedule}.')
+        clusters = conjunction_schedule.cluster_expressions(expressions, self.variables, schedule)
+        key = checkpoint_key(expressions, schedule)
+        root, cluster_node = self.bdd.true, self.bdd.true
+        start, elapsed = (0, 0), 0.0
+        if resume and checkpoint_filepath is not None:
+            loaded = self.load_checkpoint(checkpoint_filepath, key)
+            if loaded is not None:
+                root, cluster_node, start, elapsed = loaded
+        started = time.monotonic()
+        last_checkpoint = started
+
+        def save(position: tuple[int, int]) -> None:
+            self.save_checkpoint(checkpoint_filepath, root, cluster_node, position, key,
+                                 elapsed + time.monotonic() - started)
+
+        for i in range(start[0], len(clusters)):
+            for j in range(start[1] if i == start[0] else 0, len(clusters[i])):
+                if checkpoint_filepath is not None and (self.stop_requested or time.monotonic() - last_checkpoint > CHECKPOINT_INTERVAL):
+                    save((i, j))
+                    last_checkpoint = time.monotonic()
+                    if self.stop_requested:
+                        LOGGER.warning('Construction stopped at expression %s of cluster %s (checkpoint saved).', j, i)
+                        raise SystemExit(STOPPED_EXIT_CODE)
+                cluster_node &= self.expression(clusters[i][j])
+                self.peak_nodes = max(self.peak_nodes, len(self.bdd))
+                if deadline is not None and time.monotonic() > deadline:
+                    if checkpoint_filepath is not None:
+                        save((i, j + 1))
+                    return None
+            root &= cluster_node
+            cluster_node = self.bdd.true
+            self.peak_nodes = max(self.peak_nodes, len(self.bdd))
+            if root == self.bdd.false:
+                break
+        LOGGER.debug('Conjunction finished in %.2f s (%.2f s in previous runs).', time.monotonic() - started, elapsed)
+        if checkpoint_filepath is not None:
+            remove_checkpoint(checkpoint_filepath)
+        return root
+
+    def save_checkpoint(self, filepath: str, root: Any, cluster_node: Any,
+                        position: tuple[int, int], key: str, elapsed: float) -> None:
+        """Save the partial conjunctions and the position (cluster, expression) of the next
+        expression in a <<file>>.checkpoint.json file (and its BDDs in a .checkpoint.dddmp file).
+
+        The files are replaced atomically, so that an interrupted save keeps the previous checkpoint.
+        """
+        bdd_filepath = filepath.removesuffix(CHECKPOINT_EXTENSION) + CHECKPOINT_BDD_EXTENSION
+        nodes = dump_dddmp(self.bdd, self.variables, [root, cluster_node], bdd_filepath + '.tmp', ['root', 'cluster'])
+        data = {'key': key, 'variables': self.variables, 'cluster': position[0], 'expression': position[1],
+                'elapsed': elapsed, 'nodes': nodes, 'bdd': bdd_filepath}
+        with open(filepath + '.tmp', 'w', encoding='utf8') as file:
+            json.dump(data, file)
+        os.replace(bdd_filepath + '.tmp', bdd_filepath)
+        os.replace(filepath + '.tmp', filepath)
+        LOGGER.debug('Checkpoint saved at expression %s of cluster %s (%s nodes, %.2f s).', position[1], position[0], nodes, elapsed)
+
+    def load_checkpoint(self, filepath: str, key: str) -> Optional[tuple[Any, Any, tuple[int, int], float]]:
+        """Load the partial conjunctions of a checkpoint in the manager.
+
+        Return the conjunction of the previous clusters, the partial conjunction of the current
+        cluster, the position of the next expression and the elapsed time of the previous runs,
+        or None if there is no checkpoint of the same construction.
+        """
+        from utils import dddmp
+
+        data = read_checkpoint(filepath)
+        if data is None:
+            return None
+        if data['key'] != key or data['variables'] != self.variables:
+            LOGGER.warning('Checkpoint %s is of another construction. Ignored.', filepath)
+            return None
+        root, cluster_node = self.load_table_roots(dddmp.read_bdd(data['bdd']))
+        LOGGER.info('Resuming the construction from expression %s of cluster %s (%.2f s in previous runs).',
+                    data['expression'], data['cluster'], data['elapsed'])
+        return (root, cluster_node, (data['cluster'], data['expression']), data['elapsed'])
+
+    def load_table_roots(self, table: Any) -> list[Any]:
+        """Load a BDD node table (see utils.dddmp.BDDTable) of variables of the manager.
+
+        Return the roots.
+        """
+        from utils.dddmp import TERMINAL_VAR
+
+        bdd = self.bdd
+        variables = [bdd.var(var) for var in table.variables]
+        nodes: list[Any] = []
+
+        def edge(value: int) -> Any:
+            node = nodes[value >> 1]
+            return ~node if value & 1 else node
+
+        for var, then, else_ in zip(table.var.tolist(), table.then.tolist(), table.else_.tolist()):
+            if var == TERMINAL_VAR:
+                nodes.append(bdd.true)
+            else:  # Children before parents: the variable of the node is above them
+                nodes.append(bdd.ite(variables[var], edge(then), edge(else_)))
+        return [edge(root) for root in table.roots]
+
+    def count(self, root: Any) -> int:
+        """Exact number of assignments of the variables of the manager that satisfy the root."""
+        return exact_count(self.bdd, root)
+
+    def reorder(self) -> None:
+        """Reorder the variables of the manager with (group) sifting."""
+        self._cudd.reorder(self.bdd)
+
+    def order(self) -> list[str]:
+        """Current order of the variables (by level)."""
+        return [self.bdd.var_at_level(i) for i in range(len(self.variables))]
+
+    def dump(self, root: Any, filepath: str) -> None:
+        self.bdd.dump(filepath, roots=[root], filetype='dddmp')
+
+    def dump_roots(self, roots: list[Any], filepath: str, root_names: Optional[list[str]] = None) -> int:
+        """Dump several roots sharing their nodes in a multi-root .dddmp file.
+
+        Return the number of nodes of the file.
+        """
+        return dump_dddmp(self.bdd, self.variables, roots, filepath, root_names)
+
+    def _parse(self, tokens: list[str], pos: int, min_precedence: int) -> tuple[Any, int]:
+        left, pos = self._parse_unary(tokens, pos)
+        while pos < len(tokens) and PRECEDENCE.get(tokens[pos], -1) >= min_precedence:
+            operator = tokens[pos]
+            precedence = PRECEDENCE[operator]
+            # The implication is right associative
+            right, pos = self._parse(tokens, pos + 1, precedence if operator == '->' else precedence + 1)
+            if operator == 'and':
+                left = left & right
+            elif operator == 'or':
+                left = left | right
+            elif operator == 'XOR':
+                left = self.bdd.apply('xor', left, right)  # The CUDD functions do not support ^
+            elif operator == '->':
+                left = ~left | right
+            else:
+                left = left.equiv(right)
+        return (left, pos)
+
+    def _parse_unary(self, tokens: list[str], pos: int) -> tuple[Any, int]:
+        token = tokens[pos]
+        if token == 'not':
+            node, pos = self._parse_unary(tokens, pos + 1)
+            return (~node, pos)
+        if token == '(':
+            node, pos = self._parse(tokens, pos + 1, 0)
+            if pos >= len(tokens) or tokens[pos] != ')':
+                raise BDDException('Unbalanced parentheses in expression.')
+            return (node, pos + 1)
+        return (self.bdd.var(token), pos + 1)
+
+
+def exact_count(bdd: Any, root: Any, nvars: Optional[int] = None) -> int:
+    """Exact number of assignments that satisfy the root of a BDD of the dd library, over the
+    variables of the manager or, as bdd.count, over nvars variables (including its support).
+
+    The count of the dd library is a float (a double of CUDD), which is rounded above 2^53 and
+    overflows with about a thousand variables, so the configurations are counted with Python
+    integers in a pass over the nodes.
+    """
+    levels = len(bdd.vars)
+    counts: dict[int, int] = {}  # Regular node -> assignments of the variables from its level
+
+    def regular(node: Any) -> Any:
+        return ~node if node.negated else node
+
+    def level(node: Any) -> int:
+        return levels if node.var is None else node.level
+
+    def value(node: Any, above: int) -> int:  # Assignments of the variables below the level above
+        reg = regular(node)
+        count = counts[int(reg)]
+        if node.negated:
+            count = (1 << (levels - level(reg))) - count
+        return count << (level(reg) - above - 1)
+
+    stack = [regular(root)]
+    while stack:  # Iterative post-order: the BDDs may be deeper than the recursion limit
+        node = stack[-1]
+        if int(node) in counts:
+            stack.pop()
+        elif node.var is None:  # Constant node (true)
+            counts[int(node)] = 1
+            stack.pop()
+        else:
+            children = [child for child in (regular(node.high), regular(node.low)) if int(child) not in counts]
+            if children:
+                stack.extend(children)
+                continue
+            stack.pop()
+            counts[int(node)] = value(node.high, node.level) + value(node.low, node.level)
+    result = value(root, -1)
+    if nvars is None or nvars == levels:
+        return result
+    return result << (nvars - levels) if nvars > levels else result >> (levels - nvars)
+
+
+def dump_dddmp(bdd: Any,
+               variables: list[str],
+               roots: list[Any],
+               filepath: str,
+               root_names: Optional[list[str]] = None) -> int:
+    """Write the roots in a multi-root .dddmp file (text mode, as CUDD's Dddmp_cuddBddStoreArray).
+
+    The dump of the dd library supports a single root. The variables ids are their positions in
+    the given list (declaration order), and the variable of each node is written as its position
+    in the support variables, as CUDD does. The nodes are written bottom-up with complemented else
+    edges as negative ids. Return the number of nodes.
+    """
+    index = {var: i for i, var in enumerate(variables)}
+    ids: dict[int, int] = {}  # Regular node -> id in the file
+    nodes: list[Optional[tuple[str, int, int]]] = []  # Variable, then and else ids (None for the constant)
+    support = set()
+
+    def regular(node: Any) -> Any:
+        return ~node if node.negated else node
+
+    def edge(node: Any) -> int:
+        return -ids[int(regular(node))] if node.negated else ids[int(node)]
+
+    stack = [regular(root) for root in reversed(roots)]  # Roots and then children first, as CUDD
+    while stack:  # Iterative post-order: the BDDs may be deeper than the recursion limit
+        node = stack[-1]
+        if int(node) in ids:
+            stack.pop()
+            continue
+        if node.var is None:  # Constant node (true)
+            stack.pop()
+            ids[int(node)] = len(ids) + 1
+            nodes.append(None)
+            continue
+        children = [child for child in (regular(node.high), regular(node.low)) if int(child) not in ids]
+        if children:
+            stack.extend(reversed(children))
+            continue
+        stack.pop()
+        ids[int(node)] = len(ids) + 1
+        support.add(node.var)
+        nodes.append((node.var, edge(node.high), edge(node.low)))
+
+    support_vars = sorted(support, key=lambda var: index[var])
+    position = {var: i for i, var in enumerate(support_vars)}
+    lines = [f'{i} T 1 0 0' if n is None else f'{i} {n[0]} {position[n[0]]} {n[1]} {n[2]}'
+             for i, n in enumerate(nodes, 1)]
+    header = ['.ver DDDMP-2.0', '.mode A', '.varinfo 3',
+              f'.nnodes {len(ids)}',
+              f'.nvars {len(variables)}',
+              f'.nsuppvars {len(support_vars)}',
+              f'.suppvarnames {" ".join(support_vars)}',
+              f'.orderedvarnames {" ".join(bdd.var_at_level(i) for i in range(len(variables)))}',
+              f'.ids {" ".join(str(index[var]) for var in support_vars)}',
+              f'.permids {" ".join(str(bdd.level_of_var(var)) for var in support_vars)}',
+              f'.nroots {len(roots)}',
+              f'.rootids {" ".join(str(edge(root)) for root in roots)}']
+    if root_names is not None:
+        header.append(f'.rootnames {" ".join(root_names)}')
+    with open(filepath, 'w', encoding='utf8') as file:
+        file.write('\n'.join(header + ['.nodes'] + lines + ['.end']) + '\n')
+    return len(ids)
+
+
+def load_table(table: Any, reordering: bool = REORDERING) -> tuple[DDBuilder, list[Any]]:
+    """Load a BDD node table (see utils.dddmp.BDDTable) in a new manager of the dd library.
+
+    The variables are declared in the order of the table. Return the builder and the roots.
+    """
+    builder = DDBuilder(table.order, reordering)
+    return (builder, builder.load_table_roots(table))
+
+
+def checkpoint_key(expressions: list[str], schedule: str) -> str:
+    """Hash of a construction (expressions and schedule) to match its checkpoints."""
+    return hashlib.sha256(json.dumps([schedule, expressions]).encode('utf8')).hexdigest()
+
+
+def checkpoint_filepath(bdd_filepath: str) -> str:
+    return str(pathlib.Path(bdd_filepath).with_suffix(CHECKPOINT_EXTENSION))
+
+
+def read_checkpoint(filepath: str) -> Optional[dict[str, Any]]:
+    if not pathlib.Path(filepath).exists():
+        return None
+    with open(filepath, 'r', encoding='utf8') as file:
+        return json.load(file)
+
+
+def remove_checkpoint(filepath: str) -> None:
+    data = read_checkpoint(filepath)
+    if data is not None:
+        pathlib.Path(data['bdd']).unlink(missing_ok=True)
+        pathlib.Path(filepath).unlink(missing_ok=True)
+
+
+_BUILDERS: list[DDBuilder] = []  # Constructions with checkpoints in progress (to stop them with a signal)
+
+
+def install_stop_handler() -> None:
+    """Checkpoint the constructions in progress and exit on SIGTERM (e.g., timeout or preemption
+    of a job in a cluster). Without constructions in progress, the process exits directly."""
+    def handler(signum: int, frame: Any) -> None:
+        if not _BUILDERS:
+            sys.exit(STOPPED_EXIT_CODE)
+        for builder in _BUILDERS:
+            builder.stop_requested = True
+    signal.signal(signal.SIGTERM, handler)
+
+
+def build_bdd_from_expressions(variables: list[str],
+                               expressions: list[str],
+                               outputfile: str,
+                               order: Optional[list[str]] = None,
+                               timeout: int = TIMEOUT,
+                               schedule: str = conjunction_schedule.BUCKET_SCHEDULE,
+                               reordering: bool = REORDERING,
+                               checkpoint: bool = False,
+                               resume: bool = False) -> Optional[tuple[DDBuilder, Any]]:
+    """Build the BDD of the expressions in-process and dump it in the output file (.dddmp).
+
+    The variables are declared in the given order (the variables not included in the order are
+    declared after them).
+    With checkpoint, the construction is checkpointed in a <<file>>.checkpoint.json file (see
+    DDBuilder.conjoin), and with resume, it is resumed from the checkpoint of a previous run
+    (with its order of the variables).
+    Return the builder and the root, or None if the timeout is exceeded.
+    """
+    deadline = time.monotonic() + timeout
+    if order is not None:
+        included = set(order)
+        variables = [var for var in order] + [var for var in variables if var not in included]
+    checkpoint_file = checkpoint_filepath(outputfile) if checkpoint or resume else None
+    if resume:
+        data = read_checkpoint(checkpoint_file)
+        if data is not None and data['key'] == checkpoint_key(expressions, schedule) and set(data['variables']) == set(variables):
+            variables = data['variables']
+    builder = DDBuilder(variables, reordering)
+    _BUILDERS.append(builder)
+    try:
+        root = builder.conjoin(expressions, schedule, deadline, checkpoint_file, resume)
+    finally:
+        _BUILDERS.remove(builder)
+    if root is None:
+        return None
+    builder.dump(root, outputfile)
+    return (builder, root)
+
+
+def build_bdd(varfile: str,
+              expfile: str,
+              orderfile: str,
+              timeout: int = TIMEOUT,
+              schedule: str = conjunction_schedule.BUCKET_SCHEDULE,
+              reordering: bool = REORDERING,
+              checkpoint: bool = False,
+              resume: bool = False) -> Optional[str]:
+    """Build the BDD using the given variables, expressions and order files.
+
+    Same as logic2bdd.build_bdd but in-process with the dd library (optionally checkpointed and
+    resumed, see build_bdd_from_expressions).
+    """
+    path = pathlib.Path(varfile)
+    filename = path.stem
+    dir = path.parent
+    pathlib.Path(dir.parent / 'bdd').mkdir(parents=True, exist_ok=True)
+    outputfile = str(dir.parent / f'bdd/{filename}.dddmp')
+
+    variables = logic_reader.read_variables(varfile)
+    expressions = logic_reader.read_expressions(expfile)
+    order = logic_reader.read_variables(orderfile) if orderfile is not None else None
+    LOGGER.debug('Building BDD in-process for files: %s, %s, %s.', varfile, expfile, orderfile)
+    result = build_bdd_from_expressions(variables, expressions, outputfile, order, timeout, schedule, reordering, checkpoint, resume)
+    if result is None:
+        return None
+    LOGGER.debug('Peak nodes: %s.', result[0].peak_nodes)
+    return outputfile
+
+
+def build_bdd_from_fm(feature_model: Any,
+                      outputfile: str,
+                      order: Optional[list[str]] = None,
+                      timeout: int = TIMEOUT,
+                      schedule: str = conjunction_schedule.BUCKET_SCHEDULE,
+                      reordering: bool = REORDERING,
+                      checkpoint: bool = False,
+                      resume: bool = False) -> Optional[tuple[DDBuilder, Any]]:
+    """Build the BDD of a feature model in-process without writing and reading the .var and .exp files.
+
+    The features of the feature model are the variables, so they must have secure names (e.g.,
+    the logic FM of fm2logic.fm2logic_model). The variables are declared in the given order or,
+    by default, in depth-first order of the feature tree (see build_bdd_from_expressions).
+    Return the builder and the root, or None if the timeout is exceeded.
+    """
+    from utils.pl_writer import to_exp
+    from utils.var_order import dfs_order
+
+    pathlib.Path(outputfile).parent.mkdir(parents=True, exist_ok=True)
+    variables = [feature.name for feature in feature_model.get_features()]
+    order = dfs_order(feature_model) if order is None else order
+    return build_bdd_from_expressions(variables, to_exp(feature_model), outputfile, order, timeout, schedule,
+                                      reordering, checkpoint, resume)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description='DD backend: Create the BDD in-process using the dd library (CUDD).')
+    parser.add_argument('-var', metavar='varfile', dest='varfile', type=str, required=True, help='Input variable file (.var) of the model.')
+    parser.add_argument('-exp', metavar='expfile', dest='expfile', type=str, required=True, help='Input expression file (.exp) of the model.')
+    parser.add_argument('-order', metavar='orderfile', dest='orderfile', type=str, required=False, help='Initial order of the variables (e.g., fastOrder output).')
+    parser.add_argument('-schedule', metavar='schedule', dest='schedule', type=str, required=False, default=conjunction_schedule.BUCKET_SCHEDULE, choices=conjunction_schedule.SCHEDULES, help='Order to conjoin the expressions (default: bucket).')
+    parser.add_argument('-reorder', dest='reorder', action='store_true', required=False, help='Enable dynamic reordering (sifting) of CUDD during the construction.')
+    parser.add_argument('-timeout', metavar='seconds', dest='timeout', type=int, required=False, default=TIMEOUT, help=f'Time budget of the construction (default: {TIMEOUT}).')
+    parser.add_argument('-checkpoint', dest='checkpoint', action='store_true', required=False, help=f'Save checkpoints of the construction (every {CHECKPOINT_INTERVAL}s, at the timeout and on SIGTERM).')
+    parser.add_argument('-resume', dest='resume', action='store_true', required=False, help='Resume the construction from its checkpoint (and save new checkpoints).')
+    args = parser.parse_args()
+
+    if args.checkpoint or args.resume:
+        install_stop_handler()
+    bddfile = build_bdd(args.varfile, args.expfile, args.orderfile, args.timeout, args.schedule, args.reorder, args.checkpoint, args.resume)
+    print(f'BDD file: {bddfile}')
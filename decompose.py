@@ -0,0 +1,240 @@
+import os
+import json
+import argparse
+import pathlib
+import logging
+from typing import Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+
+import logic2bdd
+import dd_backend
+from utils import logic_reader, utils
+
+
+LOGGER = logging.getLogger(__name__)
+
+TIMEOUT = 3600  # in seconds, 1 hour
+COMPONENT_SUFFIX = '-c'
+PRODUCT_EXTENSION = '.product.json'
+
+
+class Component():
+    """Independent component of a model: a subset of the variables and the expressions over them."""
+
+    def __init__(self, variables: list[str], expressions: list[str]) -> None:
+        self.variables = variables
+        self.expressions = expressions
+        self.var_filepath: Optional[str] = None
+        self.exp_filepath: Optional[str] = None
+        self.bdd_filepath: Optional[str] = None
+        self.nodes: Optional[int] = None
+        self.configurations: Optional[int] = None
+
+
+class ProductBDD():
+    """Set of BDDs of independent components whose conjunction represents the whole model.
+
+    The variables that do not appear in any expression (free variables) are not built as BDDs.
+    The number of configurations is the product of the configurations of the components.
+    """
+
+    def __init__(self, components: list[Component], free_variables: list[str]) -> None:
+        self.components = components
+        self.free_variables = free_variables
+        self._bdds: dict[int, Any] = {}  # Loaded BDD models (lazily)
+
+    def nodes(self) -> int:
+        return sum(c.nodes for c in self.components)
+
+    def configurations(self) -> int:
+        result = 2 ** len(self.free_variables)
+        for component in self.components:
+            result *= component.configurations
+        return result
+
+    def count(self, partial_configuration: Optional[dict[str, bool]] = None) -> int:
+        """Number of configurations of the model that extend the given partial configuration."""
+        if not partial_configuration:
+            return self.configurations()
+        assigned_free = sum(1 for var in self.free_variables if var in partial_configuration)
+        result = 2 ** (len(self.free_variables) - assigned_free)
+        for i, component in enumerate(self.components):
+            values = {var: partial_configuration[var] for var in component.variables
+                      if var in partial_configuration}
+            if not values:
+                result *= component.configurations
+                continue
+            bdd_model = self._get_bdd(i)
+            node = bdd_model.bdd.let(values, bdd_model.root)
+            result *= dd_backend.exact_count(bdd_model.bdd, node, len(component.variables) - len(values))
+            if result == 0:
+                break
+        return result
+
+    def is_valid(self, partial_configuration: dict[str, bool]) -> bool:
+        """Return whether the partial configuration can be extended to a valid configuration."""
+        return self.count(partial_configuration) > 0
+
+    def save(self, filepath: str) -> None:
+        data = {'free_variables': self.free_variables,
+                'components': [{'var': c.var_filepath, 'exp': c.exp_filepath, 'bdd': c.bdd_filepath,
+                                'nodes': c.nodes, 'configurations': utils.int2str(c.configurations)}
+                               for c in self.components]}
+        with open(filepath, 'w', encoding='utf8') as file:
+            json.dump(data, file, indent=2)
+
+    @staticmethod
+    def load(filepath: str) -> 'ProductBDD':
+        with open(filepath, 'r', encoding='utf8') as file:
+            data = json.load(file)
+        components = []
+        for c in data['components']:
+            component = Component(logic_reader.read_variables(c['var']),
+                                  logic_reader.read_expressions(c['exp']))
+            component.var_filepath = c['var']
+            component.exp_filepath = c['exp']
+            component.bdd_filepath = c['bdd']
+            component.nodes = c['nodes']
+            component.configurations = utils.str2int(c['configurations'])
+            components.append(component)
+        return ProductBDD(components, data['free_variables'])
+
+    def _get_bdd(self, index: int) -> Any:
+        if index not in self._bdds:
+            from flamapy.metamodels.bdd_metamodel.transformations import DDDMPReader
+            self._bdds[index] = DDDMPReader(self.components[index].bdd_filepath).transform()
+        return self._bdds[index]
+
+
+def get_fixed_variables(expressions: list[str]) -> set[str]:
+    """Return the variables fixed by unit expressions (e.g., the root feature)."""
+    fixed = set()
+    for expression in expressions:
+        tokens = expression.split()
+        if len(tokens) == 1:
+            fixed.add(tokens[0])
+        elif len(tokens) == 2 and tokens[0] == 'not':
+            fixed.add(tokens[1])
+    return fixed
+
+
+def decompose(variables: list[str], expressions: list[str]) -> tuple[list[Component], list[str]]:
+    """Decompose the model into independent components.
+
+    Two variables are in the same component if they appear together in an expression, ignoring
+    the variables fixed by unit expressions (the root feature is always fixed).
+    The fixed variables and the expressions over only fixed variables are included in all
+    components, so that the number of configurations of the model is the product of the
+    configurations of the components.
+
+    Return the components and the free variables (those not appearing in any expression).
+    """
+    fixed = get_fixed_variables(expressions)
+    parent = {var: var for var in variables}
+
+    def find(var: str) -> str:
+        while parent[var] != var:
+            parent[var] = parent[parent[var]]
+            var = parent[var]
+        return var
+
+    expressions_vars = [logic_reader.get_expression_variables(exp) for exp in expressions]
+    used = set()
+    for vars in expressions_vars:
+        used.update(vars)
+        vars = [var for var in vars if var not in fixed]
+        for var in vars[1:]:
+            parent[find(var)] = find(vars[0])
+
+    fixed_vars = [var for var in variables if var in fixed]
+    fixed_exps = [exp for exp, vars in zip(expressions, expressions_vars)
+                  if all(var in fixed for var in vars)]
+    components_vars: dict[str, list[str]] = {}
+    for var in variables:
+        if var in used and var not in fixed:
+            components_vars.setdefault(find(var), []).append(var)
+    components_exps: dict[str, list[str]] = {root: [] for root in components_vars}
+    for exp, vars in zip(expressions, expressions_vars):
+        vars = [var for var in vars if var not in fixed]
+        if vars:
+            components_exps[find(vars[0])].append(exp)
+    components = [Component(fixed_vars + components_vars[root], fixed_exps + components_exps[root])
+                  for root in components_vars]
+    if not components:
+        components = [Component(fixed_vars, fixed_exps)]
+    free_variables = [var for var in variables if var not in used]
+    return (components, free_variables)
+
+
+def build_component(component: Component, timeout: int, order_method: str) -> Component:
+    """Build the BDD of a component and count its configurations."""
+    if order_method == logic2bdd.FASTORDER_METHOD:
+        orderfile = logic2bdd.get_initial_order(component.var_filepath, component.exp_filepath, timeout)
+    elif order_method == logic2bdd.REUSE_METHOD:
+        orderfile = (logic2bdd.get_reused_order(component.var_filepath, component.exp_filepath)
+                     or logic2bdd.get_initial_order(component.var_filepath, component.exp_filepath, timeout))
+    else:
+        orderfile = logic2bdd.get_heuristic_order(component.var_filepath, component.exp_filepath, order_method)
+    if orderfile is None:
+        return component
+    component.bdd_filepath = logic2bdd.build_bdd(component.var_filepath, component.exp_filepath, orderfile, timeout)
+    if component.bdd_filepath is None:
+        return component
+    component.nodes = utils.read_bdd_nodes(component.bdd_filepath)
+    component.configurations = utils.count_configurations(component.bdd_filepath)
+    return component
+
+
+def build_product(var_filepath: str,
+                  exp_filepath: str,
+                  timeout: int = TIMEOUT,
+                  order_method: str = logic2bdd.FASTORDER_METHOD,
+                  workers: Optional[int] = None) -> Optional[ProductBDD]:
+    """Decompose the model into independent components and build their BDDs in parallel.
+
+    The var and exp files of each component are written next to the model files, and the
+    product of BDDs is saved in a <<file>>.product.json file in the bdd folder.
+    Return None if the BDD of any component could not be built.
+    """
+    path = pathlib.Path(var_filepath)
+    filename = path.stem
+    dir = path.parent
+
+    variables = logic_reader.read_variables(var_filepath)
+    expressions = logic_reader.read_expressions(exp_filepath)
+    components, free_variables = decompose(variables, expressions)
+    LOGGER.debug('Model %s decomposed into %s components and %s free variables.', filename, len(components), len(free_variables))
+    for i, component in enumerate(components):
+        component.var_filepath = str(dir / f'{filename}{COMPONENT_SUFFIX}{i}.var')
+        component.exp_filepath = str(dir / f'{filename}{COMPONENT_SUFFIX}{i}.exp')
+        logic_reader.write_variables(component.variables, component.var_filepath)
+        logic_reader.write_expressions(component.expressions, component.exp_filepath)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        components = list(executor.map(lambda c: build_component(c, timeout, order_method), components))
+    if any(c.configurations is None for c in components):
+        return None
+    product = ProductBDD(components, free_variables)
+    pathlib.Path(dir.parent / 'bdd').mkdir(parents=True, exist_ok=True)
+    product.save(str(dir.parent / f'bdd/{filename}{PRODUCT_EXTENSION}'))
+    return product
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description='Decompose: Build the BDDs of the independent components of a model.')
+    parser.add_argument('-var', metavar='varfile', dest='varfile', type=str, required=True, help='Input variable file (.var) of the model.')
+    parser.add_argument('-exp', metavar='expfile', dest='expfile', type=str, required=True, help='Input expression file (.exp) of the model.')
+    parser.add_argument('-order', metavar='method', dest='order', type=str, required=False, default=logic2bdd.FASTORDER_METHOD, choices=[logic2bdd.FASTORDER_METHOD, logic2bdd.REUSE_METHOD] + logic2bdd.ORDER_HEURISTICS, help='Variable ordering method (default: fastorder).')
+    parser.add_argument('-workers', metavar='n', dest='workers', type=int, required=False, default=os.cpu_count(), help='Number of components built in parallel.')
+    args = parser.parse_args()
+
+    product = build_product(args.varfile, args.expfile, TIMEOUT, args.order, args.workers)
+    if product is None:
+        print('The BDD of some component could not be built.')
+    else:
+        print(f'#Components: {len(product.components)}')
+        print(f'#Free variables: {len(product.free_variables)}')
+        print(f'#Nodes: {product.nodes()}')
+        print(f'#Configurations: {product.configurations()}')
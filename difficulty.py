@@ -0,0 +1,361 @@
+import os
+import re
+import csv
+import math
+import json
+import heapq
+import argparse
+import pathlib
+import logging
+from typing import Any, Optional
+
+from utils import logic_reader
+
+
+LOGGER = logging.getLogger(__name__)
+
+TIMEOUT = 3600  # in seconds, 1 hour (budget used to build the historical results)
+MIN_TIMEOUT = 60  # in seconds
+MAX_TIMEOUT = 4 * TIMEOUT  # in seconds
+TIMEOUT_MARGIN = 2  # Standard deviations (in log10 scale) added to the predicted time
+DEFER_PROBABILITY = 0.9  # Predicted probability of a timeout from which a model is deferred
+LARGE_BDD_NODES = 1000000  # Predicted nodes from which the large settings are used
+MAX_TREEWIDTH = 500  # Cap for the treewidth heuristic (keeps the estimator cheap)
+RIDGE = 1e-3  # Regularization of the least squares fitting
+LOGISTIC_ITERATIONS = 25  # Iterations (IRLS) of the fitting of the probability of a timeout
+
+# Metrics available in the results.csv rows and metrics that require the logic files
+CSV_METRICS = ['variables', 'clauses', 'clause_ratio']
+LOGIC_METRICS = ['treewidth', 'max_group', 'mean_group']
+
+# Columns of the results.csv file
+MODEL_COLUMN = 'Model'
+METRICS_COLUMNS = {'variables': 'Variables', 'clauses': 'Clauses'}
+FASTORDER_TIME_COLUMN = 'fastOrder Time (s)'
+LOGIC2BDD_TIME_COLUMN = 'Logic2BDD Time (s)'
+BDD_NODES_COLUMN = 'BDD Nodes'
+TIMEOUT_REGEX = re.compile(r'^Timeout(?: \((\d+(?:\.\d*)?)s\))?$')  # Timeout with its budget (uvl2bdd.TIMEOUT_STR)
+
+
+class Estimate():
+    """Prediction of the difficulty of building the BDD of a model, and the settings derived."""
+
+    def __init__(self, build_time: float, bdd_nodes: float, timeout: int, large: bool,
+                 timeout_probability: float, deferred: bool) -> None:
+        self.build_time = build_time  # in seconds
+        self.bdd_nodes = bdd_nodes
+        self.timeout = timeout  # in seconds
+        self.large = large  # Use the settings for large FMs
+        self.timeout_probability = timeout_probability  # Of exceeding the budget of the historical results
+        self.deferred = deferred  # Likely infeasible
+
+    def __str__(self) -> str:
+        return (f'time={self.build_time:.4g}s, nodes={self.bdd_nodes:.4g}, '
+                f'timeout={self.timeout}s, large={self.large}, '
+                f'timeout probability={self.timeout_probability:.3f}, deferred={self.deferred}')
+
+
+class DifficultyEstimator():
+    """Log-linear regression of the build time and the BDD size of a model, and logistic
+    regression of the probability that the build exceeds the budget of the historical results.
+
+    The inputs are the log10 of cheap metrics of the model (see CSV_METRICS and LOGIC_METRICS)
+    that are available before calling fastOrder.
+    The build times of the timed-out models are censored (the budget is a lower bound), so the
+    regression of the time underestimates the hardest models: they are deferred by the
+    probability of a timeout instead.
+    """
+
+    def __init__(self, inputs: list[str]) -> None:
+        self.inputs = inputs
+        self.time_coefficients: list[float] = []
+        self.time_sigma: float = 0.0
+        self.nodes_coefficients: list[float] = []
+        self.nodes_sigma: float = 0.0
+        self.timeout_coefficients: list[float] = []
+
+    def fit(self, metrics: list[dict[str, float]], build_times: list[float],
+            bdd_nodes: list[Optional[float]],
+            timed_out: Optional[list[bool]] = None) -> 'DifficultyEstimator':
+        """Fit the estimator.
+
+        Build times of models that timed out must be given as the timeout (lower bound), and
+        flagged in timed_out to fit the probability of a timeout (otherwise, no model is deferred).
+        The BDD nodes of the models without BDD must be None.
+        """
+        x = [self._inputs_vector(m) for m in metrics]
+        y = [math.log10(1 + t) for t in build_times]
+        self.time_coefficients = least_squares(x, y)
+        self.time_sigma = residual_sigma(x, y, self.time_coefficients)
+        x_nodes = [xi for xi, n in zip(x, bdd_nodes) if n is not None]
+        y_nodes = [math.log10(1 + n) for n in bdd_nodes if n is not None]
+        self.nodes_coefficients = least_squares(x_nodes, y_nodes)
+        self.nodes_sigma = residual_sigma(x_nodes, y_nodes, self.nodes_coefficients)
+        self.timeout_coefficients = logistic_regression(x, [float(t) for t in timed_out]) if timed_out is not None else []
+        return self
+
+    def predict(self, metrics: dict[str, float]) -> Estimate:
+        x = self._inputs_vector(metrics)
+        log_time = dot(self.time_coefficients, x)
+        log_nodes = dot(self.nodes_coefficients, x)
+        build_time = max(0.0, 10 ** log_time - 1)
+        bdd_nodes = max(0.0, 10 ** log_nodes - 1)
+        timeout = 10 ** (log_time + TIMEOUT_MARGIN * self.time_sigma)
+        timeout = int(min(MAX_TIMEOUT, max(MIN_TIMEOUT, math.ceil(timeout))))
+        timeout_probability = sigmoid(dot(self.timeout_coefficients, x)) if self.timeout_coefficients else 0.0
+        large = bdd_nodes > LARGE_BDD_NODES
+        return Estimate(build_time, bdd_nodes, timeout, large, timeout_probability,
+                        timeout_probability >= DEFER_PROBABILITY)
+
+    def save(self, filepath: str) -> None:
+        with open(filepath, 'w', encoding='utf8') as file:
+            json.dump(self.__dict__, file, indent=2)
+
+    @staticmethod
+    def load(filepath: str) -> 'DifficultyEstimator':
+        with open(filepath, 'r', encoding='utf8') as file:
+            data = json.load(file)
+        estimator = DifficultyEstimator(data['inputs'])
+        estimator.__dict__.update(data)
+        return estimator
+
+    def _inputs_vector(self, metrics: dict[str, float]) -> list[float]:
+        return [1.0] + [math.log10(1 + metrics[name]) for name in self.inputs]
+
+
+def get_model_metrics(var_filepath: str, exp_filepath: str) -> dict[str, float]:
+    """Compute the metrics of a model from its .var and .exp files."""
+    variables = logic_reader.read_variables(var_filepath)
+    expressions_vars = logic_reader.read_expressions_variables(exp_filepath)
+    groups = [len(vars) for vars in expressions_vars if len(vars) > 1]
+    metrics = {}
+    metrics['variables'] = len(variables)
+    metrics['clauses'] = len(expressions_vars)
+    metrics['clause_ratio'] = len(expressions_vars) / max(1, len(variables))
+    metrics['treewidth'] = treewidth_upper_bound(variables, expressions_vars)
+    metrics['max_group'] = max(groups, default=0)
+    metrics['mean_group'] = sum(groups) / len(groups) if groups else 0
+    return metrics
+
+
+def treewidth_upper_bound(variables: list[str], expressions_vars: list[list[str]],
+                          max_treewidth: int = MAX_TREEWIDTH) -> int:
+    """Upper bound of the treewidth of the constraint graph using the min-degree heuristic.
+
+    The constraint graph has a node per variable and a clique per expression.
+    The elimination stops as soon as the width reaches max_treewidth.
+    """
+    adjacency: dict[str, set[str]] = {var: set() for var in variables}
+    for vars in expressions_vars:
+        for var in vars:
+            adjacency.setdefault(var, set()).update(vars)
+    for var, neighbors in adjacency.items():
+        neighbors.discard(var)
+    heap = [(len(neighbors), var) for var, neighbors in adjacency.items()]
+    heapq.heapify(heap)
+    width = 0
+    while heap:
+        degree, var = heapq.heappop(heap)
+        if var not in adjacency or degree != len(adjacency[var]):
+            continue  # Outdated entry
+        width = max(width, degree)
+        if width >= max_treewidth:
+            return max_treewidth
+        neighbors = adjacency.pop(var)
+        for neighbor in neighbors:
+            adjacency[neighbor].discard(var)
+            adjacency[neighbor].update(n for n in neighbors if n != neighbor)
+        for neighbor in neighbors:
+            heapq.heappush(heap, (len(adjacency[neighbor]), neighbor))
+    return width
+
+
+def read_results(results_filepath: str) -> list[dict[str, str]]:
+    """Read the rows of a results file, keeping the last row of each model.
+
+    The timed-out models processed again (e.g., with -resume) are appended to the results
+    file, so that their last row supersedes the previous ones.
+    """
+    rows: dict[str, dict[str, str]] = {}
+    with open(results_filepath, 'r', encoding='utf8', newline='') as file:
+        for row in csv.DictReader(file):
+            model = pathlib.Path(row[MODEL_COLUMN]).stem
+            rows.pop(model, None)
+            rows[model] = row
+    return list(rows.values())
+
+
+def read_training_data(results_filepath: str,
+                       logic_dir: Optional[str] = None) -> tuple[list[str], list[dict[str, Any]]]:
+    """Read the historical results of the models built.
+
+    Return the metrics used as inputs and, for each model built (or timed out), a dict with the
+    metrics, the build time, the BDD nodes and whether it timed out. The build time of a timed-out
+    model is a lower bound (see parse_times), also if fastOrder timed out and Logic2BDD was not run.
+    If the directory with the logic files of the models is given, the metrics that require the
+    logic files are also used (only for the models whose logic files exist).
+    """
+    rows = []
+    for row in read_results(results_filepath):
+        try:
+            metrics = {name: float(row[column]) for name, column in METRICS_COLUMNS.items()}
+        except (ValueError, TypeError):
+            continue  # Non-Boolean FMs or errors
+        metrics['clause_ratio'] = metrics['clauses'] / max(1, metrics['variables'])
+        times = parse_times(row, [FASTORDER_TIME_COLUMN, LOGIC2BDD_TIME_COLUMN])
+        if times is None:
+            continue
+        timed_out = any(is_timeout(row.get(column)) for column in (FASTORDER_TIME_COLUMN, LOGIC2BDD_TIME_COLUMN))
+        try:
+            bdd_nodes = float(row[BDD_NODES_COLUMN])
+        except (ValueError, TypeError):
+            bdd_nodes = None
+        if logic_dir is not None:
+            filename = pathlib.Path(row[MODEL_COLUMN]).stem
+            var_filepath = os.path.join(logic_dir, f'{filename}.var')
+            exp_filepath = os.path.join(logic_dir, f'{filename}.exp')
+            if not (os.path.isfile(var_filepath) and os.path.isfile(exp_filepath)):
+                continue
+            metrics.update(get_model_metrics(var_filepath, exp_filepath))
+        rows.append({'metrics': metrics, 'build_time': sum(times), 'bdd_nodes': bdd_nodes, 'timed_out': timed_out})
+    inputs = CSV_METRICS + (LOGIC_METRICS if logic_dir is not None else [])
+    return (inputs, rows)
+
+
+def train(results_filepath: str, logic_dir: Optional[str] = None) -> DifficultyEstimator:
+    """Train a difficulty estimator with the historical results of the models built."""
+    inputs, rows = read_training_data(results_filepath, logic_dir)
+    LOGGER.info('Training difficulty estimator with %s models (inputs: %s).', len(rows), inputs)
+    estimator = DifficultyEstimator(inputs)
+    estimator.fit([row['metrics'] for row in rows],
+                  [row['build_time'] for row in rows],
+                  [row['bdd_nodes'] for row in rows],
+                  [row['timed_out'] for row in rows])
+    return estimator
+
+
+def parse_time(value: Optional[str]) -> Optional[float]:
+    """Parse a time column of the results. Timeouts are considered as the whole budget: the one
+    of the cell (e.g., 'Timeout (600s)'), or TIMEOUT for the historical results without it."""
+    if value is None or value == '':
+        return None
+    match = TIMEOUT_REGEX.match(value)
+    if match is not None:
+        return float(match.group(1)) if match.group(1) is not None else float(TIMEOUT)
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def is_timeout(value: Optional[str]) -> bool:
+    return value is not None and TIMEOUT_REGEX.match(value) is not None
+
+
+def parse_times(row: dict[str, str], columns: list[str]) -> Optional[list[float]]:
+    """Parse the time columns of the stages of a results row (in the order of the stages).
+
+    The stages after a timeout are not run: their blank times are taken as the budget of the
+    timeout. Return None if a time is missing otherwise (e.g., errors).
+    """
+    times = []
+    budget = None
+    for column in columns:
+        time = parse_time(row.get(column))
+        if time is None:
+            if budget is None:
+                return None
+            time = budget
+        elif is_timeout(row.get(column)):
+            budget = time
+        times.append(time)
+    return times
+
+
+def dot(a: list[float], b: list[float]) -> float:
+    return sum(x * y for x, y in zip(a, b))
+
+
+def least_squares(x: list[list[float]], y: list[float], ridge: float = RIDGE) -> list[float]:
+    """Solve the (ridge regularized) least squares problem by the normal equations."""
+    if not x:
+        raise ValueError('No data to fit the estimator.')
+    n = len(x[0])
+    a = [[sum(row[i] * row[j] for row in x) + (ridge if i == j else 0.0) for j in range(n)]
+         for i in range(n)]
+    b = [sum(row[i] * yi for row, yi in zip(x, y)) for i in range(n)]
+    # Gaussian elimination with partial pivoting
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(a[r][col]))
+        a[col], a[pivot] = a[pivot], a[col]
+        b[col], b[pivot] = b[pivot], b[col]
+        for r in range(col + 1, n):
+            factor = a[r][col] / a[col][col]
+            for c in range(col, n):
+                a[r][c] -= factor * a[col][c]
+            b[r] -= factor * b[col]
+    coefficients = [0.0] * n
+    for r in reversed(range(n)):
+        coefficients[r] = (b[r] - sum(a[r][c] * coefficients[c] for c in range(r + 1, n))) / a[r][r]
+    return coefficients
+
+
+def sigmoid(t: float) -> float:
+    if t >= 0:
+        return 1 / (1 + math.exp(-t))
+    e = math.exp(t)
+    return e / (1 + e)
+
+
+def logistic_regression(x: list[list[float]], y: list[float],
+                        iterations: int = LOGISTIC_ITERATIONS, ridge: float = RIDGE) -> list[float]:
+    """Fit a (ridge regularized) logistic regression by iteratively reweighted least squares."""
+    coefficients = [0.0] * len(x[0])
+    for _ in range(iterations):
+        etas = [dot(coefficients, xi) for xi in x]
+        probabilities = [sigmoid(eta) for eta in etas]
+        weights = [max(p * (1 - p), 1e-9) for p in probabilities]
+        # Weighted least squares of the working response
+        sqrt_weights = [math.sqrt(w) for w in weights]
+        x_weighted = [[sw * v for v in xi] for sw, xi in zip(sqrt_weights, x)]
+        z_weighted = [sw * (eta + (yi - p) / w)
+                      for sw, eta, yi, p, w in zip(sqrt_weights, etas, y, probabilities, weights)]
+        new_coefficients = least_squares(x_weighted, z_weighted, ridge)
+        converged = max(abs(a - b) for a, b in zip(new_coefficients, coefficients)) < 1e-6
+        coefficients = new_coefficients
+        if converged:
+            break
+    return coefficients
+
+
+def residual_sigma(x: list[list[float]], y: list[float], coefficients: list[float]) -> float:
+    """Standard deviation of the residuals of the fitting."""
+    if not y:
+        return 0.0
+    residuals = [yi - dot(coefficients, xi) for xi, yi in zip(x, y)]
+    return math.sqrt(sum(r * r for r in residuals) / len(residuals))
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description='Difficulty: Estimate the difficulty of building the BDD of a model before building it.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    parser_train = subparsers.add_parser('train', help='Train the estimator with historical results.')
+    parser_train.add_argument(metavar='results', dest='results', type=str, help='Historical results (.csv).')
+    parser_train.add_argument('-logic', metavar='logic_dir', dest='logic_dir', type=str, required=False, help='Directory with the .var and .exp files of the models.')
+    parser_train.add_argument('-o', metavar='output', dest='output', type=str, required=True, help='Output file (.json) for the estimator.')
+    parser_predict = subparsers.add_parser('predict', help='Predict the difficulty of a model.')
+    parser_predict.add_argument(metavar='estimator', dest='estimator', type=str, help='Estimator file (.json).')
+    parser_predict.add_argument('-var', metavar='varfile', dest='varfile', type=str, required=True, help='Input variable file (.var) of the model.')
+    parser_predict.add_argument('-exp', metavar='expfile', dest='expfile', type=str, required=True, help='Input expression file (.exp) of the model.')
+    args = parser.parse_args()
+
+    if args.command == 'train':
+        estimator = train(args.results, args.logic_dir)
+        estimator.save(args.output)
+        print(f'Estimator saved in {args.output} (time sigma: {estimator.time_sigma:.4f}, nodes sigma: {estimator.nodes_sigma:.4f}).')
+    else:
+        estimator = DifficultyEstimator.load(args.estimator)
+        metrics = get_model_metrics(args.varfile, args.expfile)
+        print(estimator.predict(metrics))
@@ -0,0 +1,190 @@
+import json
+import time
+import argparse
+import pathlib
+import logging
+from typing import Any, Optional
+
+import logic2bdd
+import dd_backend
+from logic2bdd import BDDException
+from utils import logic_reader, var_order, conjunction_schedule, utils
+
+
+LOGGER = logging.getLogger(__name__)
+
+TIMEOUT = 3600  # in seconds, 1 hour, for the whole family
+FAMILY_EXTENSION = '.family.json'
+FAMILY_BDD_EXTENSION = '.family.dddmp'
+
+
+class Version():
+    """Version of a model in a family: its variables, expressions and order of the variables."""
+
+    def __init__(self, name: str, variables: list[str], expressions: list[str], order: list[str]) -> None:
+        self.name = name
+        self.variables = variables
+        self.expressions = expressions
+        self.order = order
+        self.nodes: Optional[int] = None
+        self.configurations: Optional[int] = None
+
+
+class FamilyBDD():
+    """BDDs of the versions of a model family built in a shared BDD manager (a root per version).
+
+    The variables are the union of the variables of all versions, and the variables absent in a
+    version are false in its root, so that the configurations of the versions are comparable.
+    The common sub-structure of the versions is stored only once.
+    """
+
+    def __init__(self, builder: dd_backend.DDBuilder, versions: list[Version], roots: list[Any]) -> None:
+        self.builder = builder
+        self.versions = versions
+        self.roots = roots
+        self.variables = builder.variables
+
+    def nodes(self) -> int:
+        """Number of nodes of the shared BDD (all roots)."""
+        return _shared_size(self.roots)
+
+    def configurations(self, index: int) -> int:
+        return self.builder.count(self.roots[index])
+
+    def diff(self, old: int, new: int) -> tuple[int, int]:
+        """Number of configurations added and removed from the old version to the new version."""
+        added = self.builder.count(self.roots[new] & ~self.roots[old])
+        removed = self.builder.count(self.roots[old] & ~self.roots[new])
+        return (added, removed)
+
+    def save(self, filepath: str) -> None:
+        """Dump the shared BDD in a multi-root .dddmp file and its description in a .json file."""
+        bdd_filepath = filepath.removesuffix(FAMILY_EXTENSION) + FAMILY_BDD_EXTENSION
+        nodes = self.builder.dump_roots(self.roots, bdd_filepath, [v.name for v in self.versions])
+        data = {'bdd': bdd_filepath, 'nodes': nodes, 'variables': self.variables,
+                'versions': [{'name': v.name, 'variables': len(v.variables), 'nodes': v.nodes,
+                              'configurations': utils.int2str(v.configurations)} for v in self.versions]}
+        with open(filepath, 'w', encoding='utf8') as file:
+            json.dump(data, file, indent=1)
+
+
+def _shared_size(roots: list[Any]) -> int:
+    """Number of nodes reachable from the roots (including the constant node)."""
+    visited = set()
+    stack = [~root if root.negated else root for root in roots]
+    while stack:
+        node = stack.pop()
+        if int(node) in visited:
+            continue
+        visited.add(int(node))
+        if node.var is not None:
+            for child in (node.high, node.low):
+                stack.append(~child if child.negated else child)
+    return len(visited)
+
+
+def group_families(fm_filepaths: list[str]) -> dict[str, list[str]]:
+    """Group the models by family, with the versions of each family sorted."""
+    families: dict[str, list[str]] = {}
+    for fm_filepath in fm_filepaths:
+        families.setdefault(utils.family_name(fm_filepath), []).append(fm_filepath)
+    return {name: sorted(versions, key=utils.version_key) for name, versions in families.items()}
+
+
+def read_version(fm_filepath: str, order_method: str = 'dfs') -> Optional[Version]:
+    """Transform a version to logic in-process (secure names, no simplification).
+
+    Return None if it is not a Boolean FM.
+    """
+    from flamapy.metamodels.fm_metamodel.transformations import FMSecureFeaturesNames
+    from flamapy.metamodels.fm_metamodel.operations import FMLanguageLevel, MajorLevel
+    from utils import fm_cache
+    from utils.pl_writer import to_exp
+
+    fm = fm_cache.read_feature_model(fm_filepath)
+    language_level = FMLanguageLevel().execute(fm).get_result()
+    if language_level.major != MajorLevel.BOOLEAN:
+        LOGGER.warning('Skipped non-Boolean FM %s (level: %s).', fm_filepath, language_level)
+        return None
+    fmsfn = FMSecureFeaturesNames(fm)
+    secure_fm = fmsfn.transform()
+    variables = list(fmsfn.mapping_names.values())
+    expressions = to_exp(secure_fm)
+    order = var_order.complete_order(var_order.dfs_order(secure_fm), variables)
+    if order_method in ('force', 'span'):
+        expressions_vars = [logic_reader.get_expression_variables(exp) for exp in expressions]
+        order = var_order.force_order(variables, expressions_vars, order)
+        if order_method == 'span':
+            order = var_order.span_order(variables, expressions_vars, order)
+    return Version(pathlib.Path(fm_filepath).stem, variables, expressions, order)
+
+
+def build_family(fm_filepaths: list[str],
+                 timeout: int = TIMEOUT,
+                 order_method: str = 'dfs',
+                 schedule: str = conjunction_schedule.BUCKET_SCHEDULE) -> Optional[FamilyBDD]:
+    """Build the BDDs of the versions of a family in a shared BDD manager.
+
+    The variables are declared in the union of the orders of the versions (see
+    var_order.union_order), and each version is a root of the manager.
+    Return None if the timeout is exceeded.
+    """
+    if order_method not in logic2bdd.ORDER_HEURISTICS:
+        raise BDDException(f'Unknown ordering heuristic: {order_method}.')
+    deadline = time.monotonic() + timeout
+    versions = [v for v in (read_version(fm_filepath, order_method) for fm_filepath in fm_filepaths) if v is not None]
+    variables = var_order.union_order([v.order for v in versions])
+    LOGGER.debug('Family of %s versions with %s variables.', len(versions), len(variables))
+    builder = dd_backend.DDBuilder(variables)
+    roots = []
+    for version in versions:
+        root = builder.conjoin(version.expressions, schedule, deadline)
+        if root is None:
+            return None
+        version_vars = set(version.variables)
+        absent = {var: False for var in variables if var not in version_vars}
+        if absent:
+            root &= builder.bdd.cube(absent)
+        roots.append(root)
+        version.nodes = root.dag_size
+        version.configurations = builder.count(root)
+        LOGGER.debug('Version %s: %s nodes, %s configurations.', version.name, version.nodes, version.configurations)
+    return FamilyBDD(builder, versions, roots)
+
+
+def build_families(dirpath: str,
+                   timeout: int = TIMEOUT,
+                   order_method: str = 'dfs',
+                   schedule: str = conjunction_schedule.BUCKET_SCHEDULE) -> dict[str, Optional[FamilyBDD]]:
+    """Build and save the family BDD of each family of models of the directory."""
+    results = {}
+    dir = pathlib.Path(dirpath)
+    pathlib.Path(dir.parent / 'bdd').mkdir(parents=True, exist_ok=True)
+    for name, fm_filepaths in group_families(utils.get_filepaths(dirpath, ['uvl'])).items():
+        LOGGER.info('Building family %s (%s versions)...', name, len(fm_filepaths))
+        family = build_family(fm_filepaths, timeout, order_method, schedule)
+        if family is None:
+            LOGGER.warning('Timeout building family %s.', name)
+        else:
+            family.save(str(dir.parent / f'bdd/{name}{FAMILY_EXTENSION}'))
+        results[name] = family
+    return results
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description='Family mode: Build the BDDs of the versions of each model family in a shared BDD manager (multi-root .dddmp).')
+    parser.add_argument(metavar='path', dest='path', type=str, help='Directory with the versions of the models (.uvl), named <family>-<version>.')
+    parser.add_argument('-order', metavar='method', dest='order', type=str, required=False, default='dfs', choices=logic2bdd.ORDER_HEURISTICS, help='Variable ordering heuristic of each version (default: dfs).')
+    parser.add_argument('-schedule', metavar='schedule', dest='schedule', type=str, required=False, default=conjunction_schedule.BUCKET_SCHEDULE, choices=conjunction_schedule.SCHEDULES, help='Order to conjoin the expressions (default: bucket).')
+    args = parser.parse_args()
+
+    for name, family in build_families(args.path, TIMEOUT, args.order, args.schedule).items():
+        if family is None:
+            continue
+        print(f'Family {name}: {len(family.versions)} versions, {len(family.variables)} variables, {family.nodes()} shared nodes ({sum(v.nodes for v in family.versions)} without sharing).')
+        print(f'{"Version":<50} {"Variables":>9} {"Nodes":>9} {"Configurations":>15} {"Added":>10} {"Removed":>10}')
+        for i, version in enumerate(family.versions):
+            added, removed = family.diff(i - 1, i) if i > 0 else (version.configurations, 0)
+            print(f'{version.name:<50} {len(version.variables):>9} {version.nodes:>9} {utils.int2sci(version.configurations):>15} {utils.int2sci(added):>10} {utils.int2sci(removed):>10}')
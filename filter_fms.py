@@ -4,9 +4,6 @@ import pathlib
 import logging
 from collections import defaultdict
 
-from flamapy.core.exceptions import FlamaException
-from flamapy.metamodels.fm_metamodel.transformations import UVLReader, UVLWriter
-
 
 OUTPUT_PATH = pathlib.Path('uvl')
 
@@ -23,6 +20,10 @@ def get_filepaths(dir: str, extensions_filter: list[str] = []) -> list[str]:
 
 
 def filter_models(dirpath: str) -> None:
+    from flamapy.core.exceptions import FlamaException
+    from flamapy.metamodels.fm_metamodel.transformations import UVLWriter
+    from utils import fm_cache
+
     total_models = 0
     models_with_errors = []
     for i, fm_filepath in enumerate(get_filepaths(dirpath, ['uvl'])):
@@ -30,7 +31,7 @@ def filter_models(dirpath: str) -> None:
         path = pathlib.Path(fm_filepath)
         filename = path.stem
         try:
-            fm = UVLReader(fm_filepath).transform()
+            fm = fm_cache.read_feature_model(fm_filepath)
             new_filepath = str(OUTPUT_PATH / f'{filename}.uvl')
             UVLWriter(new_filepath, fm).transform()
             print()
@@ -1,8 +1,11 @@
 import pathlib
+from typing import Optional
 
 from flamapy.metamodels.fm_metamodel.models import FeatureModel
 from flamapy.metamodels.fm_metamodel.transformations import FMSecureFeaturesNames
 from utils.pl_writer import PLWriter
+from utils.fm_simplifier import FMSimplifier
+from utils import tracing
 
 
 def create_mapping_variables_file(mapping_names: dict[str, str], filepath: str) -> None:
@@ -11,6 +14,33 @@ def create_mapping_variables_file(mapping_names: dict[str, str], filepath: str)
             f.write(f'{k},{v}\n')
 
 
+def read_mapping_variables_file(filepath: str) -> dict[str, str]:
+    mapping_names = {}
+    with open(filepath, 'r', encoding='utf8') as f:
+        for line in f:
+            if line.strip():
+                k, v = line.rstrip('\n').rsplit(',', 1)
+                mapping_names[k] = v
+    return mapping_names
+
+
+def create_simplification_file(mapping_features: dict[str, Optional[str]], filepath: str) -> None:
+    """Write the representative variable of each variable (empty for dead features)."""
+    with open(filepath, 'w', encoding='utf8') as f:
+        for k, v in mapping_features.items():
+            f.write(f'{k},{"" if v is None else v}\n')
+
+
+def read_simplification_file(filepath: str) -> dict[str, Optional[str]]:
+    mapping_features = {}
+    with open(filepath, 'r', encoding='utf8') as f:
+        for line in f:
+            if line.strip():
+                k, v = line.rstrip('\n').split(',')
+                mapping_features[k] = v if v else None
+    return mapping_features
+
+
 def create_variables_file(variables: list[str], filepath: str) -> None:
     with open(filepath, 'w', encoding='utf8') as f:
         f.write(' '.join(var for var in variables))
@@ -20,18 +50,23 @@ def create_expressions_file(fm: FeatureModel, filepath: str) -> None:
     PLWriter(filepath, fm).transform()
 
 
-def fm2logic(fm_filepath: str, fm: FeatureModel) -> tuple[str, str, str]:
-    """Transform a FM into logic.
-    
-    Return the var and exp files, and optionally the securevars file.
+def fm2logic_model(fm_filepath: str, fm: FeatureModel, simplify: bool = False) -> tuple[FeatureModel, str, Optional[str]]:
+    """Transform a FM into its logic FM, whose features are the variables (secure names).
+
+    If simplify is True, the FM is simplified (see FMSimplifier), and the mapping of the variables
+    to their representatives is written in a .simplification file. The variables are written in
+    the .var file, but not the expressions (see fm2logic).
+
+    Return the logic FM, the var file, and optionally the securevars file.
     """
     path = pathlib.Path(fm_filepath)
     filename = path.stem
     dir = path.parent
 
-    fmsfn = FMSecureFeaturesNames(fm)
-    secure_fm = fmsfn.transform()
-    mapping_names = fmsfn.mapping_names
+    with tracing.span(tracing.SECURE_NAMING):
+        fmsfn = FMSecureFeaturesNames(fm)
+        secure_fm = fmsfn.transform()
+        mapping_names = fmsfn.mapping_names
     securevars_filepath = None
     
     pathlib.Path(dir.parent / 'logic').mkdir(parents=True, exist_ok=True)
@@ -39,8 +74,26 @@ def fm2logic(fm_filepath: str, fm: FeatureModel) -> tuple[str, str, str]:
         securevars_filepath = str(dir.parent / f'logic/{filename}.securevars')
         create_mapping_variables_file(mapping_names, securevars_filepath)
         
+    variables = list(mapping_names.values())
+    if simplify:
+        with tracing.span(tracing.SIMPLIFICATION):
+            simplifier = FMSimplifier(secure_fm)
+            secure_fm = simplifier.transform()
+        create_simplification_file(simplifier.mapping_features, str(dir.parent / f'logic/{filename}.simplification'))
+        variables = [feature.name for feature in secure_fm.get_features()]
+
     var_filepath = str(dir.parent / f'logic/{filename}.var')
-    exp_filepath = str(dir.parent / f'logic/{filename}.exp')
-    create_variables_file(list(mapping_names.values()), var_filepath)
-    create_expressions_file(secure_fm, exp_filepath)
+    create_variables_file(variables, var_filepath)
+    return (secure_fm, var_filepath, securevars_filepath)
+
+
+def fm2logic(fm_filepath: str, fm: FeatureModel, simplify: bool = False) -> tuple[str, str, Optional[str]]:
+    """Transform a FM into logic (see fm2logic_model) and write its expressions in a .exp file.
+
+    Return the var and exp files, and optionally the securevars file.
+    """
+    logic_fm, var_filepath, securevars_filepath = fm2logic_model(fm_filepath, fm, simplify)
+    exp_filepath = str(pathlib.Path(var_filepath).with_suffix('.exp'))
+    with tracing.span(tracing.EXPRESSION_WRITING):
+        create_expressions_file(logic_fm, exp_filepath)
     return (var_filepath, exp_filepath, securevars_filepath)
@@ -4,8 +4,10 @@ import pathlib
 import logging
 import subprocess
 from enum import Enum, auto
+from typing import Optional
 
-from utils.utils import get_filepaths
+from utils.utils import get_filepaths, family_name, version_key
+from utils import logic_reader, var_order, conjunction_schedule
 
 
 #logging.basicConfig(filename='logic2bdd.log', encoding='utf-8', level=logging.DEBUG)
@@ -26,6 +28,18 @@ FASTORDER = '../bdds/bin/fastOrder'
 LOGIC2BDD = '../bdds/bin/Logic2BDD'
 REORDER = '../bdds/bin/reorder'
 
+# fastOrder settings
+FASTORDER_OPTIONS = ['-nosubexp', '-sifting']  # These options are fine for models without numerical constraints
+FASTORDER_OPTIONS_LARGE = ['-perm', '-window', '8']  # Large FMs whose BDD cannot be build the normal setting
+
+# Variable ordering methods: the fastOrder tool or the in-process heuristics
+FASTORDER_METHOD = 'fastorder'
+ORDER_HEURISTICS = ['dfs', 'force', 'span']
+REUSE_METHOD = 'reuse'  # Order of the nearest previously built version of the model (fastOrder as fallback)
+REUSE_MIN_SIMILARITY = 0.5  # Minimum similarity (Jaccard) of the variables to reuse the order of another family
+ORDER_SUFFIX = '-neworder'
+REDUCED_SUFFIX = '-reduced'  # BDD with the eliminated variables projected out (see reduce_size)
+
 
 class ReorderMethod(Enum):
     CUDD_REORDER_SAME = auto()
@@ -56,7 +70,7 @@ def reorder_bdd(bdd_file: str, method: ReorderMethod, timeout: int = TIMEOUT) ->
     outputfile = str(dir / f'{filename}-method.var')
 
     command = ['timeout', str(timeout), REORDER, method.name, bdd_file, outputfile] 
-    logging.debug(f'Executing command: {command}')
+    logging.debug('Executing command: %s', command)
     process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
     process.wait()
     if not pathlib.Path(outputfile).exists():
@@ -64,19 +78,16 @@ def reorder_bdd(bdd_file: str, method: ReorderMethod, timeout: int = TIMEOUT) ->
     return outputfile
 
 
-def get_initial_order(varfile: str, expfile: str, timeout: int = TIMEOUT) -> str:
+def get_initial_order(varfile: str, expfile: str, timeout: int = TIMEOUT, options: list[str] = FASTORDER_OPTIONS) -> str:
     """Given the variables and expressions files, return the initial order of the variables in a 
     <<file>>-sifting.var file."""
     path = pathlib.Path(varfile)
     filename = path.stem
     dir = path.parent
-    outputfile1 = str(dir / f'{filename}-neworder.var')
+    outputfile1 = str(dir / f'{filename}{ORDER_SUFFIX}.var')
 
-    # Normal setting
-    command = ['timeout', str(timeout), FASTORDER, '-nosubexp', '-sifting', varfile, expfile, outputfile1]  # These options are fine for models without numerical constraints
-    # Large FMs whose BDD cannot be build the normal setting
-    #command = ['timeout', str(timeout), FASTORDER, '-perm', '-window', '8', varfile, expfile, outputfile1]
-    logging.debug(f'Executing command: {command}')
+    command = ['timeout', str(timeout), FASTORDER] + options + [varfile, expfile, outputfile1]
+    logging.debug('Executing command: %s', command)
     process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
     process.wait()
     if not pathlib.Path(outputfile1).exists():
@@ -95,19 +106,154 @@ def get_initial_order(varfile: str, expfile: str, timeout: int = TIMEOUT) -> str
     return outputfile1
 
 
-def build_bdd(varfile: str, expfile: str, orderfile: str, timeout: int = TIMEOUT) -> str:
-    """Build the BDD using the given variables, expressions and order files."""
+def get_heuristic_order(varfile: str, expfile: str, heuristic: str, tree_order: Optional[list[str]] = None) -> str:
+    """Given the variables and expressions files, return the order of the variables computed by
+    an in-process heuristic in a <<file>>-neworder.var file (same format as the fastOrder output).
+
+    The heuristics are:
+        - dfs: pre-order of the feature tree (tree_order) or, if not given, the order of first 
+          appearance of the variables in the expressions.
+        - force: FORCE heuristic (center of gravity of the expressions) starting from the dfs order.
+        - span: constraint-span minimization starting from the force order.
+    """
+    path = pathlib.Path(varfile)
+    filename = path.stem
+    dir = path.parent
+    outputfile = str(dir / f'{filename}{ORDER_SUFFIX}.var')
+
+    variables = logic_reader.read_variables(varfile)
+    expressions_vars = logic_reader.read_expressions_variables(expfile)
+    order = heuristic_order(variables, expressions_vars, heuristic, tree_order)
+    logic_reader.write_variables(order, outputfile)
+    return outputfile
+
+
+def heuristic_order(variables: list[str],
+                    expressions_vars: list[list[str]],
+                    heuristic: str,
+                    tree_order: Optional[list[str]] = None) -> list[str]:
+    """Order of the variables computed by an in-process heuristic from the variables of the
+    expressions (see get_heuristic_order)."""
+    if heuristic not in ORDER_HEURISTICS:
+        raise BDDException(f'Unknown ordering heuristic: {heuristic}.')
+    if tree_order is None:
+        tree_order = var_order.appearance_order(variables, expressions_vars)
+    order = var_order.complete_order(tree_order, variables)
+    if heuristic in ('force', 'span'):
+        order = var_order.force_order(variables, expressions_vars, order)
+    if heuristic == 'span':
+        order = var_order.span_order(variables, expressions_vars, order)
+    return order
+
+
+# Variables of the order files read by find_previous_order in this run: path -> (mtime, variables)
+_ORDER_VARIABLES: dict[str, tuple[int, frozenset[str]]] = {}
+
+
+def find_previous_order(varfile: str) -> Optional[str]:
+    """Return the order file of the nearest previously built version of the model, or None.
+
+    The candidates are the order files of the other models of the same folder whose BDD has been
+    built. The versions of the same family (see utils.family_name) are preferred (the other
+    candidates are only considered if there is none); among them, the one with the most similar
+    set of variables is chosen (at least REUSE_MIN_SIMILARITY for other families).
+    The variables of the candidates are kept in memory for the run, so each order file is read
+    once (unless it is modified).
+    """
+    path = pathlib.Path(varfile)
+    filename = path.stem
+    dir = path.parent
+    family = family_name(filename)
+    same_family, others = [], []
+    for orderfile in dir.glob(f'*{ORDER_SUFFIX}.var'):
+        name = orderfile.stem.removesuffix(ORDER_SUFFIX)
+        if name == filename or not (dir.parent / f'bdd/{name}.dddmp').exists():
+            continue
+        (same_family if family_name(name) == family else others).append(orderfile)
+    candidates = same_family or others
+    if not candidates:
+        return None
+    variables = set(logic_reader.read_variables(varfile))
+    min_similarity = 0.0 if same_family else REUSE_MIN_SIMILARITY
+    best_order, best_similarity = None, None
+    for orderfile in sorted(candidates):
+        order_vars = order_variables(orderfile)
+        similarity = len(variables & order_vars) / len(variables | order_vars) if variables | order_vars else 0
+        if similarity < min_similarity:
+            continue
+        if best_similarity is None or similarity > best_similarity:
+            best_order, best_similarity = str(orderfile), similarity
+    return best_order
+
+
+def order_variables(orderfile: pathlib.Path) -> frozenset[str]:
+    """Variables of an order file, read once per run (see find_previous_order)."""
+    key = str(orderfile.resolve())
+    mtime = orderfile.stat().st_mtime_ns
+    if key not in _ORDER_VARIABLES or _ORDER_VARIABLES[key][0] != mtime:
+        _ORDER_VARIABLES[key] = (mtime, frozenset(logic_reader.read_variables(str(orderfile))))
+    return _ORDER_VARIABLES[key][1]
+
+
+def get_reused_order(varfile: str, expfile: str) -> Optional[str]:
+    """Given the variables and expressions files, return the order of the nearest previously
+    built version of the model (see find_previous_order) projected onto its variables, in a
+    <<file>>-neworder.var file (same format as the fastOrder output).
+
+    The new variables are inserted next to the variables they share expressions with (see 
+    var_order.project_order). Return None if there is no previous version.
+    """
+    previous_orderfile = find_previous_order(varfile)
+    if previous_orderfile is None:
+        return None
+    path = pathlib.Path(varfile)
+    outputfile = str(path.parent / f'{path.stem}{ORDER_SUFFIX}.var')
+    LOGGER.debug('Reusing the order %s for %s.', previous_orderfile, varfile)
+    variables = logic_reader.read_variables(varfile)
+    expressions_vars = logic_reader.read_expressions_variables(expfile)
+    order = var_order.project_order(logic_reader.read_variables(previous_orderfile), variables, expressions_vars)
+    logic_reader.write_variables(order, outputfile)
+    return outputfile
+
+
+def schedule_expressions(expfile: str, orderfile: str, schedule: str) -> str:
+    """Reorder the expressions of the expressions file following the schedule (see 
+    utils.conjunction_schedule) under the order of the variables, in a <<file>>-scheduled.exp file.
+
+    Return the new expressions file (the same file for the file schedule).
+    """
+    if schedule == conjunction_schedule.FILE_SCHEDULE:
+        return expfile
+    path = pathlib.Path(expfile)
+    outputfile = str(path.parent / f'{path.stem}-scheduled.exp')
+    expressions = logic_reader.read_expressions(expfile)
+    order = logic_reader.read_variables(orderfile)
+    logic_reader.write_expressions(conjunction_schedule.schedule_expressions(expressions, order, schedule), outputfile)
+    return outputfile
+
+
+def build_bdd(varfile: str, 
+              expfile: str, 
+              orderfile: str, 
+              timeout: int = TIMEOUT, 
+              min_nodes: int = MIN_NODES,
+              schedule: str = conjunction_schedule.FILE_SCHEDULE) -> str:
+    """Build the BDD using the given variables, expressions and order files.
+    
+    With the file schedule, Logic2BDD reorders the expressions itself (CONSTRAINT_REORDER);
+    otherwise, the expressions file is written in the order of the schedule and no constraint
+    reordering option is given to Logic2BDD.
+    """
     path = pathlib.Path(varfile)
     filename = path.stem
     dir = path.parent
     pathlib.Path(dir.parent / 'bdd').mkdir(parents=True, exist_ok=True)
     outputfile = str(dir.parent / f'bdd/{filename}.dddmp')
+    expfile = schedule_expressions(expfile, orderfile, schedule)
+    constraint_reorder = ['-constraint-reorder', CONSTRAINT_REORDER] if schedule == conjunction_schedule.FILE_SCHEDULE else []
 
-    # Normal settings
-    command = ['timeout', str(timeout), LOGIC2BDD, '-out', outputfile, '-constraint-reorder', CONSTRAINT_REORDER, '-min-nodes', str(MIN_NODES), '-score', orderfile, varfile, expfile]
-    # Large FMs whose BDD cannot be build the normal setting
-    #command = ['timeout', str(timeout), LOGIC2BDD, '-out', outputfile, '-constraint-reorder', CONSTRAINT_REORDER, '-min-nodes', str(MIN_NODES), '-score', orderfile, varfile, expfile]
-    logging.debug(f'Executing command: {command}')
+    command = ['timeout', str(timeout), LOGIC2BDD, '-out', outputfile, *constraint_reorder, '-min-nodes', str(min_nodes), '-score', orderfile, varfile, expfile]
+    logging.debug('Executing command: %s', command)
     process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
     stdout, stderr = process.communicate()
     # s = stdout.strip().splitlines()[-1]
@@ -123,53 +269,96 @@ def build_bdd(varfile: str, expfile: str, orderfile: str, timeout: int = TIMEOUT
     return outputfile
 
 
-def reduce_size() -> None:
-    """Reduce the size of the BDD."""
-    pass
+def reduce_size(bdd_file: str,
+                variables: list[str],
+                outputfile: Optional[str] = None,
+                reordering: bool = True) -> tuple[str, int, int]:
+    """Reduce the size of the BDD by projecting out the given variables (e.g., abstract features
+    or auxiliary variables of the encoding).
 
+    The variables are existentially quantified, the remaining variables are reordered with
+    sifting, and the reduced BDD is written (by default, in a <<file>>-reduced.dddmp file) with
+    only the remaining variables, so that its configurations are the ones of the projection.
+    All the roots of multi-root files are reduced.
+    Return the reduced BDD file and the number of nodes before and after.
+    """
+    import dd_backend
+    from utils import dddmp
+
+    path = pathlib.Path(bdd_file)
+    outputfile = outputfile or str(path.parent / f'{path.stem}{REDUCED_SUFFIX}.dddmp')
+    table = dddmp.read_bdd(bdd_file)
+    unknown = set(variables) - set(table.order)
+    if unknown:
+        raise BDDException(f'Unknown variables to eliminate: {", ".join(sorted(unknown))}.')
+    builder, roots = dd_backend.load_table(table)
+    eliminated = set(variables)
+    roots = [builder.bdd.exist(eliminated, root) if eliminated else root for root in roots]
+    # New manager with only the remaining variables (in their current order)
+    reduced = dd_backend.DDBuilder([var for var in builder.order() if var not in eliminated])
+    roots = [builder.bdd.copy(root, reduced.bdd) for root in roots]
+    del builder
+    if reordering:
+        reduced.reorder()
+    nodes = reduced.dump_roots(roots, outputfile, table.root_names)
+    LOGGER.debug('Reduced BDD %s (%s variables eliminated): %s -> %s nodes.', bdd_file, len(eliminated), table.nodes(), nodes)
+    return (outputfile, table.nodes(), nodes)
 
-def build_models(dirpath: str) -> None:
+
+def build_models(dirpath: str, 
+                 order_method: str = FASTORDER_METHOD, 
+                 schedule: str = conjunction_schedule.FILE_SCHEDULE) -> None:
     total_models = 0
     models_with_errors = 0
     models_with_missing_files = 0
     models_filepaths = get_filepaths(dirpath, ['var'])
+    if order_method == REUSE_METHOD:
+        models_filepaths.sort(key=version_key)  # The previous versions are built first
     n_models = len(models_filepaths)
-    LOGGER.info(f'#Models to be processed: {n_models}')
+    LOGGER.info('#Models to be processed: %s', n_models)
     for i, varfile in enumerate(models_filepaths, 1):
-        LOGGER.debug(f'Processing model {varfile} ({i}/{n_models}, {round(i/n_models*100,2)}%).')
+        LOGGER.debug('Processing model %s (%s/%s, %.2f%%).', varfile, i, n_models, i / n_models * 100)
         total_models += 1
         path = pathlib.Path(varfile)
         filename = path.stem
         dir = path.parent
         expfile = str(dir / f'{filename}.exp')
         if not os.path.isfile(expfile):
-            LOGGER.warning(f'Expression file not found for {filename}. Skipped.')
+            LOGGER.warning('Expression file not found for %s. Skipped.', filename)
             models_with_missing_files += 1
         else:
             try:
-                build_model(varfile, expfile)
+                build_model(varfile, expfile, order_method, schedule)
             except (BDDException, Exception) as e:
                 models_with_errors += 1
-                LOGGER.error(f'BDD for {varfile} could not been generated. The following error was raised: {e}.')
+                LOGGER.error('BDD for %s could not been generated. The following error was raised: %s.', varfile, e)
 
-    LOGGER.info(f'#Models processed: {total_models}.')
-    LOGGER.info(f'#Models with errors: {models_with_errors}.')
-    LOGGER.info(f'#Models with missing files: {models_with_missing_files}')
+    LOGGER.info('#Models processed: %s.', total_models)
+    LOGGER.info('#Models with errors: %s.', models_with_errors)
+    LOGGER.info('#Models with missing files: %s', models_with_missing_files)
 
 
-def build_model(varfile: str, expfile: str) -> None:
-    LOGGER.debug(f'Getting initial order for files: {varfile}, {expfile}.')
-    orderfile = get_initial_order(varfile, expfile)
-    if not pathlib.Path(orderfile).exists():
-        LOGGER.error(f'Initial order could not been generated for {varfile}, {expfile}.')
+def build_model(varfile: str, 
+                expfile: str, 
+                order_method: str = FASTORDER_METHOD, 
+                schedule: str = conjunction_schedule.FILE_SCHEDULE) -> None:
+    LOGGER.debug('Getting initial order for files: %s, %s.', varfile, expfile)
+    if order_method == FASTORDER_METHOD:
+        orderfile = get_initial_order(varfile, expfile)
+    elif order_method == REUSE_METHOD:
+        orderfile = get_reused_order(varfile, expfile) or get_initial_order(varfile, expfile)
+    else:
+        orderfile = get_heuristic_order(varfile, expfile, order_method)
+    if orderfile is None or not pathlib.Path(orderfile).exists():
+        LOGGER.error('Initial order could not been generated for %s, %s.', varfile, expfile)
         raise BDDException(f'Initial order could not been generated.')
-    LOGGER.debug(f'Initial order generated: {orderfile}.')
-    LOGGER.debug(f'Building BDD for files: {varfile}, {expfile}, {orderfile}.')
-    bddfile = build_bdd(varfile, expfile, orderfile)
+    LOGGER.debug('Initial order generated: %s.', orderfile)
+    LOGGER.debug('Building BDD for files: %s, %s, %s.', varfile, expfile, orderfile)
+    bddfile = build_bdd(varfile, expfile, orderfile, schedule=schedule)
     if not pathlib.Path(bddfile).exists():
-        LOGGER.error(f'BDD could not been generated for {varfile}, {expfile}, {orderfile}.')
+        LOGGER.error('BDD could not been generated for %s, %s, %s.', varfile, expfile, orderfile)
         raise BDDException(f'BDD could not been generated.')
-    LOGGER.debug(f'BDD generated: {bddfile}.')
+    LOGGER.debug('BDD generated: %s.', bddfile)
 
 
 if __name__ == '__main__':
@@ -178,11 +367,20 @@ if __name__ == '__main__':
     parser.add_argument('-var', metavar='varfile', dest='varfile', type=str, required=False, help='Input variable file (.var) of the model.')
     parser.add_argument('-exp', metavar='expfile', dest='expfile', type=str, required=False, help='Input expression file (.exp) of the model.')
     parser.add_argument('-dir', metavar='dirpath', dest='dirpath', type=str, required=False, help='Input directory path with the .var and .exp files of the models.')
+    parser.add_argument('-order', metavar='method', dest='order', type=str, required=False, default=FASTORDER_METHOD, choices=[FASTORDER_METHOD, REUSE_METHOD] + ORDER_HEURISTICS, help='Variable ordering method (default: fastorder).')
+    parser.add_argument('-schedule', metavar='schedule', dest='schedule', type=str, required=False, default=conjunction_schedule.FILE_SCHEDULE, choices=conjunction_schedule.SCHEDULES, help='Order in which the expressions are given to Logic2BDD (default: file).')
+    parser.add_argument('-bdd', metavar='bddfile', dest='bddfile', type=str, required=False, help='BDD file (.dddmp or .bddb) to reduce by projecting out the variables of -eliminate.')
+    parser.add_argument('-eliminate', metavar='variable', dest='eliminate', type=str, nargs='+', required=False, default=[], help='Variables to eliminate from the BDD (or a file with a variable per line).')
     args = parser.parse_args()
 
-    if args.dirpath:
-        build_models(args.dirpath)
+    if args.bddfile:
+        if len(args.eliminate) == 1 and os.path.isfile(args.eliminate[0]):
+            args.eliminate = logic_reader.read_variables(args.eliminate[0])
+        bddfile, nodes_before, nodes_after = reduce_size(args.bddfile, args.eliminate)
+        print(f'Reduced BDD file: {bddfile} ({nodes_before} -> {nodes_after} nodes)')
+    elif args.dirpath:
+        build_models(args.dirpath, args.order, args.schedule)
     elif args.varfile and args.expfile:
-        build_model(args.varfile, args.expfile)
+        build_model(args.varfile, args.expfile, args.order, args.schedule)
     else:
         raise Exception('Invalid arguments.')
\ No newline at end of file
@@ -4,6 +4,7 @@ import argparse
 import pathlib
 import logging
 import subprocess
+from typing import Optional
 
 from utils.utils import get_filepaths
 
@@ -65,9 +66,10 @@ def build_bdd(varfile: str, expfile: str, orderfile: str, timeout: int = TIMEOUT
     return outputfile
 
 
-def reduce_size() -> None:
-    """Reduce the size of the BDD."""
-    pass
+def reduce_size(bdd_file: str, variables: list[str], outputfile: Optional[str] = None) -> tuple[str, int, int]:
+    """Reduce the size of the BDD by projecting out the given variables (see logic2bdd.reduce_size)."""
+    import logic2bdd
+    return logic2bdd.reduce_size(bdd_file, variables, outputfile)
 
 
 def build_models(dirpath: str) -> None:
@@ -0,0 +1,272 @@
+import os
+import io
+import sys
+import json
+import pathlib
+import logging
+import argparse
+import threading
+import socketserver
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterable, Optional, TextIO
+
+import dd_backend
+
+
+LOGGER = logging.getLogger(__name__)
+
+MAX_MEMORY = 2 ** 30  # in bytes (1 GiB) of loaded BDDs
+NODE_BYTES = 64  # Estimated memory of a loaded BDD node (CUDD node, unique table and overheads)
+HTTP_PORT = 8765
+
+# Queries
+VALID_QUERY = 'valid'  # Whether the partial configuration can be extended to a valid configuration
+COUNT_QUERY = 'count'  # Number of valid configurations that extend the partial configuration
+QUERIES = [VALID_QUERY, COUNT_QUERY]
+
+
+class QueryError(Exception):
+    pass
+
+
+class BDDQueryModel():
+    """BDD of a model loaded in memory to answer queries about partial configurations.
+
+    The partial configurations are given with the original feature names, which are mapped to
+    the variables of the BDD with the .securevars file (secure names) and the .simplification
+    file (representative variables of the simplified features) of the model, if they exist.
+    """
+
+    def __init__(self, bdd_filepath: str,
+                 securevars_filepath: Optional[str] = None,
+                 simplification_filepath: Optional[str] = None) -> None:
+        from flamapy.metamodels.bdd_metamodel.transformations import DDDMPReader
+        import fm2logic
+
+        bdd_model = DDDMPReader(bdd_filepath).transform()
+        self.bdd_filepath = bdd_filepath
+        self.bdd = bdd_model.bdd
+        self.root = bdd_model.root
+        self.variables = set(bdd_model.vars_order)
+        self.nvars = len(bdd_model.vars_order)
+        self.mapping_names = (fm2logic.read_mapping_variables_file(securevars_filepath)
+                              if securevars_filepath is not None else {})
+        self.mapping_features = (fm2logic.read_simplification_file(simplification_filepath)
+                                 if simplification_filepath is not None else {})
+        self.memory = len(self.bdd) * NODE_BYTES
+        self.lock = threading.Lock()  # The BDD managers are not thread safe
+
+    @staticmethod
+    def load(bdd_filepath: str) -> 'BDDQueryModel':
+        """Load the BDD with the mapping files written by fm2logic next to it (logic folder)."""
+        path = pathlib.Path(bdd_filepath)
+        logic_dir = path.parent.parent / 'logic'
+        securevars_filepath = logic_dir / f'{path.stem}.securevars'
+        simplification_filepath = logic_dir / f'{path.stem}.simplification'
+        return BDDQueryModel(bdd_filepath,
+                             str(securevars_filepath) if securevars_filepath.exists() else None,
+                             str(simplification_filepath) if simplification_filepath.exists() else None)
+
+    def assignment(self, configuration: dict[str, bool]) -> Optional[dict[str, bool]]:
+        """Return the values of the variables of the BDD for the partial configuration, or None
+        if the configuration is contradictory (e.g., a dead feature is selected)."""
+        values: dict[str, bool] = {}
+        for name, value in configuration.items():
+            var = self.mapping_names.get(name, name)
+            if var in self.mapping_features:
+                var = self.mapping_features[var]
+                if var is None:  # Dead feature
+                    if value:
+                        return None
+                    continue
+            if var not in self.variables:
+                raise QueryError(f'Unknown feature: {name}.')
+            if values.get(var, value) != value:
+                return None
+            values[var] = bool(value)
+        return values
+
+    def count(self, configuration: Optional[dict[str, bool]] = None) -> int:
+        """Number of configurations that extend the partial configuration."""
+        values = self.assignment(configuration or {})
+        if values is None:
+            return 0
+        with self.lock:
+            node = self.bdd.let(values, self.root) if values else self.root
+            return dd_backend.exact_count(self.bdd, node, self.nvars - len(values))
+
+    def is_valid(self, configuration: dict[str, bool]) -> bool:
+        """Return whether the partial configuration can be extended to a valid configuration."""
+        values = self.assignment(configuration)
+        if values is None:
+            return False
+        with self.lock:
+            node = self.bdd.let(values, self.root) if values else self.root
+            return node != self.bdd.false
+
+
+class BDDCache():
+    """Least recently used cache of loaded BDDs, bounded by their estimated memory.
+
+    A BDD is loaded again if its file has been modified. The most recently used BDD is kept
+    even if it exceeds the maximum memory on its own.
+    """
+
+    def __init__(self, max_memory: int = MAX_MEMORY) -> None:
+        self.max_memory = max_memory
+        self.memory = 0
+        self._models: OrderedDict[str, tuple[int, BDDQueryModel]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, bdd_filepath: str) -> BDDQueryModel:
+        key = os.path.abspath(bdd_filepath)
+        mtime = os.stat(key).st_mtime_ns
+        with self._lock:
+            if key in self._models and self._models[key][0] == mtime:
+                self._models.move_to_end(key)
+                return self._models[key][1]
+            LOGGER.debug('Loading BDD %s.', bdd_filepath)
+            model = BDDQueryModel.load(bdd_filepath)
+            if key in self._models:
+                self.memory -= self._models.pop(key)[1].memory
+            self._models[key] = (mtime, model)
+            self.memory += model.memory
+            while self.memory > self.max_memory and len(self._models) > 1:
+                evicted, (_, evicted_model) = self._models.popitem(last=False)
+                self.memory -= evicted_model.memory
+                LOGGER.debug('Evicted BDD %s.', evicted)
+            return model
+
+    def __len__(self) -> int:
+        return len(self._models)
+
+
+class QueryService():
+    """Batched validity and counting queries of partial configurations over resident BDDs.
+
+    A request is a dict with the BDD file (bdd), the query (valid or count) and a list of partial
+    configurations (dicts feature -> bool). The response has a result per configuration.
+    """
+
+    def __init__(self, max_memory: int = MAX_MEMORY) -> None:
+        self.cache = BDDCache(max_memory)
+
+    def valid(self, bdd_filepath: str, configurations: list[dict[str, bool]]) -> list[bool]:
+        model = self.cache.get(bdd_filepath)
+        return [model.is_valid(configuration) for configuration in configurations]
+
+    def count(self, bdd_filepath: str, configurations: list[dict[str, bool]]) -> list[int]:
+        model = self.cache.get(bdd_filepath)
+        return [model.count(configuration) for configuration in configurations]
+
+    def query(self, request: Any) -> dict[str, Any]:
+        """Answer a request. Any error of the request (e.g., a malformed request or a corrupt
+        BDD file) is returned as the error of the response."""
+        try:
+            query, bdd_filepath, configurations = parse_request(request)
+            if query == VALID_QUERY:
+                results: list[Any] = self.valid(bdd_filepath, configurations)
+            else:
+                results = self.count(bdd_filepath, configurations)
+            return {'results': results}
+        except (QueryError, OSError) as e:
+            return {'error': str(e)}
+        except Exception as e:
+            LOGGER.error('Error answering the request %s: %s', request, e)
+            return {'error': f'{type(e).__name__}: {e}'}
+
+    def serve(self, requests: Iterable[str], output: TextIO) -> None:
+        """Answer the requests (a JSON object per line) with a JSON line per request."""
+        for request in requests:
+            if not request.strip():
+                continue
+            try:
+                response = self.query(json.loads(request))
+            except ValueError as e:  # Invalid JSON
+                response = {'error': f'Invalid request: {e}'}
+            output.write(json.dumps(response) + '\n')
+            output.flush()
+
+
+def parse_request(request: Any) -> tuple[str, str, list[dict[str, bool]]]:
+    """Validate the shape of a request and return its query, BDD file and configurations."""
+    if not isinstance(request, dict):
+        raise QueryError('The request must be a JSON object.')
+    query = request.get('query', VALID_QUERY)
+    if query not in QUERIES:
+        raise QueryError(f'Unknown query: {query}.')
+    bdd_filepath = request.get('bdd')
+    if not isinstance(bdd_filepath, str):
+        raise QueryError('The BDD file is required.')
+    configurations = request.get('configurations', [{}])
+    if not isinstance(configurations, list):
+        raise QueryError('The configurations must be a list.')
+    for configuration in configurations:
+        if not isinstance(configuration, dict) or not all(isinstance(v, bool) for v in configuration.values()):
+            raise QueryError(f'Invalid configuration (a dict feature -> bool): {configuration}.')
+    return (query, bdd_filepath, configurations)
+
+
+class QueryStreamHandler(socketserver.StreamRequestHandler):
+    """Queries over a Unix socket: JSON lines as in QueryService.serve."""
+
+    def handle(self) -> None:
+        output = io.TextIOWrapper(self.wfile, encoding='utf8', write_through=True)
+        self.server.service.serve((line.decode('utf8') for line in self.rfile), output)
+
+
+class QueryHTTPHandler(BaseHTTPRequestHandler):
+    """Queries over HTTP: a JSON request per POST, answered with a JSON response."""
+
+    def do_POST(self) -> None:
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            response = self.server.service.query(json.loads(self.rfile.read(length)))
+        except ValueError as e:  # Invalid JSON or length
+            response = {'error': f'Invalid request: {e}'}
+        body = json.dumps(response).encode('utf8')
+        self.send_response(400 if 'error' in response else 200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        LOGGER.debug(format, *args)
+
+
+def serve_socket(socket_path: str, service: QueryService) -> None:
+    """Serve the queries of a Unix socket forever (a thread per connection)."""
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    with socketserver.ThreadingUnixStreamServer(socket_path, QueryStreamHandler) as server:
+        server.service = service
+        LOGGER.info('Query service listening on %s.', socket_path)
+        server.serve_forever()
+
+
+def serve_http(port: int, service: QueryService, host: str = '127.0.0.1') -> None:
+    """Serve the queries over HTTP on the local host forever (a thread per connection)."""
+    with ThreadingHTTPServer((host, port), QueryHTTPHandler) as server:
+        server.service = service
+        LOGGER.info('Query service listening on http://%s:%s.', host, port)
+        server.serve_forever()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description='Query service: answer validity and counting queries of partial configurations over resident BDDs (.dddmp).')
+    parser.add_argument('-socket', metavar='socket', dest='socket', type=str, required=False, help='Listen on a Unix socket (JSON lines).')
+    parser.add_argument('-port', metavar='port', dest='port', type=int, required=False, help=f'Listen on a local HTTP port (JSON POST requests, e.g., {HTTP_PORT}).')
+    parser.add_argument('-memory', metavar='MB', dest='memory', type=int, required=False, default=MAX_MEMORY // 2 ** 20, help=f'Maximum memory of the loaded BDDs in MB (default: {MAX_MEMORY // 2 ** 20}).')
+    args = parser.parse_args()
+
+    service = QueryService(args.memory * 2 ** 20)
+    if args.socket:
+        serve_socket(args.socket, service)
+    elif args.port:
+        serve_http(args.port, service)
+    else:
+        service.serve(sys.stdin, sys.stdout)
@@ -0,0 +1,31 @@
+import sys
+import pathlib
+from typing import Any, Callable
+
+import pytest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+
+# Model whose support has gaps: the declared variable B is not in the BDD (as an optional feature
+# without constraints under a core parent), so the support positions differ from the manager ids
+VARIABLES = ['A', 'B', 'C', 'D', 'E']
+EXPRESSION = 'A & (C | D) & (D -> E)'
+
+
+@pytest.fixture
+def cudd_dump(tmp_path: pathlib.Path) -> Callable[..., tuple[str, Any, Any]]:
+    """Write a BDD with the dump of dd.cudd (i.e., CUDD's Dddmp_cuddBddStore) in a
+    bdd/<<name>>.dddmp file. Return the file, the manager and the root."""
+    cudd = pytest.importorskip('dd.cudd')
+
+    def dump(variables: list[str] = VARIABLES, expression: str = EXPRESSION, name: str = 'model') -> tuple[str, Any, Any]:
+        bdd = cudd.BDD()
+        bdd.declare(*variables)
+        root = bdd.add_expr(expression)
+        (tmp_path / 'bdd').mkdir(exist_ok=True)
+        filepath = str(tmp_path / 'bdd' / f'{name}.dddmp')
+        bdd.dump(filepath, [root])
+        return (filepath, bdd, root)
+
+    return dump
@@ -0,0 +1,42 @@
+import json
+import itertools
+
+import pytest
+
+pytest.importorskip('dd.cudd')
+
+from utils import bdd_analysis, dddmp
+from utils.utils import str2int
+
+
+VARIABLES = ['A', 'B', 'C', 'D', 'E', 'F', 'G']
+EXPRESSION = 'A & (C | D) & (D <-> E) & !F & (G -> C)'  # B is free and not in the support
+
+
+def brute_force(bdd, root):
+    configurations = [values for values in itertools.product([False, True], repeat=len(VARIABLES))
+                      if bdd.let(dict(zip(VARIABLES, values)), root) == bdd.true]
+    frequencies = {var: sum(values[i] for values in configurations) for i, var in enumerate(VARIABLES)}
+    return (len(configurations), frequencies)
+
+
+def test_analyze_cudd_file(cudd_dump):
+    filepath, bdd, root = cudd_dump(VARIABLES, EXPRESSION)
+    count, frequencies = brute_force(bdd, root)
+
+    analysis = bdd_analysis.analyze(dddmp.read_bdd(filepath))
+    assert analysis.configurations == count
+    assert analysis.frequencies == frequencies
+    assert sorted(analysis.core) == [var for var in VARIABLES if frequencies[var] == count]
+    assert sorted(analysis.dead) == [var for var in VARIABLES if frequencies[var] == 0]
+    assert sorted(map(sorted, analysis.atomic_sets)) == [['D', 'E']]
+
+
+def test_analyze_file_cudd_file(cudd_dump):
+    filepath, bdd, root = cudd_dump(VARIABLES, EXPRESSION)
+    count, _ = brute_force(bdd, root)
+    with open(bdd_analysis.analyze_file(filepath), encoding='utf8') as file:
+        analysis = json.load(file)
+    assert str2int(analysis['configurations']) == count
+    assert analysis['core'] == ['A']
+    assert analysis['dead'] == ['F']
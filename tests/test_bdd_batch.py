@@ -0,0 +1,48 @@
+import itertools
+
+import numpy as np
+import pytest
+
+pytest.importorskip('dd.cudd')
+
+from utils import bdd_batch, dddmp
+from conftest import VARIABLES
+
+
+def all_configurations(bdd, root):
+    configurations = np.array(list(itertools.product([False, True], repeat=len(VARIABLES))), dtype=bool)
+    expected = np.array([bdd.let(dict(zip(VARIABLES, map(bool, row))), root) == bdd.true
+                         for row in configurations.tolist()])
+    return (configurations, expected)
+
+
+def test_evaluate_cudd_file(cudd_dump):
+    filepath, bdd, root = cudd_dump()
+    configurations, expected = all_configurations(bdd, root)
+    table = dddmp.read_bdd(filepath)
+    assert np.array_equal(bdd_batch.evaluate(table, configurations), expected)
+    assert np.array_equal(bdd_batch.evaluate(table, configurations, chunk_rows=5), expected)
+    permutation = [4, 2, 0, 3, 1]
+    assert np.array_equal(bdd_batch.evaluate(table, configurations[:, permutation], [VARIABLES[i] for i in permutation]),
+                          expected)
+
+
+def test_evaluate_file_cudd_file(cudd_dump, tmp_path):
+    filepath, bdd, root = cudd_dump()
+    (tmp_path / 'logic').mkdir()
+    (tmp_path / 'logic' / 'model.var').write_text(' '.join(VARIABLES) + '\n', encoding='utf8')
+    configurations, expected = all_configurations(bdd, root)
+    assert np.array_equal(bdd_batch.evaluate_file(filepath, configurations), expected)
+
+
+def test_evaluate_features_simplification(cudd_dump):
+    filepath, bdd, root = cudd_dump()
+    table = dddmp.read_bdd(filepath)
+    configurations, expected = all_configurations(bdd, root)
+    # Feature X merged with A (representative) and dead feature Y
+    features = VARIABLES + ['X', 'Y']
+    rows = np.array([row + list(extra) for row in configurations.tolist()
+                     for extra in itertools.product([False, True], repeat=2)], dtype=bool)
+    valid = bdd_batch.evaluate_features(table, rows, features, {}, {'X': 'A', 'Y': None})
+    expected_rows = np.repeat(expected, 4) & (rows[:, 5] == rows[:, 0]) & ~rows[:, 6]
+    assert np.array_equal(valid, expected_rows)
@@ -0,0 +1,42 @@
+import io
+import itertools
+
+import pytest
+
+pytest.importorskip('dd.cudd')
+
+from utils import bdd_enumerator, dddmp
+from conftest import VARIABLES
+
+
+def brute_force(bdd, root):
+    return sorted(values for values in itertools.product([0, 1], repeat=len(VARIABLES))
+                  if bdd.let(dict(zip(VARIABLES, map(bool, values))), root) == bdd.true)
+
+
+def test_configuration_chunks_cudd_file(cudd_dump):
+    filepath, bdd, root = cudd_dump()
+    table = dddmp.read_bdd(filepath)
+    rows = [tuple(row) for chunk in bdd_enumerator.configuration_chunks(table, chunk_rows=3) for row in chunk.tolist()]
+    assert table.order == VARIABLES
+    assert sorted(rows) == brute_force(bdd, root)
+
+
+def test_offset_limit_assignment_cudd_file(cudd_dump):
+    filepath, bdd, root = cudd_dump()
+    table = dddmp.read_bdd(filepath)
+    rows = [tuple(row) for chunk in bdd_enumerator.configuration_chunks(table) for row in chunk.tolist()]
+    sliced = [tuple(row) for chunk in bdd_enumerator.configuration_chunks(table, offset=2, limit=3) for row in chunk.tolist()]
+    assert sliced == rows[2:5]
+    assigned = [tuple(row) for chunk in bdd_enumerator.configuration_chunks(table, assignment={'C': False})
+                for row in chunk.tolist()]
+    assert sorted(assigned) == [row for row in brute_force(bdd, root) if row[VARIABLES.index('C')] == 0]
+
+
+def test_write_configurations_cudd_file(cudd_dump):
+    filepath, bdd, root = cudd_dump()
+    output = io.BytesIO()
+    n = bdd_enumerator.write_configurations(dddmp.read_bdd(filepath), output)
+    lines = output.getvalue().decode('utf8').splitlines()
+    assert n == len(brute_force(bdd, root)) == len(lines) - 1
+    assert lines[0] == ' '.join(VARIABLES)
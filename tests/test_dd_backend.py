@@ -0,0 +1,156 @@
+import pytest
+
+pytest.importorskip('dd.cudd')
+
+import dd_backend
+from utils import dddmp, conjunction_schedule
+from utils.bdd_analysis import frequencies
+from conftest import VARIABLES
+
+
+def test_dump_dddmp_as_cudd(cudd_dump, tmp_path):
+    filepath, bdd, root = cudd_dump()
+    outputfile = str(tmp_path / 'dump.dddmp')
+    dd_backend.dump_dddmp(bdd, VARIABLES, [root], outputfile)
+    with open(filepath, encoding='utf8') as expected, open(outputfile, encoding='utf8') as actual:
+        assert actual.read() == expected.read()
+
+
+def test_dd_written_file_loads_through_both_paths(cudd_dump):
+    from dd import cudd
+    filepath, bdd, root = cudd_dump()
+    expected = bdd.count(root, nvars=len(VARIABLES))
+
+    builder, roots = dd_backend.load_table(dddmp.read_dddmp(filepath))
+    assert builder.bdd.count(roots[0], nvars=len(VARIABLES)) == expected
+
+    other = cudd.BDD()
+    other.declare(*VARIABLES)
+    assert other.count(other.load(filepath)[0], nvars=len(VARIABLES)) == expected
+
+
+def test_dump_dddmp_multiple_roots_loads_in_cudd(cudd_dump, tmp_path):
+    from dd import cudd
+    _, bdd, root = cudd_dump()
+    other_root = bdd.add_expr('!A & !C & E')
+    outputfile = str(tmp_path / 'roots.dddmp')
+    dd_backend.dump_dddmp(bdd, VARIABLES, [root, other_root], outputfile, ['v1', 'v2'])
+
+    other = cudd.BDD()
+    other.declare(*VARIABLES)
+    assert other.count(other.load(outputfile)[0], nvars=len(VARIABLES)) == bdd.count(root, nvars=len(VARIABLES))  # dd loads the first root
+    builder, roots = dd_backend.load_table(dddmp.read_dddmp(outputfile))
+    assert [builder.bdd.count(u, nvars=len(VARIABLES)) for u in roots] == [bdd.count(u, nvars=len(VARIABLES)) for u in (root, other_root)]
+
+
+def test_count_exact():
+    variables = [f'x{i}' for i in range(300)]
+    builder = dd_backend.DDBuilder(variables)
+    assert builder.count(builder.expression('x0 or x299')) == 3 * 2 ** 298
+    assert builder.count(~builder.expression('x1 and not x7')) == 3 * 2 ** 298
+    assert builder.count(builder.bdd.false) == 0
+
+
+def test_build_bdd_from_fm(tmp_path):
+    pytest.importorskip('flamapy.metamodels.fm_metamodel')
+    from flamapy.metamodels.fm_metamodel.transformations import UVLReader
+    import fm2logic
+    (tmp_path / 'models').mkdir()
+    fm_filepath = tmp_path / 'models' / 'model.uvl'
+    fm_filepath.write_text('''features
+    R
+        optional
+            A
+            B
+        alternative
+            C
+            D
+constraints
+    A => C
+''', encoding='utf8')
+    logic_fm, var_filepath, _ = fm2logic.fm2logic_model(str(fm_filepath), UVLReader(str(fm_filepath)).transform())
+    builder, root = dd_backend.build_bdd_from_fm(logic_fm, str(tmp_path / 'bdd' / 'model.dddmp'))
+    assert builder.count(root) == 6
+    assert not (tmp_path / 'logic' / 'model.exp').exists()
+    assert frequencies(dddmp.read_dddmp(str(tmp_path / 'bdd' / 'model.dddmp')))[0] == 6
+
+
+def test_peak_nodes_of_intermediate_conjunctions():
+    variables = [f'x{i}' for i in range(10)]
+    equal = ' and '.join(f'(x{i} <-> x{i + 5})' for i in range(1, 5))
+    builder = dd_backend.DDBuilder(variables)
+    # A bucket (top variable x0) whose partial conjunction is larger than the final BDD
+    root = builder.conjoin([f'x0 or ({equal})', f'x0 or not ({equal})'])
+    assert root == builder.bdd.var('x0')
+    assert builder.peak_nodes >= builder.expression(f'x0 or ({equal})').dag_size
+
+
+@pytest.mark.parametrize('n', [60, 1100])
+def test_exact_count_above_double(n):
+    builder = dd_backend.DDBuilder([f'v{i}' for i in range(n)])
+    root = builder.bdd.false
+    for var in builder.variables:
+        root |= builder.bdd.var(var)
+    assert builder.count(root) == 2 ** n - 1
+    assert dd_backend.exact_count(builder.bdd, ~root) == 1
+    assert dd_backend.exact_count(builder.bdd, builder.bdd.let({'v0': False}, root), n - 1) == 2 ** (n - 1) - 1
+
+
+def test_build_bdd_from_fm_groups_and_xor(tmp_path):
+    pytest.importorskip('flamapy.metamodels.bdd_metamodel')
+    from flamapy.core.models.ast import AST, Node, ASTOperation
+    from flamapy.metamodels.fm_metamodel.models import Constraint
+    from flamapy.metamodels.fm_metamodel.transformations import UVLReader
+    from flamapy.metamodels.bdd_metamodel.transformations import FmToBDD
+    from flamapy.metamodels.bdd_metamodel.operations import BDDConfigurationsNumber
+    fm_filepath = tmp_path / 'model.uvl'
+    fm_filepath.write_text('''features
+    R
+        alternative
+            A
+            B
+            C
+        optional
+            D
+            E
+        [0..1]
+            F
+            G
+        [2..3]
+            H
+            I
+            J
+            K
+constraints
+    D => A
+''', encoding='utf8')
+    feature_model = UVLReader(str(fm_filepath)).transform()
+    feature_model.ctcs.append(Constraint('xor', AST(Node(ASTOperation.XOR, Node('E'), Node('H')))))
+    expected = BDDConfigurationsNumber().execute(FmToBDD(feature_model).transform()).get_result()
+    builder, root = dd_backend.build_bdd_from_fm(feature_model, str(tmp_path / 'bdd' / 'model.dddmp'))
+    assert builder.count(root) == expected == 120
+
+
+@pytest.mark.parametrize('schedule', [conjunction_schedule.FILE_SCHEDULE, conjunction_schedule.BUCKET_SCHEDULE])
+def test_resume_from_checkpoints(tmp_path, schedule):
+    variables = [f'x{i}' for i in range(8)]
+    expressions = ['x0 or x1', 'x1 -> x2', 'not (x2 and x3)', 'x3 XOR x4', 'x5 <-> (x6 or x7)', 'x7 -> x0']
+    outputfile = str(tmp_path / 'model.dddmp')
+    checkpoint_file = dd_backend.checkpoint_filepath(outputfile)
+    # Every run exceeds its (negative) timeout after one expression and saves a checkpoint
+    runs = 0
+    result = None
+    while result is None:
+        runs += 1
+        assert runs <= len(expressions) + 1
+        result = dd_backend.build_bdd_from_expressions(variables, expressions, outputfile, timeout=-1, schedule=schedule,
+                                                       checkpoint=True, resume=True)
+        if result is None:
+            assert dd_backend.read_checkpoint(checkpoint_file) is not None
+    assert runs > 1
+    builder, root = result
+    expected_builder, expected_root = dd_backend.build_bdd_from_expressions(variables, expressions, str(tmp_path / 'expected.dddmp'),
+                                                                            schedule=schedule)
+    assert builder.count(root) == expected_builder.count(expected_root)
+    assert builder.count(dd_backend.load_table(dddmp.read_dddmp(outputfile))[1][0]) == builder.count(root)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['expected.dddmp', 'model.dddmp']
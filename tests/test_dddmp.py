@@ -0,0 +1,29 @@
+import pytest
+
+pytest.importorskip('dd.cudd')
+
+from utils import dddmp
+from utils.bdd_analysis import frequencies
+from conftest import VARIABLES
+
+
+def test_read_dddmp_gapped_support(cudd_dump):
+    filepath, bdd, root = cudd_dump()
+    table = dddmp.read_dddmp(filepath)
+    assert table.variables == ['A', 'C', 'D', 'E']
+    assert table.order == VARIABLES
+    # Variable of each node as dd sees it, from the bottom-up node table
+    support_vars = {table.variables[v] for v in table.var.tolist() if v != dddmp.TERMINAL_VAR}
+    assert support_vars == bdd.support(root)
+    assert frequencies(table)[0] == bdd.count(root, nvars=len(VARIABLES))
+
+
+@pytest.mark.parametrize('compression', [dddmp.NO_COMPRESSION, dddmp.ZLIB_COMPRESSION])
+def test_convert_gapped_support(cudd_dump, tmp_path, compression):
+    filepath, bdd, root = cudd_dump()
+    binary_file = dddmp.convert(filepath, str(tmp_path / 'model.bddb'), compression)
+    table = dddmp.read_bdd(binary_file)
+    assert frequencies(table)[0] == bdd.count(root, nvars=len(VARIABLES))
+    text_file = dddmp.convert(binary_file, str(tmp_path / 'back.dddmp'))
+    with open(filepath, encoding='utf8') as expected, open(text_file, encoding='utf8') as actual:
+        assert actual.read().split('.nodes')[1] == expected.read().split('.nodes')[1]
@@ -0,0 +1,59 @@
+import pytest
+
+import decompose
+
+
+def test_product_count_above_double(cudd_dump):
+    pytest.importorskip('flamapy.metamodels.bdd_metamodel')
+    components = []
+    for c in range(2):
+        variables = [f'c{c}v{i}' for i in range(60)]
+        filepath, _, _ = cudd_dump(variables, ' | '.join(variables), f'model-c{c}')
+        component = decompose.Component(variables, [' or '.join(variables)])
+        component.bdd_filepath = filepath
+        component.configurations = 2 ** 60 - 1
+        components.append(component)
+    product = decompose.ProductBDD(components, ['free'])
+    assert product.count() == 2 * (2 ** 60 - 1) ** 2
+    assert product.count({'c0v0': False, 'c1v0': True, 'free': True}) == (2 ** 59 - 1) * 2 ** 59
+
+
+VARIABLES = ['R', 'A', 'B', 'C', 'D', 'E', 'F', 'G']
+EXPRESSIONS = ['R', 'A -> R', 'B -> R', 'A or B', 'C -> R', 'D -> R', 'C XOR D', 'E -> D', 'not G']
+
+
+def test_decompose_components():
+    components, free_variables = decompose.decompose(VARIABLES, EXPRESSIONS)
+    assert free_variables == ['F']
+    assert [c.variables for c in components] == [['R', 'G', 'A', 'B'], ['R', 'G', 'C', 'D', 'E']]
+    assert [c.expressions for c in components] == [['R', 'not G', 'A -> R', 'B -> R', 'A or B'],
+                                                   ['R', 'not G', 'C -> R', 'D -> R', 'C XOR D', 'E -> D']]
+
+
+def test_product_count_as_monolithic(tmp_path):
+    pytest.importorskip('dd.cudd')
+    pytest.importorskip('flamapy.metamodels.bdd_metamodel')
+    import dd_backend
+    from utils import logic_reader
+
+    builder, root = dd_backend.build_bdd_from_expressions(VARIABLES, EXPRESSIONS, str(tmp_path / 'model.dddmp'))
+    components, free_variables = decompose.decompose(VARIABLES, EXPRESSIONS)
+    for i, component in enumerate(components):
+        component.var_filepath = str(tmp_path / f'model-c{i}.var')
+        component.exp_filepath = str(tmp_path / f'model-c{i}.exp')
+        component.bdd_filepath = str(tmp_path / f'model-c{i}.dddmp')
+        logic_reader.write_variables(component.variables, component.var_filepath)
+        logic_reader.write_expressions(component.expressions, component.exp_filepath)
+        component_builder, component_root = dd_backend.build_bdd_from_expressions(component.variables, component.expressions,
+                                                                                  component.bdd_filepath)
+        component.nodes = component_root.dag_size
+        component.configurations = component_builder.count(component_root)
+    decompose.ProductBDD(components, free_variables).save(str(tmp_path / 'model.product.json'))
+
+    product = decompose.ProductBDD.load(str(tmp_path / 'model.product.json'))
+    assert len(product.components) == 2
+    assert product.count() == builder.count(root) == 18
+    for partial_configuration in [{'A': False}, {'C': True, 'E': True}, {'B': False, 'D': True, 'F': False}, {'G': True}]:
+        expected = dd_backend.exact_count(builder.bdd, builder.bdd.let(partial_configuration, root),
+                                          len(VARIABLES) - len(partial_configuration))
+        assert product.count(partial_configuration) == expected
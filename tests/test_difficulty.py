@@ -0,0 +1,86 @@
+import pytest
+
+import difficulty
+import uvl2bdd
+
+
+def test_read_results_keeps_last_row(tmp_path):
+    results_filepath = tmp_path / 'results.csv'
+    results_filepath.write_text('Model,Info\n'
+                                '../models/a.uvl,Timeout\n'
+                                '../models/b.uvl,OK\n'
+                                '../models/a.uvl,OK\n', encoding='utf8')
+    rows = difficulty.read_results(str(results_filepath))
+    assert [(row['Model'], row['Info']) for row in rows] == [('../models/b.uvl', 'OK'), ('../models/a.uvl', 'OK')]
+
+
+def test_parse_time():
+    assert difficulty.parse_time('12.5') == 12.5
+    assert difficulty.parse_time('Timeout') == difficulty.TIMEOUT
+    assert difficulty.parse_time('Timeout (600s)') == 600
+    assert difficulty.parse_time(uvl2bdd.TIMEOUT_STR.format(14400)) == 14400
+    assert difficulty.parse_time('') is None
+    assert difficulty.parse_time(None) is None
+    assert difficulty.parse_time('Error') is None
+
+
+
+def synthetic_rows(budget=3600):
+    """Models whose build time grows as variables^1.5, timed out above the budget."""
+    rows = []
+    for i in range(60):
+        variables = 10 ** (1 + i / 15)
+        time = 1e-3 * variables ** 1.5
+        timed_out = time > budget
+        rows.append({'metrics': {'variables': variables, 'clauses': 2 * variables, 'clause_ratio': 2.0},
+                     'build_time': budget if timed_out else time,
+                     'bdd_nodes': None if timed_out else 5 * variables,
+                     'timed_out': timed_out})
+    return rows
+
+
+def fit(rows):
+    return difficulty.DifficultyEstimator(difficulty.CSV_METRICS).fit(
+        [row['metrics'] for row in rows], [row['build_time'] for row in rows],
+        [row['bdd_nodes'] for row in rows], [row['timed_out'] for row in rows])
+
+
+def test_fit_predict(tmp_path):
+    estimator = fit(synthetic_rows())
+    metrics = {'variables': 1000, 'clauses': 2000, 'clause_ratio': 2.0}
+    estimate = estimator.predict(metrics)
+    assert estimate.build_time == pytest.approx(1e-3 * 1000 ** 1.5, rel=0.5)
+    assert estimate.bdd_nodes == pytest.approx(5000, rel=0.05)
+    assert estimate.build_time <= estimate.timeout <= difficulty.MAX_TIMEOUT
+    assert not estimate.large and not estimate.deferred
+
+    estimator.save(str(tmp_path / 'estimator.json'))
+    loaded = difficulty.DifficultyEstimator.load(str(tmp_path / 'estimator.json'))
+    assert str(loaded.predict(metrics)) == str(estimate)
+
+
+def test_deferral():
+    rows = synthetic_rows()
+    estimator = fit(rows)
+    for row in rows:  # Margin around the budget, where the models are deferred or not
+        if row['metrics']['variables'] < 1e4:
+            assert not estimator.predict(row['metrics']).deferred
+        elif row['metrics']['variables'] > 5e4:
+            assert estimator.predict(row['metrics']).deferred
+    assert estimator.predict({'variables': 1e6, 'clauses': 2e6, 'clause_ratio': 2.0}).deferred
+    # Without the timeouts, no model is deferred
+    estimator = difficulty.DifficultyEstimator(difficulty.CSV_METRICS).fit(
+        [row['metrics'] for row in rows], [row['build_time'] for row in rows], [row['bdd_nodes'] for row in rows])
+    assert not estimator.predict({'variables': 1e6, 'clauses': 2e6, 'clause_ratio': 2.0}).deferred
+
+
+def test_read_training_data_keeps_timeouts(tmp_path):
+    results_filepath = tmp_path / 'results.csv'
+    results_filepath.write_text('Model,Variables,Clauses,fastOrder Time (s),Logic2BDD Time (s),BDD Nodes\n'
+                                'a.uvl,10,20,1.5,2.5,100\n'
+                                'b.uvl,1000,3000,Timeout (600s),,\n'
+                                'c.uvl,500,900,30,Timeout,\n'
+                                'd.uvl,50,60,3,,\n', encoding='utf8')
+    _, rows = difficulty.read_training_data(str(results_filepath))
+    assert [(row['build_time'], row['bdd_nodes'], row['timed_out']) for row in rows] == \
+        [(4.0, 100.0, False), (1200.0, None, True), (30.0 + difficulty.TIMEOUT, None, True)]
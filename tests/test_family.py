@@ -0,0 +1,70 @@
+import itertools
+
+import pytest
+
+pytest.importorskip('dd.cudd')
+pytest.importorskip('flamapy.metamodels.fm_metamodel')
+
+import family
+
+
+def write_or_group(tmp_path, name, n):
+    filepath = tmp_path / f'{name}.uvl'
+    children = ''.join(f'            F{i}\n' for i in range(n))
+    filepath.write_text(f'features\n    R\n        or\n{children}', encoding='utf8')
+    return str(filepath)
+
+
+def test_counts_above_double(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # Cache of the parsed models
+    fm_filepaths = [write_or_group(tmp_path, 'model-1', 60), write_or_group(tmp_path, 'model-2', 61)]
+    family_bdd = family.build_family(fm_filepaths)
+    assert [v.configurations for v in family_bdd.versions] == [2 ** 60 - 1, 2 ** 61 - 1]
+    assert family_bdd.configurations(0) == 2 ** 60 - 1
+    assert family_bdd.diff(0, 1) == (2 ** 60, 0)
+    assert family_bdd.diff(1, 0) == (0, 2 ** 60)
+
+
+VERSIONS = {
+    'model-1.0': ('''features
+    R
+        optional
+            A
+            B
+        alternative
+            C
+            D
+constraints
+    A => C
+''', lambda c: c['R'] and c['C'] != c['D'] and (not c['A'] or c['C']) and not c['E'] and not c['F']),
+    'model-1.1': ('''features
+    R
+        optional
+            A
+            E
+        alternative
+            C
+            D
+            F
+constraints
+    A => D | F
+''', lambda c: c['R'] and c['C'] + c['D'] + c['F'] == 1 and (not c['A'] or c['D'] or c['F']) and not c['B']),
+}
+
+
+def test_diff_as_brute_force(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # Cache of the parsed models
+    fm_filepaths = []
+    for name, (uvl, _) in VERSIONS.items():
+        (tmp_path / f'{name}.uvl').write_text(uvl, encoding='utf8')
+        fm_filepaths.append(str(tmp_path / f'{name}.uvl'))
+    family_bdd = family.build_family(fm_filepaths)
+    assert len(family_bdd.variables) == 7
+    variables = ['R', 'A', 'B', 'C', 'D', 'E', 'F']
+    configurations = [dict(zip(variables, values)) for values in itertools.product([False, True], repeat=len(variables))]
+    old, new = ([c for c in configurations if is_valid(c)] for _, is_valid in VERSIONS.values())
+    assert [family_bdd.configurations(i) for i in range(2)] == [len(old), len(new)]
+    added = len([c for c in new if c not in old])
+    removed = len([c for c in old if c not in new])
+    assert family_bdd.diff(0, 1) == (added, removed)
+    assert family_bdd.diff(1, 0) == (removed, added)
@@ -0,0 +1,99 @@
+import os
+
+import pytest
+
+pytest.importorskip('flamapy.metamodels.fm_metamodel')
+
+from flamapy.metamodels.fm_metamodel.operations import FMLanguageLevel
+from flamapy.metamodels.fm_metamodel.transformations import UVLReader
+
+from utils import fm_scan
+
+
+MODELS = {
+    'boolean': '''features
+    R
+        or
+            A
+            B
+        alternative
+            C
+            D
+        [1..2]
+            E
+            F
+        [0..1]
+            G
+            H
+constraints
+    A => !C
+    E | (F <=> G)
+''',
+    'group_cardinality': '''features
+    R
+        optional
+            A
+                [2..3]
+                    B
+                    C
+                    D
+                    E
+        [1..*]
+            F
+            G
+''',
+    'arithmetic': '''features
+    R
+        optional
+            A {price 3}
+            B {price 4}
+constraints
+    A => B
+    sum(price) > 2
+''',
+    'typed': '''features
+    R
+        optional
+            A {price 3}
+            Integer B
+        [1..2]
+            C
+            D cardinality [0..3]
+constraints
+    A => C
+    sum(price) > 2
+    len(B) == 2
+''',
+}
+
+
+@pytest.mark.parametrize('name', sorted(MODELS))
+def test_scan_as_language_level(tmp_path, name):
+    filepath = tmp_path / f'{name}.uvl'
+    filepath.write_text(MODELS[name], encoding='utf8')
+    level = FMLanguageLevel().execute(UVLReader(str(filepath)).transform()).get_result()
+    entry = fm_scan.scan_uvl(str(filepath))
+    assert entry['major'] == level.major.name
+    assert entry['minors'] == sorted(minor.name for minor in level.minors)
+    assert fm_scan.level_str(entry) == str(level)
+
+
+def test_update_manifest(tmp_path):
+    filepaths = []
+    for name, content in list(MODELS.items()) + [('imports', 'imports\n    other as O\nfeatures\n    R\n')]:
+        filepath = tmp_path / f'{name}.uvl'
+        filepath.write_text(content, encoding='utf8')
+        filepaths.append(str(filepath))
+    manifest_filepath = str(tmp_path / 'manifest.json')
+    manifest = fm_scan.update_manifest(filepaths, manifest_filepath, workers=1)
+    boolean = {os.path.basename(f) for f in filepaths if fm_scan.is_boolean(manifest[f])}
+    assert boolean == {'boolean.uvl', 'group_cardinality.uvl', 'imports.uvl'}  # Not scanned: decided by the transformation
+    assert manifest[filepaths[0]]['features'] == 9
+
+    # Only the modified models are scanned again
+    modified = tmp_path / 'boolean.uvl'
+    modified.write_text(MODELS['typed'], encoding='utf8')
+    os.utime(modified, ns=(0, 0))
+    manifest = fm_scan.update_manifest(filepaths, manifest_filepath, workers=1)
+    assert not fm_scan.is_boolean(manifest[str(modified)])
+    assert fm_scan.read_manifest(manifest_filepath) == manifest
@@ -0,0 +1,72 @@
+import pytest
+
+pytest.importorskip('flamapy.metamodels.fm_metamodel')
+
+from flamapy.metamodels.fm_metamodel.transformations import UVLReader
+
+from utils.fm_simplifier import FMSimplifier
+
+
+def read_model(tmp_path, uvl):
+    filepath = tmp_path / 'model.uvl'
+    filepath.write_text(uvl, encoding='utf8')
+    return UVLReader(str(filepath)).transform()
+
+
+def test_core_feature_of_or_group(tmp_path):
+    feature_model = read_model(tmp_path, '''features
+    R
+        mandatory
+            P
+        or
+            B
+            C
+            D
+constraints
+    B
+    C => P
+''')
+    simplifier = FMSimplifier(feature_model)
+    simplified = simplifier.transform()
+    assert sorted(f.name for f in simplified.get_features()) == ['C', 'D', 'R']
+    assert all(r.is_optional() for r in simplified.root.get_relations())
+    assert not simplified.get_constraints()
+    assert simplifier.mapping_features == {'R': 'R', 'P': 'R', 'B': 'R', 'C': 'C', 'D': 'D'}
+
+
+def test_core_features_of_cardinality_group(tmp_path):
+    feature_model = read_model(tmp_path, '''features
+    R
+        [2..3]
+            B
+            C
+            D
+            E
+constraints
+    B
+    C
+''')
+    simplifier = FMSimplifier(feature_model)
+    simplified = simplifier.transform()
+    assert sorted(f.name for f in simplified.get_features()) == ['D', 'E', 'R']
+    relation, = simplified.root.get_relations()
+    assert (relation.card_min, relation.card_max) == (0, 1)
+    assert not simplified.get_constraints()
+
+
+def test_unsatisfiable_constraint_is_void(tmp_path):
+    feature_model = read_model(tmp_path, '''features
+    R
+        optional
+            A
+            B
+constraints
+    !A
+    A => B
+    !R | A
+''')
+    simplifier = FMSimplifier(feature_model)
+    simplified = simplifier.transform()
+    assert sorted(f.name for f in simplified.get_features()) == ['A', 'B', 'R']
+    assert len(simplified.get_constraints()) == 3
+    assert simplifier.mapping_features == {'R': 'R', 'A': 'A', 'B': 'B'}
@@ -0,0 +1,74 @@
+import pytest
+
+pytest.importorskip('dd.cudd')
+
+import logic2bdd
+from utils import dddmp
+from utils.bdd_analysis import frequencies
+from conftest import VARIABLES
+
+
+@pytest.mark.parametrize('eliminated', [['C'], ['D'], ['A', 'E'], ['B', 'D']])
+def test_reduce_size_as_exist(cudd_dump, eliminated):
+    filepath, bdd, root = cudd_dump()
+    expected = bdd.count(bdd.exist(eliminated, root), nvars=len(VARIABLES) - len(eliminated))
+
+    outputfile, _, _ = logic2bdd.reduce_size(filepath, eliminated)
+    table = dddmp.read_bdd(outputfile)
+    assert set(table.order) == set(VARIABLES) - set(eliminated)
+    assert frequencies(table)[0] == expected
+
+    from dd import cudd
+    other = cudd.BDD()
+    other.declare(*table.order)
+    assert other.count(other.load(outputfile)[0], nvars=len(table.order)) == expected
+
+
+def test_find_previous_order(tmp_path, monkeypatch):
+    (tmp_path / 'logic').mkdir()
+    (tmp_path / 'bdd').mkdir()
+    models = {'busybox-1.0': 'A B C D', 'busybox-1.1': 'A B C D E', 'other-1.0': 'A B C D E F',
+              'unbuilt-1.0': 'A B C D E F G'}
+    for name, variables in models.items():
+        (tmp_path / 'logic' / f'{name}{logic2bdd.ORDER_SUFFIX}.var').write_text(variables + '\n', encoding='utf8')
+        if name != 'unbuilt-1.0':
+            (tmp_path / 'bdd' / f'{name}.dddmp').write_text('', encoding='utf8')
+    for name in ['busybox-1.2', 'unknown-1.0']:
+        (tmp_path / 'logic' / f'{name}.var').write_text('A B C D E F G\n', encoding='utf8')
+    reads = []
+    read_variables = logic2bdd.logic_reader.read_variables
+    monkeypatch.setattr(logic2bdd.logic_reader, 'read_variables', lambda f: reads.append(f) or read_variables(f))
+
+    # The versions of the same family are preferred even if another model is more similar
+    assert logic2bdd.find_previous_order(str(tmp_path / 'logic' / 'busybox-1.2.var')) == \
+        str(tmp_path / 'logic' / f'busybox-1.1{logic2bdd.ORDER_SUFFIX}.var')
+    assert not any('other' in f for f in reads)
+    assert logic2bdd.find_previous_order(str(tmp_path / 'logic' / 'unknown-1.0.var')) == \
+        str(tmp_path / 'logic' / f'other-1.0{logic2bdd.ORDER_SUFFIX}.var')
+    # The order files are read once in the run
+    reads.clear()
+    logic2bdd.find_previous_order(str(tmp_path / 'logic' / 'unknown-1.0.var'))
+    assert reads == [str(tmp_path / 'logic' / 'unknown-1.0.var')]
+
+
+def test_reused_order_falls_back_without_previous_version(tmp_path, monkeypatch):
+    (tmp_path / 'logic').mkdir()
+    (tmp_path / 'bdd').mkdir()
+    varfile = tmp_path / 'logic' / 'busybox-1.1.var'
+    expfile = tmp_path / 'logic' / 'busybox-1.1.exp'
+    varfile.write_text('R A B N\n', encoding='utf8')
+    expfile.write_text('R\nA -> R\nB -> R\nN -> B\n', encoding='utf8')
+    # The order of an unbuilt version is not reused
+    (tmp_path / 'logic' / f'busybox-1.0{logic2bdd.ORDER_SUFFIX}.var').write_text('B X A R\n', encoding='utf8')
+    assert logic2bdd.get_reused_order(str(varfile), str(expfile)) is None
+    initial_orders = []
+    monkeypatch.setattr(logic2bdd, 'get_initial_order', lambda v, e: initial_orders.append(v))
+    with pytest.raises(logic2bdd.BDDException):
+        logic2bdd.build_model(str(varfile), str(expfile), logic2bdd.REUSE_METHOD)
+    assert initial_orders == [str(varfile)]
+
+    # Once built, its order is projected onto the variables of the new version
+    (tmp_path / 'bdd' / 'busybox-1.0.dddmp').write_text('', encoding='utf8')
+    orderfile = logic2bdd.get_reused_order(str(varfile), str(expfile))
+    assert orderfile == str(tmp_path / 'logic' / f'busybox-1.1{logic2bdd.ORDER_SUFFIX}.var')
+    assert logic2bdd.logic_reader.read_variables(orderfile) == ['B', 'N', 'A', 'R']
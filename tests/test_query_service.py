@@ -0,0 +1,44 @@
+import io
+import json
+
+import pytest
+
+from query_service import QueryService
+
+
+@pytest.mark.parametrize('request_', [
+    ['bdd'],
+    {'query': 'valid'},
+    {'bdd': 'model.dddmp', 'configurations': {'A': True}},
+    {'bdd': 'model.dddmp', 'configurations': ['A']},
+    {'bdd': 'model.dddmp', 'configurations': [{'A': 'yes'}]},
+])
+def test_malformed_request(request_):
+    assert 'error' in QueryService().query(request_)
+
+
+def test_serve_continues_after_errors(tmp_path, cudd_dump):
+    pytest.importorskip('flamapy.metamodels.bdd_metamodel')
+    filepath, _, _ = cudd_dump()
+    corrupt_filepath = tmp_path / 'corrupt.dddmp'
+    corrupt_filepath.write_text('.ver DDDMP-2.0\n.nnodes 3\n.nodes\n1 T 1 0 0\n', encoding='utf8')
+    requests = ['not json',
+                json.dumps({'bdd': filepath, 'configurations': [{'A': True}, 5]}),
+                json.dumps({'bdd': str(corrupt_filepath)}),
+                json.dumps({'bdd': filepath, 'query': 'count', 'configurations': [{'A': False}]})]
+    output = io.StringIO()
+    QueryService().serve(requests, output)
+    responses = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert ['error' in response for response in responses] == [True, True, True, False]
+    assert responses[-1] == {'results': [0]}
+
+
+def test_count_above_double(cudd_dump):
+    pytest.importorskip('flamapy.metamodels.bdd_metamodel')
+    from query_service import BDDQueryModel
+    variables = [f'v{i}' for i in range(60)]
+    filepath, _, _ = cudd_dump(variables, ' | '.join(variables))
+    model = BDDQueryModel(filepath)
+    assert model.count() == 2 ** 60 - 1
+    assert model.count({'v0': False}) == 2 ** 59 - 1
+    assert model.count({'v0': False, 'v1': True}) == 2 ** 58
@@ -0,0 +1,34 @@
+import pytest
+
+pytest.importorskip('flamapy.metamodels.fm_metamodel')
+
+from benchmarks import suite
+
+
+def test_read_models_resolves_names(tmp_path):
+    (tmp_path / 'models' / 'family').mkdir(parents=True)
+    (tmp_path / 'models' / 'family' / 'model-1.0.uvl').write_text('features\n    R\n', encoding='utf8')
+    sample_filepath = tmp_path / 'sample.txt'
+    sample_filepath.write_text('model-1.0\n../old/model-1.0.uvl\nmissing\n', encoding='utf8')
+    filepath = str(tmp_path / 'models' / 'family' / 'model-1.0.uvl')
+    assert suite.read_models(str(sample_filepath), str(tmp_path / 'models')) == [filepath, filepath, 'missing']
+    assert suite.read_models(str(sample_filepath)) == ['model-1.0', '../old/model-1.0.uvl', 'missing']
+
+
+def test_run_records_failures(tmp_path):
+    results = suite.run([str(tmp_path / 'missing.uvl')], suite.DEFAULT_CONFIGURATIONS, repetitions=1, warmup=0)
+    assert results['configurations']['default']['failures'] == [str(tmp_path / 'missing.uvl')]
+
+
+def test_stratified_sample_keeps_timeouts(tmp_path):
+    header = suite.uvl2bdd.CSVHeader
+    rows = [('a', '10', '1', '0.1', '1.0', '2.0', ''),
+            ('b', '20', '2', '0.2', suite.uvl2bdd.TIMEOUT_STR.format(3600), '', ''),  # Logic2BDD not run
+            ('c', '30', '3', '0.3', '1.0', 'Timeout (600s)', ''),
+            ('d', '40', '4', '0.4', '', '', 'Error: parsing'),
+            ('e', '', '', '', '', '', 'Non-Boolean FM')]
+    columns = [header.MODEL, header.FEATURES, header.CONSTRAINTS, header.UVL2LOGIC_TIME, header.FASTORDER_TIME,
+               header.LOGIC2BDD_TIME, header.INFO]
+    lines = [','.join(c.value for c in columns)] + [','.join(row) for row in rows]
+    (tmp_path / 'results.csv').write_text('\n'.join(lines) + '\n', encoding='utf8')
+    assert suite.stratified_sample(str(tmp_path / 'results.csv'), 10, bins=2) == ['a', 'b', 'c']
@@ -0,0 +1,82 @@
+import random
+
+import pytest
+
+from utils import var_order
+
+
+def random_model(n_vars, n_exps, seed=0):
+    rng = random.Random(seed)
+    variables = [f'x{i}' for i in range(n_vars)]
+    expressions_vars = [rng.sample(variables, rng.randint(1, 4)) for _ in range(n_exps)]
+    return (variables, expressions_vars)
+
+
+def assert_permutation(order, variables):
+    assert len(order) == len(variables)
+    assert set(order) == set(variables)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_heuristic_orders_are_permutations(seed):
+    variables, expressions_vars = random_model(30, 40, seed)
+    initial = var_order.appearance_order(variables, expressions_vars)
+    assert_permutation(initial, variables)
+    force = var_order.force_order(variables, expressions_vars, initial)
+    assert_permutation(force, variables)
+    assert var_order.total_span(force, expressions_vars) <= var_order.total_span(initial, expressions_vars)
+    span = var_order.span_order(variables, expressions_vars, force)
+    assert_permutation(span, variables)
+    assert var_order.total_span(span, expressions_vars) <= var_order.total_span(force, expressions_vars)
+    assert_permutation(var_order.span_order(variables, expressions_vars), variables)
+
+
+def test_complete_order():
+    assert var_order.complete_order(['C', 'Z', 'A', 'C'], ['A', 'B', 'C']) == ['C', 'A', 'B']
+
+
+def test_dfs_order_is_permutation(tmp_path):
+    pytest.importorskip('flamapy.metamodels.fm_metamodel')
+    from flamapy.metamodels.fm_metamodel.transformations import UVLReader
+    filepath = tmp_path / 'model.uvl'
+    filepath.write_text('''features
+    R
+        optional
+            A
+                alternative
+                    A1
+                    A2
+            B
+        mandatory
+            C
+                or
+                    C1
+                    C2
+''', encoding='utf8')
+    fm = UVLReader(str(filepath)).transform()
+    order = var_order.dfs_order(fm)
+    assert order == ['R', 'A', 'A1', 'A2', 'B', 'C', 'C1', 'C2']
+    assert var_order.dfs_order(fm, {'A1': 'v1'})[2] == 'v1'
+
+
+
+def test_union_order():
+    orders = [['R', 'A', 'B'], ['R', 'N', 'A', 'C', 'B'], ['M', 'R', 'C', 'B', 'D']]
+    order = var_order.union_order(orders)
+    assert_permutation(order, ['R', 'A', 'B', 'N', 'C', 'M', 'D'])
+    # The relative order of the variables of each version is preserved
+    for version_order in orders:
+        assert sorted(version_order, key=order.index) == version_order
+    assert var_order.union_order([]) == []
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_project_order_is_permutation(seed):
+    variables, expressions_vars = random_model(30, 40, seed)
+    rng = random.Random(seed)
+    previous_order = rng.sample(variables, 20) + ['removed1', 'removed2']
+    rng.shuffle(previous_order)
+    order = var_order.project_order(previous_order, variables, expressions_vars)
+    assert_permutation(order, variables)
+    kept = [var for var in previous_order if var in order]
+    assert sorted(kept, key=order.index) == kept
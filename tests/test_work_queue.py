@@ -0,0 +1,100 @@
+import os
+import csv
+import time
+import multiprocessing
+
+import pytest
+
+pytest.importorskip('flamapy.metamodels.fm_metamodel')
+
+import work_queue
+
+
+LEASE_TIME = 1  # in seconds
+
+
+def test_enqueue_dir_skips_processed_models(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'models').mkdir()
+    for name in ['a', 'b']:
+        (tmp_path / 'models' / f'{name}.uvl').write_text('features\n    R\n        optional\n            A\n', encoding='utf8')
+    (tmp_path / 'results.csv').write_text('Model,Info\n/old/dataset/models/a.uvl,OK\n', encoding='utf8')
+    queue = work_queue.WorkQueue(str(tmp_path / 'queue.sqlite'))
+    assert work_queue.enqueue_dir(queue, './models', str(tmp_path / 'results.csv')) == 1
+
+
+def lease_and_die(queue_filepath):
+    """Worker process that leases a job and dies without completing it."""
+    work_queue.WorkQueue(queue_filepath, lease_time=1).lease('dead')
+    os._exit(1)
+
+
+def result(path):
+    return {work_queue.uvl2bdd.CSVHeader.MODEL.value: path, work_queue.uvl2bdd.CSVHeader.INFO.value: 'OK'}
+
+
+def test_lease_after_expiry(tmp_path):
+    filepath = str(tmp_path / 'queue.db')
+    queue1 = work_queue.WorkQueue(filepath, lease_time=LEASE_TIME)
+    queue2 = work_queue.WorkQueue(filepath, lease_time=LEASE_TIME)
+    queue1.enqueue(['a.uvl'])
+    assert queue1.lease('w1') == 'a.uvl'
+    assert queue2.lease('w2') is None
+    time.sleep(LEASE_TIME + 0.1)
+    assert queue2.lease('w2') == 'a.uvl'
+    # The lease of w1 is lost: its heartbeat and result are rejected
+    assert not queue1.heartbeat('a.uvl', 'w1')
+    assert not queue1.complete('a.uvl', 'w1', result('a.uvl'))
+    assert queue2.heartbeat('a.uvl', 'w2')
+    assert queue2.complete('a.uvl', 'w2', result('a.uvl'))
+    assert queue1.status() == {work_queue.DONE: 1}
+
+
+def test_lease_after_worker_dies(tmp_path):
+    filepath = str(tmp_path / 'queue.db')
+    queue = work_queue.WorkQueue(filepath, lease_time=LEASE_TIME)
+    queue.enqueue(['a.uvl'])
+    process = multiprocessing.Process(target=lease_and_die, args=(filepath,))
+    process.start()
+    process.join()
+    assert queue.status() == {work_queue.LEASED: 1}
+    assert queue.lease('w') is None
+    time.sleep(LEASE_TIME + 0.1)
+    assert queue.lease('w') == 'a.uvl'
+    assert queue.complete('a.uvl', 'w', result('a.uvl'))
+
+
+def test_max_attempts(tmp_path):
+    queue = work_queue.WorkQueue(str(tmp_path / 'queue.db'), lease_time=0)
+    queue.enqueue(['a.uvl', 'b.uvl'])
+    for _ in range(work_queue.MAX_ATTEMPTS):
+        assert queue.lease('w') == 'a.uvl'
+        time.sleep(0.01)
+    # The job of a is failed and the next job is leased
+    assert queue.lease('w') == 'b.uvl'
+    assert queue.status() == {work_queue.FAILED: 1, work_queue.LEASED: 1}
+    assert queue.collect(str(tmp_path / 'results.csv')) == 1
+    with open(tmp_path / 'results.csv', newline='') as file:
+        rows = list(csv.DictReader(file))
+    assert rows[0][work_queue.uvl2bdd.CSVHeader.INFO.value] == \
+        f'{work_queue.uvl2bdd.ERROR_STR}: worker lost {work_queue.MAX_ATTEMPTS} times'
+
+
+def test_collect_writes_each_result_once(tmp_path):
+    filepath = str(tmp_path / 'queue.db')
+    results_filepath = str(tmp_path / 'results.csv')
+    queue1 = work_queue.WorkQueue(filepath)
+    queue2 = work_queue.WorkQueue(filepath)
+    queue1.enqueue(['a.uvl', 'b.uvl', 'c.uvl'])
+    for _ in range(2):
+        path = queue1.lease('w')
+        queue1.complete(path, 'w', result(path))
+    assert queue1.collect(results_filepath) == 2
+    assert queue2.collect(results_filepath) == 0
+    path = queue2.lease('w')
+    queue2.complete(path, 'w', result(path))
+    assert queue2.collect(results_filepath) == 1
+    assert queue1.collect(results_filepath) == 0
+    with open(results_filepath, newline='') as file:
+        models = [row[work_queue.uvl2bdd.CSVHeader.MODEL.value] for row in csv.DictReader(file)]
+    assert models == ['a.uvl', 'b.uvl', 'c.uvl']
@@ -0,0 +1,205 @@
+import random
+from typing import Any, Callable, Optional
+
+from utils.dddmp import BDDTable, TERMINAL_VAR
+from utils.utils import int2str
+
+
+MODULUS = 2 ** 61 - 1  # Prime modulus of the random weights (identity testing of the atomic sets)
+SEED = 42  # Seed of the random weights, for reproducible results
+ANALYSIS_EXTENSION = '.analysis.json'
+
+
+class BDDAnalysis():
+    """Core features, dead features and atomic sets of the variables of a BDD."""
+
+    def __init__(self, configurations: int, core: list[str], dead: list[str],
+                 atomic_sets: list[list[str]], frequencies: dict[str, int]) -> None:
+        self.configurations = configurations
+        self.core = core
+        self.dead = dead
+        self.atomic_sets = atomic_sets
+        self.frequencies = frequencies  # Number of configurations in which each variable is selected
+
+    def to_dict(self) -> dict[str, Any]:
+        return {'configurations': int2str(self.configurations), 'core': self.core, 'dead': self.dead,
+                'atomic_sets': self.atomic_sets,
+                'frequencies': {var: int2str(freq) for var, freq in self.frequencies.items()}}
+
+
+def weighted_frequencies(table: BDDTable,
+                         root: int,
+                         true_weights: list[int],
+                         false_weights: list[int],
+                         skip: Callable[[int, int], int],
+                         share: Callable[[int, int], int],
+                         modulus: Optional[int] = None) -> tuple[int, list[int]]:
+    """Weighted model count of a root of the BDD and weighted frequency of each variable (by level).
+
+    Each configuration weighs the product of the true or false weights of its variables. The
+    frequency of a variable is the weighted count of the configurations in which it is selected.
+    skip(a, b) is the weight of all the assignments of the levels strictly between a and b, and
+    share(mass, level) is the part of the mass of the assignments in which the variable of the
+    level (skipped by an edge) is true. With the weights 1 this is the number of configurations.
+    It takes a bottom-up pass (counts of the nodes) and a top-down pass (counts of the paths to
+    the nodes, by polarity of the complemented edges) over the node table.
+    """
+    nvars = len(table.order)
+    level_of = {var: i for i, var in enumerate(table.order)}
+    support_levels = [level_of[var] for var in table.variables]
+    var_list = table.var.tolist()
+    then_list = table.then.tolist()
+    else_list = table.else_.tolist()
+    n = len(var_list)
+    levels = [nvars if v == TERMINAL_VAR else support_levels[v] for v in var_list]
+
+    def reduce(x: int) -> int:
+        return x % modulus if modulus is not None else x
+
+    def total(level: int) -> int:  # Weight of all the assignments of the levels from the given one
+        return skip(level - 1, nvars)
+
+    # Bottom-up: count of the function of each (regular) node over the levels from its own
+    up = [0] * n
+
+    def value(edge: int) -> int:
+        node = edge >> 1
+        return reduce(total(levels[node]) - up[node]) if edge & 1 else up[node]
+
+    for i in range(n):
+        if var_list[i] == TERMINAL_VAR:
+            up[i] = 1
+            continue
+        level = levels[i]
+        t, e = then_list[i], else_list[i]
+        up[i] = reduce(true_weights[level] * skip(level, levels[t >> 1]) * value(t)
+                       + false_weights[level] * skip(level, levels[e >> 1]) * value(e))
+
+    # Top-down: weighted count of the paths reaching each node with each polarity
+    frequencies = [0] * nvars
+    skipped = [0] * (nvars + 1)  # Difference array of the mass of the edges skipping each level
+    down = [[0] * n, [0] * n]
+    root_node, root_polarity = root >> 1, root & 1
+    count = reduce(skip(-1, levels[root_node]) * value(root))
+    skipped[0] += count
+    skipped[levels[root_node]] -= count
+    down[root_polarity][root_node] = reduce(skip(-1, levels[root_node]))
+    for i in range(n - 1, -1, -1):
+        if var_list[i] == TERMINAL_VAR:
+            continue
+        level = levels[i]
+        for polarity in (0, 1):
+            paths = down[polarity][i]
+            if not paths:
+                continue
+            for edge, weight, selected in ((then_list[i], true_weights[level], True),
+                                           (else_list[i], false_weights[level], False)):
+                child = edge >> 1
+                child_polarity = polarity ^ (edge & 1)
+                child_paths = reduce(paths * weight * skip(level, levels[child]))
+                down[child_polarity][child] = reduce(down[child_polarity][child] + child_paths)
+                mass = reduce(child_paths * value((child << 1) | child_polarity))
+                if selected:
+                    frequencies[level] = reduce(frequencies[level] + mass)
+                skipped[level + 1] += mass
+                skipped[levels[child]] -= mass
+    mass = 0
+    for level in range(nvars):
+        mass += skipped[level]
+        if mass:
+            frequencies[level] = reduce(frequencies[level] + share(reduce(mass), level))
+    return (count, frequencies)
+
+
+def frequencies(table: BDDTable, root: Optional[int] = None) -> tuple[int, list[int]]:
+    """Number of configurations of the BDD and number of configurations in which each variable
+    (by level) is selected."""
+    nvars = len(table.order)
+    return weighted_frequencies(table, table.roots[0] if root is None else root,
+                                [1] * nvars, [1] * nvars,
+                                lambda a, b: 1 << (b - a - 1),
+                                lambda mass, level: mass >> 1)
+
+
+def random_frequencies(table: BDDTable, root: Optional[int] = None, seed: int = SEED) -> list[int]:
+    """Weighted frequencies of the variables (by level) with random weights modulo a prime.
+
+    Two variables always appear together if and only if their weighted frequencies are equal,
+    except with a probability lower than (number of variables / MODULUS) (Schwartz-Zippel).
+    """
+    nvars = len(table.order)
+    rng = random.Random(seed)
+    true_weights = [rng.randrange(1, MODULUS) for _ in range(nvars)]
+    false_weights = [(1 - w) % MODULUS for w in true_weights]  # The weights of a variable sum 1
+    return weighted_frequencies(table, table.roots[0] if root is None else root,
+                                true_weights, false_weights,
+                                lambda a, b: 1,
+                                lambda mass, level: mass * true_weights[level],
+                                MODULUS)[1]
+
+
+def analyze(table: BDDTable, root: Optional[int] = None) -> BDDAnalysis:
+    """Core and dead variables, and atomic sets (variables that always appear together, with at
+    least two variables) of the BDD, in two passes over the node table for each of them."""
+    count, freqs = frequencies(table, root)
+    core = [var for var, freq in zip(table.order, freqs) if count > 0 and freq == count]
+    dead = [var for var, freq in zip(table.order, freqs) if freq == 0]
+    atomic_sets = []
+    if count > 0:
+        groups: dict[int, list[str]] = {}
+        for var, freq, weighted_freq in zip(table.order, freqs, random_frequencies(table, root)):
+            if freq > 0:
+                groups.setdefault(weighted_freq, []).append(var)
+        atomic_sets = [group for group in groups.values() if len(group) > 1]
+    return BDDAnalysis(count, core, dead, atomic_sets, dict(zip(table.order, freqs)))
+
+
+def map_to_features(analysis: BDDAnalysis,
+                    mapping_names: dict[str, str],
+                    mapping_features: dict[str, Optional[str]]) -> BDDAnalysis:
+    """Map the analysis of the variables of the BDD to the original features.
+
+    The mapping of the names is the one of the .securevars file (feature -> variable), and the
+    mapping of the features is the one of the .simplification file (variable -> representative
+    variable, or None for the dead features removed by the simplification).
+    """
+    features = list(mapping_names or mapping_features or analysis.frequencies)
+    atomic_set_of = {var: i for i, atomic_set in enumerate(analysis.atomic_sets) for var in atomic_set}
+    core_vars, dead_vars = set(analysis.core), set(analysis.dead)
+    representatives = {}
+    for feature in features:
+        var = mapping_names.get(feature, feature)
+        representatives[feature] = mapping_features.get(var, var) if var in mapping_features else var
+    core = [f for f, rep in representatives.items() if rep is not None and rep in core_vars]
+    dead = [f for f, rep in representatives.items() if rep is None or rep in dead_vars]
+    groups: dict[Any, list[str]] = {}
+    for feature, rep in representatives.items():
+        if rep is not None and rep not in dead_vars:
+            groups.setdefault(atomic_set_of.get(rep, rep), []).append(feature)
+    frequencies = {f: 0 if rep is None else analysis.frequencies[rep] for f, rep in representatives.items()}
+    return BDDAnalysis(analysis.configurations, core, dead,
+                       [group for group in groups.values() if len(group) > 1], frequencies)
+
+
+def analyze_file(bdd_filepath: str,
+                 securevars_filepath: Optional[str] = None,
+                 simplification_filepath: Optional[str] = None) -> str:
+    """Analyze the BDD of a model (.dddmp or .bddb) and write the core features, dead features,
+    atomic sets and frequencies of the original features in a <<file>>.analysis.json file.
+
+    Return the analysis file.
+    """
+    import json
+    import pathlib
+    import fm2logic
+    from utils import dddmp
+
+    analysis = analyze(dddmp.read_bdd(bdd_filepath))
+    mapping_names = fm2logic.read_mapping_variables_file(securevars_filepath) if securevars_filepath else {}
+    mapping_features = fm2logic.read_simplification_file(simplification_filepath) if simplification_filepath else {}
+    analysis = map_to_features(analysis, mapping_names, mapping_features)
+    path = pathlib.Path(bdd_filepath)
+    outputfile = str(path.parent / f'{path.stem}{ANALYSIS_EXTENSION}')
+    with open(outputfile, 'w', encoding='utf8') as file:
+        json.dump(analysis.to_dict(), file, indent=1)
+    return outputfile
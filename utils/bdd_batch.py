@@ -0,0 +1,171 @@
+import pathlib
+from typing import Optional
+
+import numpy as np
+
+from utils.dddmp import BDDTable, TERMINAL_VAR
+
+
+CHUNK_ROWS = 16384  # Configurations traversed together (the arrays of a chunk fit in the cache)
+CHECK_STEPS = 8  # Steps of the traversal between the removals of the finished configurations
+
+
+def evaluate(table: BDDTable,
+             configurations: np.ndarray,
+             columns: Optional[list[Optional[str]]] = None,
+             root: Optional[int] = None,
+             chunk_rows: int = CHUNK_ROWS) -> np.ndarray:
+    """Validity mask of a batch of configurations (2-D boolean array, configurations x variables).
+
+    The columns are the variables of the columns of the array (by default, the variables of the
+    BDD in their order); the columns of other variables (or None) are ignored. All the
+    configurations are traversed together from the root, a level of their paths per step, with
+    vectorized indexing of the node table (the configurations reaching the terminal node leave
+    the traversal).
+    """
+    configurations = np.asarray(configurations, dtype=bool)
+    if configurations.ndim != 2:
+        raise ValueError('The configurations must be a 2-D array (configurations x variables).')
+    columns = table.order if columns is None else columns
+    if len(columns) != configurations.shape[1]:
+        raise ValueError(f'{len(columns)} columns given for {configurations.shape[1]} columns of configurations.')
+    column_of: dict[str, int] = {}
+    for i, var in enumerate(columns):
+        if var is not None:
+            column_of.setdefault(var, i)
+    missing = [var for var in table.variables if var not in column_of]
+    if missing:
+        raise ValueError(f'Missing variables in the configurations: {", ".join(missing)}.')
+
+    # Tables indexed by edge (node and complement): column of the variable of its node and its
+    # children (else, then) with the complement propagated. The edges to the terminal node loop
+    # on themselves, so the finished configurations can stay in the traversal between checks.
+    support_columns = np.array([column_of[var] for var in table.variables] + [0], dtype=np.intp)
+    node_vars = np.where(table.var == TERMINAL_VAR, len(table.variables), table.var).astype(np.intp)
+    edge_columns = np.repeat(support_columns[node_vars], 2)
+    children = np.stack([table.else_, table.then], axis=1).astype(np.intp)
+    edge_children = np.stack([children, children ^ 1], axis=1).reshape(-1)
+    terminal = int(np.flatnonzero(table.var == TERMINAL_VAR)[0])
+    edge_children[4 * terminal:4 * terminal + 4] = [2 * terminal, 2 * terminal, 2 * terminal + 1, 2 * terminal + 1]
+    root = table.roots[0] if root is None else root
+
+    ncols = configurations.shape[1]
+    valid = np.empty(len(configurations), dtype=bool)
+    for start in range(0, len(configurations), chunk_rows):
+        block = np.ascontiguousarray(configurations[start:start + chunk_rows]).reshape(-1)
+        rows = np.arange(len(block) // ncols)
+        offsets = rows * ncols
+        edges = np.full(len(rows), root, dtype=np.intp)
+        cols = np.empty_like(edges)
+        bits = np.empty(len(rows), dtype=bool)
+        step = 0
+        while rows.size:
+            np.take(edge_columns, edges, out=cols)
+            np.add(cols, offsets, out=cols)
+            np.take(block, cols, out=bits)
+            np.left_shift(edges, 1, out=cols)
+            np.add(cols, bits, out=cols)
+            np.take(edge_children, cols, out=edges)
+            step += 1
+            if step % CHECK_STEPS == 0:
+                finished = (edges >> 1) == terminal
+                if finished.any():
+                    valid[start + rows[finished]] = edges[finished] == 2 * terminal  # True terminal (not complemented)
+                    active = ~finished
+                    rows, offsets, edges = rows[active], offsets[active], edges[active]
+                    cols, bits = np.empty_like(edges), np.empty(len(rows), dtype=bool)
+    return valid
+
+
+def evaluate_features(table: BDDTable,
+                      configurations: np.ndarray,
+                      features: list[str],
+                      mapping_names: Optional[dict[str, str]] = None,
+                      mapping_features: Optional[dict[str, Optional[str]]] = None) -> np.ndarray:
+    """Validity mask of a batch of configurations whose columns are the original features.
+
+    The features are mapped to the variables of the BDD with the mapping of the names of the
+    .securevars file (feature -> variable) and the mapping of the features of the .simplification
+    file (variable -> representative variable, or None for the dead features). The dead features
+    must be deselected, and the features with the same representative must have the same value.
+    """
+    configurations = np.asarray(configurations, dtype=bool)
+    mapping_names = mapping_names or {}
+    mapping_features = mapping_features or {}
+    valid = np.ones(len(configurations), dtype=bool)
+    columns: list[Optional[str]] = []
+    first_column: dict[str, int] = {}
+    for i, feature in enumerate(features):
+        var = mapping_names.get(feature, feature)
+        representative = mapping_features.get(var, var) if var in mapping_features else var
+        if representative is None:  # Dead feature
+            valid &= ~configurations[:, i]
+            columns.append(None)
+        elif representative in first_column:  # Same value as its representative
+            valid &= configurations[:, i] == configurations[:, first_column[representative]]
+            columns.append(None)
+        else:
+            first_column[representative] = i
+            columns.append(representative)
+    return valid & evaluate(table, configurations, columns)
+
+
+def evaluate_file(bdd_filepath: str, configurations: np.ndarray, features: Optional[list[str]] = None) -> np.ndarray:
+    """Validity mask of a batch of configurations of the model of a BDD file (.dddmp or .bddb).
+
+    The features of the columns default to the variables of the .var file of the model. The
+    mapping files written by fm2logic in the logic folder are used if they exist.
+    """
+    import fm2logic
+    from utils import dddmp, logic_reader
+
+    path = pathlib.Path(bdd_filepath)
+    logic_dir = path.parent.parent / 'logic'
+    securevars_filepath = logic_dir / f'{path.stem}.securevars'
+    simplification_filepath = logic_dir / f'{path.stem}.simplification'
+    if features is None:
+        features = logic_reader.read_variables(str(logic_dir / f'{path.stem}.var'))
+    mapping_names = (fm2logic.read_mapping_variables_file(str(securevars_filepath))
+                     if securevars_filepath.exists() else {})
+    mapping_features = (fm2logic.read_simplification_file(str(simplification_filepath))
+                        if simplification_filepath.exists() else {})
+    return evaluate_features(dddmp.read_bdd(bdd_filepath), configurations, features, mapping_names, mapping_features)
+
+
+def read_configurations(filepath: str) -> tuple[np.ndarray, Optional[list[str]]]:
+    """Read a batch of configurations from a .npy file (boolean array) or a CSV file (a header with
+    the features and a row of 0/1 per configuration). Return the array and the features (None for
+    .npy files)."""
+    if filepath.endswith('.npy'):
+        return (np.load(filepath).astype(bool), None)
+    with open(filepath, 'r', encoding='utf8') as file:
+        features = file.readline().strip().split(',')
+        data = np.loadtxt(file, delimiter=',', dtype=np.uint8, ndmin=2)
+    return (data.astype(bool), features)
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Validate a batch of configurations against the BDD of a model.')
+    parser.add_argument(metavar='bddfile', dest='bddfile', type=str, help='BDD file (.dddmp or .bddb) of the model.')
+    parser.add_argument(metavar='configurations', dest='configurations', type=str, help='Configurations: .npy file (boolean array, columns in the order of the .var file or -features) or .csv file (header with the features and 0/1 rows).')
+    parser.add_argument('-features', metavar='featuresfile', dest='features', type=str, required=False, help='Features of the columns of a .npy file (one per line).')
+    parser.add_argument('-o', metavar='outputfile', dest='outputfile', type=str, required=False, help='Output file with the validity mask (.npy).')
+    args = parser.parse_args()
+
+    configurations, features = read_configurations(args.configurations)
+    if args.features:
+        with open(args.features, 'r', encoding='utf8') as file:
+            features = [line.strip() for line in file if line.strip()]
+    start = time.perf_counter()
+    valid = evaluate_file(args.bddfile, configurations, features)
+    elapsed = time.perf_counter() - start
+    if args.outputfile:
+        np.save(args.outputfile, valid)
+    print(f'{int(valid.sum())} valid and {int((~valid).sum())} invalid configurations of {len(valid)} ({elapsed:.2f} s).', file=sys.stderr)
+    if not valid.all():
+        print('Invalid configurations (rows): ' + ' '.join(map(str, np.flatnonzero(~valid)[:100])) + (' ...' if (~valid).sum() > 100 else ''))
+    sys.exit(0 if valid.all() else 1)
@@ -0,0 +1,212 @@
+import sys
+from typing import BinaryIO, Iterator, Optional
+
+import numpy as np
+
+from utils.dddmp import BDDTable, TERMINAL_VAR
+
+
+CHUNK_ROWS = 65536  # Configurations per chunk (the memory is bounded by a chunk, independently of the count)
+FREE = 2  # Value of a don't-care variable in a cube
+LOW_BITS = 62  # Free variables expanded with NumPy integers (the rest are fixed per block)
+
+# Output formats (the columns are the variables of the BDD in their order)
+TEXT_FORMAT = 'text'  # A header line with the variables and a line of 0/1 per configuration
+BINARY_FORMAT = 'binary'  # Rows of ceil(#variables / 8) bytes, the i-th variable in the bit i (little-endian)
+FORMATS = [TEXT_FORMAT, BINARY_FORMAT]
+
+
+def _fixed_levels(table: BDDTable, assignment: Optional[dict[str, bool]]) -> np.ndarray:
+    """Value of each level fixed by the partial assignment (FREE if not fixed)."""
+    fixed = np.full(len(table.order), FREE, dtype=np.uint8)
+    level_of = {var: i for i, var in enumerate(table.order)}
+    for var, value in (assignment or {}).items():
+        if var not in level_of:
+            raise ValueError(f'Unknown variable: {var}.')
+        fixed[level_of[var]] = 1 if value else 0
+    return fixed
+
+
+def cubes(table: BDDTable,
+          root: Optional[int] = None,
+          assignment: Optional[dict[str, bool]] = None,
+          offset: int = 0) -> Iterator[tuple[np.ndarray, int]]:
+    """Cubes (paths to the true terminal) of the BDD consistent with the partial assignment.
+
+    Each cube is an array with a value (0, 1 or FREE) per level, and it is yielded with the
+    number of its configurations to skip (for the offset). The cube array is reused between
+    cubes. The paths are walked in depth-first order with an explicit stack, and the subtrees
+    without configurations or within the offset are skipped with the counts of the nodes.
+    """
+    nvars = len(table.order)
+    level_of = {var: i for i, var in enumerate(table.order)}
+    support_levels = [level_of[var] for var in table.variables]
+    var_list = table.var.tolist()
+    then_list = table.then.tolist()
+    else_list = table.else_.tolist()
+    levels = [nvars if v == TERMINAL_VAR else support_levels[v] for v in var_list]
+    fixed = _fixed_levels(table, assignment)
+    fixed_list = fixed.tolist()
+    free_from = [0] * (nvars + 1)  # Number of free levels from each level
+    for level in range(nvars - 1, -1, -1):
+        free_from[level] = free_from[level + 1] + (fixed_list[level] == FREE)
+
+    # Configurations of each (regular) node over the levels from its own, consistent with the assignment
+    up = [0] * len(var_list)
+
+    def value(edge: int) -> int:
+        node = edge >> 1
+        return (1 << free_from[levels[node]]) - up[node] if edge & 1 else up[node]
+
+    for i, var in enumerate(var_list):
+        if var == TERMINAL_VAR:
+            up[i] = 1
+            continue
+        level = levels[i]
+        for edge, branch in ((then_list[i], 1), (else_list[i], 0)):
+            if fixed_list[level] in (FREE, branch):
+                up[i] += (1 << (free_from[level + 1] - free_from[levels[edge >> 1]])) * value(edge)
+
+    # Each cube is expanded in full, so the configurations of the cubes of a subtree are
+    # contiguous and they include the free levels above the subtree (prefix)
+    cube = fixed.copy()
+    stack = [(-1, 0, table.roots[0] if root is None else root, 0)]  # Decision (level, value), edge to follow and free levels above
+    while stack:
+        level, branch, edge, prefix_free = stack.pop()
+        start = level + 1
+        child_level = levels[edge >> 1]
+        skipped_free = free_from[start] - free_from[child_level]
+        mass = (1 << (prefix_free + skipped_free)) * value(edge)
+        if mass == 0:
+            continue
+        if offset >= mass:
+            offset -= mass
+            continue
+        if level >= 0:
+            cube[level] = branch
+        cube[start:child_level] = fixed[start:child_level]
+        if child_level == nvars:  # True terminal (the false one has no configurations)
+            yield (cube, offset)
+            offset = 0
+            continue
+        node, polarity = edge >> 1, edge & 1
+        for child_edge, child_branch in ((else_list[node], 0), (then_list[node], 1)):
+            if fixed_list[child_level] in (FREE, child_branch):
+                stack.append((child_level, child_branch, child_edge ^ polarity, prefix_free + skipped_free))
+
+
+def configuration_chunks(table: BDDTable,
+                         root: Optional[int] = None,
+                         assignment: Optional[dict[str, bool]] = None,
+                         offset: int = 0,
+                         limit: Optional[int] = None,
+                         chunk_rows: int = CHUNK_ROWS) -> Iterator[np.ndarray]:
+    """Configurations of the BDD in chunks of rows (uint8 arrays of 0/1, a column per variable in
+    the order of the BDD) of at most chunk_rows configurations.
+
+    The configurations consistent with the partial assignment are enumerated from the offset,
+    up to the limit. The don't-care variables of the cubes are expanded lazily. The chunk array
+    is reused: it must be consumed (or copied) before the next chunk.
+    """
+    nvars = len(table.order)
+    remaining = limit
+    buffer = np.empty((chunk_rows, nvars), dtype=np.uint8)
+    position = 0
+    for cube, skipped in cubes(table, root, assignment, offset):
+        free = np.flatnonzero(cube == FREE)
+        low, high = free[:LOW_BITS], free[LOW_BITS:]
+        shifts = np.arange(len(low), dtype=np.uint64)
+        index, end = skipped, 1 << len(free)
+        while index < end:
+            if remaining is not None and remaining == 0:
+                break
+            hi, lo = index >> LOW_BITS, index & ((1 << LOW_BITS) - 1)
+            count = min(end - index, (1 << len(low)) - lo, chunk_rows - position)
+            if remaining is not None:
+                count = min(count, remaining)
+            rows = buffer[position:position + count]
+            rows[:] = cube
+            rows[:, high] = [(hi >> i) & 1 for i in range(len(high))]
+            if len(low):
+                values = np.arange(lo, lo + count, dtype=np.uint64)
+                rows[:, low] = (values[:, None] >> shifts) & 1
+            position += count
+            index += count
+            if remaining is not None:
+                remaining -= count
+            if position == chunk_rows:
+                yield buffer
+                position = 0
+        if remaining is not None and remaining == 0:
+            break
+    if position:
+        yield buffer[:position]
+
+
+def configurations(table: BDDTable,
+                   root: Optional[int] = None,
+                   assignment: Optional[dict[str, bool]] = None,
+                   offset: int = 0,
+                   limit: Optional[int] = None) -> Iterator[list[str]]:
+    """Configurations of the BDD as the lists of their selected variables (see configuration_chunks)."""
+    order = np.array(table.order, dtype=object)
+    for chunk in configuration_chunks(table, root, assignment, offset, limit):
+        for row in chunk:
+            yield order[row.astype(bool)].tolist()
+
+
+def write_configurations(table: BDDTable,
+                         output: BinaryIO,
+                         fmt: str = TEXT_FORMAT,
+                         root: Optional[int] = None,
+                         assignment: Optional[dict[str, bool]] = None,
+                         offset: int = 0,
+                         limit: Optional[int] = None) -> int:
+    """Write the configurations of the BDD in the output (a binary file or pipe) in the format.
+
+    Return the number of configurations written.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f'Unknown format: {fmt}.')
+    if fmt == TEXT_FORMAT:
+        output.write((' '.join(table.order) + '\n').encode('utf8'))
+    n = 0
+    lines = np.empty((CHUNK_ROWS, len(table.order) + 1), dtype=np.uint8)
+    lines[:, -1] = ord('\n')
+    for chunk in configuration_chunks(table, root, assignment, offset, limit):
+        if fmt == TEXT_FORMAT:
+            np.add(chunk, ord('0'), out=lines[:len(chunk), :-1])
+            output.write(lines[:len(chunk)].tobytes())
+        else:
+            output.write(np.packbits(chunk, axis=1, bitorder='little').tobytes())
+        n += len(chunk)
+    return n
+
+
+def parse_assignment(literals: list[str]) -> dict[str, bool]:
+    """Partial assignment of literals 'var' (selected) or '!var' (deselected)."""
+    return {literal.removeprefix('!'): not literal.startswith('!') for literal in literals}
+
+
+if __name__ == '__main__':
+    import argparse
+    from utils.dddmp import read_bdd
+
+    parser = argparse.ArgumentParser(description='Enumerate the configurations of a BDD (.dddmp or .bddb) with bounded memory.')
+    parser.add_argument(metavar='bddfile', dest='bddfile', type=str, help='Input BDD file.')
+    parser.add_argument('-o', metavar='outputfile', dest='outputfile', type=str, required=False, help='Output file (default: stdout).')
+    parser.add_argument('-format', metavar='format', dest='format', type=str, required=False, default=TEXT_FORMAT, choices=FORMATS, help='Format of the configurations (default: text).')
+    parser.add_argument('-offset', metavar='offset', dest='offset', type=int, required=False, default=0, help='Number of configurations to skip.')
+    parser.add_argument('-limit', metavar='limit', dest='limit', type=int, required=False, help='Maximum number of configurations.')
+    parser.add_argument('-assign', metavar='literal', dest='assign', type=str, nargs='+', required=False, default=[], help="Partial assignment: variables selected ('var') or deselected ('!var').")
+    args = parser.parse_args()
+
+    table = read_bdd(args.bddfile)
+    assignment = parse_assignment(args.assign)
+    if args.outputfile:
+        with open(args.outputfile, 'wb') as file:
+            n = write_configurations(table, file, args.format, None, assignment, args.offset, args.limit)
+    else:
+        n = write_configurations(table, sys.stdout.buffer, args.format, None, assignment, args.offset, args.limit)
+        sys.stdout.flush()
+    print(f'{n} configurations.', file=sys.stderr)
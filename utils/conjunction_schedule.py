@@ -0,0 +1,56 @@
+from utils import logic_reader
+
+
+# Schedules (orders) to conjoin the expressions of a model, given the order of the variables
+FILE_SCHEDULE = 'file'  # Order of the .exp file: relations of the feature tree (DFS), then constraints
+SPAN_SCHEDULE = 'span'  # Expressions with small span first
+LOCALITY_SCHEDULE = 'locality'  # Sweep of the variable order: by the position of the last variable
+BUCKET_SCHEDULE = 'bucket'  # Buckets of expressions with the same top variable, from the bottom
+SCHEDULES = [FILE_SCHEDULE, SPAN_SCHEDULE, LOCALITY_SCHEDULE, BUCKET_SCHEDULE]
+
+
+def get_positions(expressions_vars: list[list[str]], order: list[str]) -> list[tuple[int, int]]:
+    """Return the positions of the top (first) and bottom (last) variables of each expression.
+
+    Expressions without variables are at position -1.
+    """
+    position = {var: i for i, var in enumerate(order)}
+    result = []
+    for vars in expressions_vars:
+        positions = [position[var] for var in vars if var in position]
+        result.append((min(positions), max(positions)) if positions else (-1, -1))
+    return result
+
+
+def cluster_expressions(expressions: list[str], order: list[str], schedule: str) -> list[list[str]]:
+    """Return the expressions grouped in clusters in the order they should be conjoined.
+
+    Only the bucket schedule groups the expressions (each bucket is conjoined before being
+    conjoined with the rest of the BDD); the rest of the schedules return unit clusters.
+    Except in the file schedule, the unit expressions (e.g., the root feature) are conjoined
+    first because they only reduce the BDD, and ties keep the order of the file.
+    """
+    if schedule not in SCHEDULES:
+        raise ValueError(f'Unknown schedule: {schedule}.')
+    if schedule == FILE_SCHEDULE:
+        return [[exp] for exp in expressions]
+    expressions_vars = [logic_reader.get_expression_variables(exp) for exp in expressions]
+    positions = get_positions(expressions_vars, order)
+    units = [i for i, vars in enumerate(expressions_vars) if len(vars) <= 1]
+    rest = [i for i, vars in enumerate(expressions_vars) if len(vars) > 1]
+    if schedule == SPAN_SCHEDULE:
+        rest.sort(key=lambda i: positions[i][1] - positions[i][0])
+    elif schedule == LOCALITY_SCHEDULE:
+        rest.sort(key=lambda i: (positions[i][1], positions[i][0]))
+    elif schedule == BUCKET_SCHEDULE:
+        buckets: dict[int, list[str]] = {}
+        for i in rest:
+            buckets.setdefault(positions[i][0], []).append(expressions[i])
+        return ([[expressions[i] for i in units]] if units else []) + \
+               [buckets[top] for top in sorted(buckets, reverse=True)]
+    return [[expressions[i]] for i in units + rest]
+
+
+def schedule_expressions(expressions: list[str], order: list[str], schedule: str) -> list[str]:
+    """Return the expressions in the order they should be conjoined."""
+    return [exp for cluster in cluster_expressions(expressions, order, schedule) for exp in cluster]
@@ -0,0 +1,273 @@
+import io
+import json
+import mmap
+import zlib
+import struct
+import pathlib
+from typing import Any, Optional
+
+import numpy as np
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+
+# Binary format of the BDDs (.bddb): a node table with fixed-width little-endian arrays
+#   - Fixed header: magic, version, compression, length of the JSON header, number of nodes.
+#   - JSON header: variables (and their ids), order, roots (and root names), and compressed block sizes.
+#   - Node table (aligned to 8 bytes): var (uint32), then (uint32), else (uint32) arrays.
+# The edges are encoded as (index of the node << 1) | complement bit. The terminal node (true)
+# has the variable TERMINAL_VAR.
+BINARY_EXTENSION = '.bddb'
+MAGIC = b'BDDB'
+VERSION = 1
+FIXED_HEADER = struct.Struct('<4sHHII')
+TERMINAL_VAR = 0xFFFFFFFF
+DTYPE = np.dtype('<u4')
+ALIGNMENT = 8
+BLOCK_BYTES = 4 * 2 ** 20  # Size of the compressed blocks of the node table (uncompressed)
+
+# Compression of the node table
+NO_COMPRESSION = 'none'
+ZLIB_COMPRESSION = 'zlib'
+ZSTD_COMPRESSION = 'zstd'
+LZ4_COMPRESSION = 'lz4'
+COMPRESSIONS = [NO_COMPRESSION, ZLIB_COMPRESSION, ZSTD_COMPRESSION, LZ4_COMPRESSION]
+
+
+class BDDTable():
+    """Node table of a BDD (or several roots sharing their nodes) in NumPy arrays.
+
+    The nodes are in bottom-up order (children before parents) and the variables of the nodes
+    are indexes of the support variables (whose ids in the BDD manager are also kept). The order
+    is the list of all the variables of the BDD manager by level.
+    """
+
+    def __init__(self,
+                 variables: list[str],
+                 ids: list[int],
+                 order: list[str],
+                 var: np.ndarray,
+                 then: np.ndarray,
+                 else_: np.ndarray,
+                 roots: list[int],
+                 root_names: Optional[list[str]] = None) -> None:
+        self.variables = variables
+        self.ids = ids
+        self.order = order
+        self.var = var
+        self.then = then
+        self.else_ = else_
+        self.roots = roots
+        self.root_names = root_names
+
+    def nodes(self) -> int:
+        return len(self.var)
+
+
+def check_compression(compression: str) -> None:
+    if compression not in COMPRESSIONS:
+        raise ValueError(f'Unknown compression: {compression}.')
+    if compression == ZSTD_COMPRESSION and zstandard is None:
+        raise ValueError('The zstandard library is required (pip install zstandard).')
+    if compression == LZ4_COMPRESSION and lz4 is None:
+        raise ValueError('The lz4 library is required (pip install lz4).')
+
+
+def _compress(data: bytes, compression: str) -> bytes:
+    if compression == ZSTD_COMPRESSION:
+        return zstandard.ZstdCompressor().compress(data)
+    if compression == LZ4_COMPRESSION:
+        return lz4.frame.compress(data)
+    return zlib.compress(data)
+
+
+def _decompress(data: bytes, compression: str) -> bytes:
+    if compression == ZSTD_COMPRESSION:
+        return zstandard.ZstdDecompressor().decompress(data)
+    if compression == LZ4_COMPRESSION:
+        return lz4.frame.decompress(data)
+    return zlib.decompress(data)
+
+
+def read_dddmp(filepath: str) -> BDDTable:
+    """Read a BDD from a .dddmp file (text mode, as written by CUDD or dd_backend.dump_dddmp)."""
+    header: dict[str, list[str]] = {}
+    with open(filepath, 'r', encoding='utf8') as file:
+        for line in file:
+            if line.startswith('.nodes'):
+                break
+            key, _, value = line.strip().partition(' ')
+            header[key] = value.split()
+        content = file.read()
+    content = content[:content.rindex('.end')] if '.end' in content else content
+    varinfo = int(header.get('.varinfo', ['0'])[0])
+    nnodes = int(header['.nnodes'][0])
+    columns = 4 if varinfo == 4 else 5  # id, [var info], var index, then, else
+    fields = np.array(content.split(), dtype=object).reshape(nnodes, columns)
+    node_ids = fields[:, 0].astype(np.int64)
+    indexes = fields[:, columns - 3].astype(np.int64)
+    then_ids = fields[:, columns - 2].astype(np.int64)
+    else_ids = fields[:, columns - 1].astype(np.int64)
+    if not np.array_equal(node_ids, np.arange(1, nnodes + 1)):
+        raise ValueError(f'Unexpected node ids in {filepath}.')
+
+    variables = header.get('.suppvarnames', [])
+    ids = [int(var_id) for var_id in header.get('.ids', [])]
+    # Variable of each node: CUDD writes its position in the support variables (.suppvarnames),
+    # not its id in the manager (the declared variables outside the support are not numbered)
+    terminal = (then_ids == 0) & (else_ids == 0)
+    var = np.where(terminal, TERMINAL_VAR, indexes).astype(DTYPE)
+    roots = [encode_edge(int(r)) for r in header.get('.rootids', [])]
+    return BDDTable(variables, ids, header.get('.orderedvarnames', variables),
+                    var, _encode_edges(then_ids, terminal), _encode_edges(else_ids, terminal),
+                    roots, header.get('.rootnames'))
+
+
+def encode_edge(dddmp_id: int) -> int:
+    """Encode a node id of a .dddmp file (negative if complemented) as an edge of the table."""
+    return ((abs(dddmp_id) - 1) << 1) | (1 if dddmp_id < 0 else 0)
+
+
+def decode_edge(edge: int) -> int:
+    """Decode an edge of the table as a node id of a .dddmp file (negative if complemented)."""
+    dddmp_id = (edge >> 1) + 1
+    return -dddmp_id if edge & 1 else dddmp_id
+
+
+def _encode_edges(ids: np.ndarray, terminal: np.ndarray) -> np.ndarray:
+    edges = ((np.abs(ids) - 1) << 1) | (ids < 0)
+    edges[terminal] = 0
+    return edges.astype(DTYPE)
+
+
+def write_dddmp(table: BDDTable, filepath: str) -> None:
+    """Write the BDD in a .dddmp file (text mode, variable names as var info)."""
+    level = {var: i for i, var in enumerate(table.order)}
+    ids = table.ids
+    with open(filepath, 'w', encoding='utf8') as file:
+        file.write('.ver DDDMP-2.0\n.mode A\n.varinfo 3\n')
+        file.write(f'.nnodes {table.nodes()}\n.nvars {len(table.order)}\n')
+        file.write(f'.nsuppvars {len(table.variables)}\n.suppvarnames {" ".join(table.variables)}\n')
+        file.write(f'.orderedvarnames {" ".join(table.order)}\n')
+        file.write(f'.ids {" ".join(map(str, ids))}\n.permids {" ".join(str(level[var]) for var in table.variables)}\n')
+        file.write(f'.nroots {len(table.roots)}\n.rootids {" ".join(str(decode_edge(r)) for r in table.roots)}\n')
+        if table.root_names is not None:
+            file.write(f'.rootnames {" ".join(table.root_names)}\n')
+        file.write('.nodes\n')
+        buffer = io.StringIO()
+        for i, (v, t, e) in enumerate(zip(table.var.tolist(), table.then.tolist(), table.else_.tolist()), 1):
+            if v == TERMINAL_VAR:
+                buffer.write(f'{i} T 1 0 0\n')
+            else:
+                buffer.write(f'{i} {table.variables[v]} {v} {decode_edge(t)} {decode_edge(e)}\n')
+        file.write(buffer.getvalue())
+        file.write('.end\n')
+
+
+def write_binary(table: BDDTable, filepath: str, compression: str = NO_COMPRESSION) -> None:
+    """Write the BDD in the binary format (.bddb), optionally with block compression."""
+    check_compression(compression)
+    data = b''.join(np.ascontiguousarray(a, dtype=DTYPE).tobytes() for a in (table.var, table.then, table.else_))
+    blocks = []
+    if compression != NO_COMPRESSION:
+        blocks = [_compress(data[i:i + BLOCK_BYTES], compression) for i in range(0, len(data), BLOCK_BYTES)]
+    header = {'variables': table.variables, 'ids': table.ids, 'order': table.order, 'roots': table.roots,
+              'root_names': table.root_names, 'blocks': [len(b) for b in blocks]}
+    header_bytes = json.dumps(header).encode('utf8')
+    offset = FIXED_HEADER.size + len(header_bytes)
+    header_bytes += b' ' * (-offset % ALIGNMENT)  # Alignment of the node table
+    with open(filepath, 'wb') as file:
+        file.write(FIXED_HEADER.pack(MAGIC, VERSION, COMPRESSIONS.index(compression), len(header_bytes), table.nodes()))
+        file.write(header_bytes)
+        if compression == NO_COMPRESSION:
+            file.write(data)
+        else:
+            for block in blocks:
+                file.write(block)
+
+
+def read_binary_header(filepath: str) -> tuple[dict[str, Any], str, int, int]:
+    """Return the JSON header, the compression, the number of nodes and the offset of the node
+    table of a .bddb file."""
+    with open(filepath, 'rb') as file:
+        magic, version, compression, header_length, nnodes = FIXED_HEADER.unpack(file.read(FIXED_HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'Not a binary BDD file (version {VERSION}): {filepath}.')
+        header = json.loads(file.read(header_length))
+    return (header, COMPRESSIONS[compression], nnodes, FIXED_HEADER.size + header_length)
+
+
+def read_binary(filepath: str) -> BDDTable:
+    """Read a BDD from the binary format (.bddb).
+
+    Uncompressed files are memory-mapped: the arrays are read-only views of the file, loaded
+    lazily by the operating system.
+    """
+    header, compression, nnodes, offset = read_binary_header(filepath)
+    check_compression(compression)
+    size = 3 * nnodes * DTYPE.itemsize
+    if compression == NO_COMPRESSION:
+        with open(filepath, 'rb') as file:
+            buffer: Any = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        data = np.frombuffer(buffer, dtype=DTYPE, count=3 * nnodes, offset=offset if size else 0)
+    else:
+        data = np.empty(3 * nnodes, dtype=DTYPE)
+        view = memoryview(data).cast('B')
+        position = 0
+        with open(filepath, 'rb') as file:
+            file.seek(offset)
+            for block_size in header['blocks']:
+                block = _decompress(file.read(block_size), compression)
+                view[position:position + len(block)] = block
+                position += len(block)
+    return BDDTable(header['variables'], header['ids'], header['order'],
+                    data[:nnodes], data[nnodes:2 * nnodes], data[2 * nnodes:],
+                    header['roots'], header['root_names'])
+
+
+def is_binary(filepath: str) -> bool:
+    with open(filepath, 'rb') as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+
+def read_bdd(filepath: str) -> BDDTable:
+    """Read a BDD from a .dddmp or a .bddb file."""
+    return read_binary(filepath) if is_binary(filepath) else read_dddmp(filepath)
+
+
+def convert(filepath: str, outputfile: Optional[str] = None, compression: str = NO_COMPRESSION) -> str:
+    """Convert a .dddmp file to the binary format, or a .bddb file back to .dddmp.
+
+    Return the output file (by default, next to the input file with the other extension).
+    """
+    path = pathlib.Path(filepath)
+    if is_binary(filepath):
+        outputfile = outputfile or str(path.with_suffix('.dddmp'))
+        write_dddmp(read_binary(filepath), outputfile)
+    else:
+        outputfile = outputfile or str(path.with_suffix(BINARY_EXTENSION))
+        write_binary(read_dddmp(filepath), outputfile, compression)
+    return outputfile
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Convert BDDs between the .dddmp text format and the binary node-table format (.bddb).')
+    parser.add_argument(metavar='path', dest='path', type=str, nargs='+', help='Input BDD files (.dddmp or .bddb).')
+    parser.add_argument('-o', metavar='outputfile', dest='outputfile', type=str, required=False, help='Output file (only for a single input file).')
+    parser.add_argument('-compression', metavar='compression', dest='compression', type=str, required=False, default=NO_COMPRESSION, choices=COMPRESSIONS, help='Block compression of the binary format (default: none, memory-mapped loading).')
+    args = parser.parse_args()
+
+    if args.outputfile and len(args.path) > 1:
+        parser.error('The output file can only be given for a single input file.')
+    for filepath in args.path:
+        print(convert(filepath, args.outputfile, args.compression))
@@ -0,0 +1,76 @@
+import pathlib
+from typing import TYPE_CHECKING, Any, Iterable, Optional
+
+if TYPE_CHECKING:
+    import numpy as np
+
+from utils.utils import int2str, str2int, log10, int2sci, get_filepaths
+
+
+# Exact number of configurations of a model (decimal digits) in a <<model>>.count file next to its BDD
+COUNT_EXTENSION = '.count'
+
+
+def count_filepath(bdd_filepath: str) -> str:
+    """Count file of a BDD (.dddmp or .bddb)."""
+    return str(pathlib.Path(bdd_filepath).with_suffix(COUNT_EXTENSION))
+
+
+def write_count(filepath: str, n: int) -> None:
+    """Write the exact number of configurations of a model in its count file."""
+    with open(filepath, 'w', encoding='utf8') as file:
+        file.write(int2str(n) + '\n')
+
+
+def read_count(bdd_filepath: str) -> Optional[int]:
+    """Exact number of configurations of the model of the BDD (or of its count file), or None if
+    it has not been counted."""
+    filepath = bdd_filepath if bdd_filepath.endswith(COUNT_EXTENSION) else count_filepath(bdd_filepath)
+    if not pathlib.Path(filepath).exists():
+        return None
+    with open(filepath, 'r', encoding='utf8') as file:
+        return str2int(file.read())
+
+
+def read_counts(dirpath: str) -> dict[str, int]:
+    """Exact number of configurations of the models of the count files of a directory (by model)."""
+    return {pathlib.Path(filepath).name.removesuffix(COUNT_EXTENSION): read_count(filepath)
+            for filepath in sorted(get_filepaths(dirpath, [COUNT_EXTENSION]))}
+
+
+def log10_counts(counts: Iterable[int]) -> 'np.ndarray':
+    """Logarithms in base 10 of the counts (-inf for 0) as a float array, for the statistics of the
+    corpus (the counts above 1e308 cannot be converted to float)."""
+    import numpy as np
+    return np.fromiter((log10(n) for n in counts), dtype=np.float64)
+
+
+def count_statistics(counts: Iterable[int]) -> dict[str, Any]:
+    """Statistics of the counts of a corpus: exact total, minimum and maximum, and the mean,
+    median and percentiles of the orders of magnitude (log10, over the non-zero counts)."""
+    import numpy as np
+    counts = list(counts)
+    logs = log10_counts(n for n in counts if n > 0)
+    stats: dict[str, Any] = {'models': len(counts), 'zero': len(counts) - len(logs),
+                             'total': sum(counts),
+                             'min': min(counts, default=None), 'max': max(counts, default=None)}
+    if len(logs):
+        stats.update({'log10_mean': float(np.mean(logs)), 'log10_median': float(np.median(logs)),
+                      'log10_p5': float(np.percentile(logs, 5)), 'log10_p95': float(np.percentile(logs, 95))})
+    return stats
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Statistics of the exact number of configurations of the models (.count files).')
+    parser.add_argument(metavar='path', dest='path', type=str, help='Directory with the .count files (e.g., bdd).')
+    parser.add_argument('-exact', dest='exact', action='store_true', required=False, help='Print the exact counts of the models.')
+    args = parser.parse_args()
+
+    counts = read_counts(args.path)
+    if args.exact:
+        for model, n in counts.items():
+            print(f'{model}: {int2str(n)}')
+    for key, value in count_statistics(counts.values()).items():
+        print(f'{key}: {int2sci(value) if isinstance(value, int) and value > 1e6 else value}')
@@ -53,89 +53,58 @@ class FmToBDD(ModelToModel):
         return propositional_formula
 
     def _get_relation_formula(self, relation: Relation) -> str:
+        assert self.destination_model is not None, "destination_model is None"
+        # Resolve the variables of the relation only once
+        features_variables = self.destination_model.features_variables
+        parent = features_variables[relation.parent.name]
+        children = [features_variables[child.name] for child in relation.children]
         result = ''
         if relation.is_mandatory():
-            result = self._get_mandatory_formula(relation)
+            result = self._get_mandatory_formula(parent, children)
         elif relation.is_optional():
-            result = self._get_optional_formula(relation)
+            result = self._get_optional_formula(parent, children)
         elif relation.is_or():
-            result = self._get_or_formula(relation)
+            result = self._get_or_formula(parent, children)
         elif relation.is_alternative():
-            result = self._get_alternative_formula(relation)
+            result = self._get_alternative_formula(parent, children)
         elif relation.is_mutex():
-            result = self._get_mutex_formula(relation)
+            result = self._get_mutex_formula(parent, children)
         elif relation.is_cardinal():
-            result = self._get_cardinality_formula(relation)
+            result = self._get_cardinality_formula(parent, children, relation.card_min, relation.card_max)
         return result
 
-    def _get_mandatory_formula(self, relation: Relation) -> str:
-        assert self.destination_model is not None, "destination_model is None"
-        parent = self.destination_model.features_variables[relation.parent.name]
-        child = self.destination_model.features_variables[relation.children[0].name]
-        return f'{parent} <=> {child}'
+    def _get_mandatory_formula(self, parent: str, children: list[str]) -> str:
+        return f'{parent} <=> {children[0]}'
 
-    def _get_optional_formula(self, relation: Relation) -> str:
-        assert self.destination_model is not None, "destination_model is None"
-        parent = self.destination_model.features_variables[relation.parent.name]
-        child = self.destination_model.features_variables[relation.children[0].name]
-        return f'{child} => {parent}'
+    def _get_optional_formula(self, parent: str, children: list[str]) -> str:
+        return f'{children[0]} => {parent}'
 
-    def _get_or_formula(self, relation: Relation) -> str:
-        assert self.destination_model is not None, "destination_model is None"
-        parent = self.destination_model.features_variables[relation.parent.name]
-        children = " | ".join(
-            self.destination_model.features_variables[child.name] 
-            for child in relation.children
-        )
-        return f'{parent} <=> ({children})'
+    def _get_or_formula(self, parent: str, children: list[str]) -> str:
+        return f'{parent} <=> ({" | ".join(children)})'
 
-    def _get_alternative_formula(self, relation: Relation) -> str:
+    def _get_alternative_formula(self, parent: str, children: list[str]) -> str:
+        negatives = ['!' + child for child in children]
         formula = []
-        assert self.destination_model is not None, "destination_model is None"
-        parent = self.destination_model.features_variables[relation.parent.name]
-        children = [self.destination_model.features_variables[child.name] 
-                    for child in relation.children]
-        for child in children:
-            children_negatives = set(children) - {child}
-            formula.append(f'{child} <=> '
-                           f'({" & ".join("!" + ch for ch in children_negatives)} '
-                           f'& {parent})')
-        return " & ".join(f'({f})' for f in formula)
-
-    def _get_mutex_formula(self, relation: Relation) -> str:
-        formula = []
-        assert self.destination_model is not None, "destination_model is None"
-        parent = self.destination_model.features_variables[relation.parent.name]
-        children = {self.destination_model.features_variables[child.name] 
-                    for child in relation.children}
-        for child in children:
-            children_negatives = children - {child}
-            formula.append(f'{child} <=> '
-                           f'({" & ".join("!" + cn for cn in children_negatives)} '
-                           f'& {parent})')
-        formula_str = " & ".join(f'({f})' for f in formula)
-        return f'({parent} <=> ' \
-            f'!({" | ".join(child for child in children)})) | ({formula_str})'
-
-    def _get_cardinality_formula(self, relation: Relation) -> str:
-        assert self.destination_model is not None, "destination_model is None"
-        parent = self.destination_model.features_variables[relation.parent.name]
-        children = {self.destination_model.features_variables[child.name] 
-                    for child in relation.children}
+        for i, child in enumerate(children):
+            children_negatives = " & ".join(negatives[:i] + negatives[i + 1:])
+            formula.append(f'({child} <=> ({children_negatives} & {parent}))')
+        return " & ".join(formula)
+
+    def _get_mutex_formula(self, parent: str, children: list[str]) -> str:
+        formula_str = self._get_alternative_formula(parent, children)
+        return f'({parent} <=> !({" | ".join(children)})) | ({formula_str})'
+
+    def _get_cardinality_formula(self, parent: str, children: list[str], card_min: int, card_max: int) -> str:
+        negatives = ['!' + child for child in children]
+        indexes = range(len(children))
         or_ctc = []
-        for k in range(relation.card_min, relation.card_max + 1):
-            combi_k = list(itertools.combinations(children, k))
-            for positives in combi_k:
-                negatives = children - set(positives)
-                positives_and_ctc = f'{" & ".join(positives)}'
-                negatives_and_ctc = f'{" & ".join("!" + f for f in negatives)}'
-                if positives_and_ctc and negatives_and_ctc:
-                    and_ctc = f'{positives_and_ctc} & {negatives_and_ctc}'
-                else:
-                    and_ctc = f'{positives_and_ctc}{negatives_and_ctc}'
-                or_ctc.append(and_ctc) 
-        formula_or_ctc = f'{" | ".join(or_ctc)}'
-        return f'{parent} <=> {formula_or_ctc}'
+        for k in range(card_min, card_max + 1):
+            for positives in itertools.combinations(indexes, k):
+                positives_set = set(positives)
+                literals = [children[i] for i in positives]
+                literals.extend(negatives[i] for i in indexes if i not in positives_set)
+                or_ctc.append(" & ".join(literals))
+        return f'{parent} <=> {" | ".join(or_ctc)}'
 
     def _get_constraint_formula(self, ctc: Constraint) -> str:
         assert self.destination_model is not None, "destination_model is None"
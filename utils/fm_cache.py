@@ -0,0 +1,154 @@
+import os
+import pickle
+import hashlib
+import logging
+import pathlib
+import tempfile
+from typing import Any, Optional
+
+from flamapy.core.models.ast import AST, Node, ASTOperation, NodeType
+from flamapy.metamodels.fm_metamodel.models import (
+    FeatureModel, Feature, Relation, Constraint, Attribute, Domain, Range, FeatureType, Cardinality
+)
+from flamapy.metamodels.fm_metamodel.transformations import UVLReader
+
+
+LOGGER = logging.getLogger(__name__)
+
+CACHE_DIR = '.fm_cache'
+CACHE_VERSION = 1  # Increase it when the encoding changes to invalidate the cached models
+CACHE_EXTENSION = '.pickle'
+
+
+class NotCacheable(Exception):
+    """The feature model uses elements not supported by the encoding (e.g., imports)."""
+    pass
+
+
+def read_feature_model(fm_filepath: str, cache_dir: Optional[str] = CACHE_DIR) -> FeatureModel:
+    """Return the feature model of a UVL file, from the cache if the file has been parsed before.
+
+    The cached models are keyed by the hash of the content of the file, so a modified file is
+    parsed again. The models that cannot be encoded (e.g., with imports) are not cached.
+    If the cache directory is None, the cache is not used.
+    """
+    if cache_dir is None:
+        return UVLReader(fm_filepath).transform()
+    with open(fm_filepath, 'rb') as file:
+        key = hashlib.sha256(file.read()).hexdigest()
+    cache_filepath = pathlib.Path(cache_dir) / f'{key}-{CACHE_VERSION}{CACHE_EXTENSION}'
+    if cache_filepath.exists():
+        try:
+            with open(cache_filepath, 'rb') as file:
+                return decode_feature_model(pickle.load(file))
+        except Exception as e:
+            LOGGER.warning('Invalid cached model %s for %s: %s. Parsed again.', cache_filepath, fm_filepath, e)
+    fm = UVLReader(fm_filepath).transform()
+    try:
+        data = encode_feature_model(fm)
+    except NotCacheable as e:
+        LOGGER.debug('Feature model %s not cached: %s', fm_filepath, e)
+        return fm
+    cache_filepath.parent.mkdir(parents=True, exist_ok=True)
+    # Written atomically because several processes may share the cache
+    with tempfile.NamedTemporaryFile('wb', dir=cache_filepath.parent, delete=False) as file:
+        pickle.dump(data, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(file.name, cache_filepath)
+    return fm
+
+
+def encode_feature_model(fm: FeatureModel) -> tuple[Any, ...]:
+    """Encode the feature model as a compact structure of tuples with integer feature ids.
+
+    The features are encoded in pre-order as (name, is_abstract, type, cardinality min,
+    cardinality max, attributes), the relations as (parent id, children ids, min, max), and
+    the constraints as (name, AST encoded as nested tuples).
+    """
+    if fm.imports or fm.alias_namespace:
+        raise NotCacheable('imports are not supported.')
+    if fm.root is None:
+        return ((), (), ())
+    features = []
+    relations = []
+    ids: dict[int, int] = {}
+    stack = [fm.root]
+    while stack:
+        feature = stack.pop()
+        if feature.reference is not None or feature.constraints_attributes:
+            raise NotCacheable('references and attribute constraints are not supported.')
+        ids[id(feature)] = len(features)
+        features.append((feature.name, feature.is_abstract, feature.feature_type.value,
+                         feature.feature_cardinality.min, feature.feature_cardinality.max,
+                         tuple(encode_attribute(a) for a in feature.get_attributes())))
+        stack.extend(reversed(feature.get_children()))
+    for feature in fm.get_features():
+        for relation in feature.get_relations():
+            relations.append((ids[id(feature)], tuple(ids[id(c)] for c in relation.children),
+                              relation.card_min, relation.card_max))
+    constraints = tuple((c.name, encode_node(c.ast.root)) for c in fm.get_constraints())
+    return (tuple(features), tuple(relations), constraints)
+
+
+def decode_feature_model(data: tuple[Any, ...]) -> FeatureModel:
+    encoded_features, encoded_relations, encoded_constraints = data
+    if not encoded_features:
+        return FeatureModel(None)
+    features = []
+    for name, is_abstract, feature_type, card_min, card_max, attributes in encoded_features:
+        feature = Feature(name, [], None, is_abstract, FeatureType(feature_type), Cardinality(card_min, card_max))
+        for attribute in attributes:
+            feature.add_attribute(decode_attribute(attribute))
+        features.append(feature)
+    for parent_id, children_ids, card_min, card_max in encoded_relations:
+        parent = features[parent_id]
+        children = [features[i] for i in children_ids]
+        for child in children:
+            child.parent = parent
+        parent.add_relation(Relation(parent, children, card_min, card_max))
+    constraints = [Constraint(name, AST(decode_node(node))) for name, node in encoded_constraints]
+    return FeatureModel(features[0], constraints)
+
+
+def encode_attribute(attribute: Attribute) -> tuple[Any, ...]:
+    if not is_plain_value(attribute.default_value) or not is_plain_value(attribute.null_value):
+        raise NotCacheable('nested attributes are not supported.')
+    domain = attribute.domain
+    ranges = tuple((r.min_value, r.max_value) for r in domain.range_list) if domain is not None else None
+    elements = tuple(domain.element_list) if domain is not None else None
+    if elements is not None and not is_plain_value(list(elements)):
+        raise NotCacheable('domains with non-plain elements are not supported.')
+    return (attribute.name, ranges, elements, attribute.default_value, attribute.null_value)
+
+
+def decode_attribute(data: tuple[Any, ...]) -> Attribute:
+    name, ranges, elements, default_value, null_value = data
+    domain = None
+    if ranges is not None:
+        domain = Domain([Range(min_value, max_value) for min_value, max_value in ranges], list(elements))
+    return Attribute(name, domain, default_value, null_value)
+
+
+def is_plain_value(value: Any) -> bool:
+    if isinstance(value, list):
+        return all(is_plain_value(v) for v in value)
+    return value is None or isinstance(value, (bool, int, float, str))
+
+
+def encode_node(node: Optional[Node]) -> Optional[tuple[Any, ...]]:
+    """Encode an AST node as (is operation, data, node type, left, right)."""
+    if node is None:
+        return None
+    if not is_plain_value(node.data) and not isinstance(node.data, ASTOperation):
+        raise NotCacheable(f'AST term {node.data!r} is not supported.')
+    is_op = isinstance(node.data, ASTOperation)
+    return (is_op, node.data.value if is_op else node.data,
+            node.node_type.value if node.node_type is not None else None,
+            encode_node(node.left), encode_node(node.right))
+
+
+def decode_node(data: Optional[tuple[Any, ...]]) -> Optional[Node]:
+    if data is None:
+        return None
+    is_op, value, node_type, left, right = data
+    return Node(ASTOperation(value) if is_op else value, decode_node(left), decode_node(right),
+                NodeType(node_type) if node_type is not None else None)
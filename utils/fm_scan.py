@@ -0,0 +1,222 @@
+import os
+import re
+import json
+import logging
+import pathlib
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Optional
+
+from utils import utils
+
+
+LOGGER = logging.getLogger(__name__)
+
+MANIFEST_FILE = 'manifest.json'
+MANIFEST_VERSION = 1  # Increase it when the scan changes to scan the models again
+SCAN_CHUNKSIZE = 16  # Models per task of the worker processes
+
+# Major and minor language levels, with the names of flamapy's MajorLevel and MinorLevel
+BOOLEAN_LEVEL = 'BOOLEAN'
+ARITHMETIC_LEVEL = 'ARITHMETIC'
+TYPE_LEVEL = 'TYPE'
+STRING_CONSTRAINTS = 'STRING_CONSTRAINTS'
+FEATURE_CARDINALITY = 'FEATURE_CARDINALITY'
+AGGREGATE_FUNCTION = 'AGGREGATE_FUNCTION'
+GROUP_CARDINALITY = 'GROUP_CARDINALITY'
+
+SECTIONS = ['namespace', 'include', 'imports', 'features', 'constraints']
+GROUP_KEYWORDS = ['mandatory', 'optional', 'or', 'alternative']
+BOOLEAN_TYPE = 'Boolean'
+NON_BOOLEAN_TYPES = ['Integer', 'Real', 'String']
+AGGREGATE_FUNCTIONS = ['sum', 'avg']
+
+COMMENTS_REGEX = re.compile(r'"[^"]*"|\'[^\']*\'|//[^\n]*|/\*.*?\*/', re.DOTALL)
+GROUP_CARDINALITY_REGEX = re.compile(r'^\[\s*(\d+)\s*(\.\.\s*(\d+|\*)\s*)?\]$')
+FEATURE_REGEX = re.compile(r'^(?:(\w+)\s+)?("[^"]*"|[\w.]+)\s*(?:(cardinality)\s*\[[^\]]*\]\s*)?(\{.*)?$')
+NAMES_REGEX = re.compile(r'"[^"]*"')
+STRINGS_REGEX = re.compile(r"'[^']*'")
+FUNCTION_REGEX = re.compile(r'\b(\w+)\s*\(')
+# Arithmetic operators and numbers once the Boolean operators (=>, <=>) have been removed
+ARITHMETIC_REGEX = re.compile(r'[=<>+\-*/]|(?<![\w.])\d')
+
+
+class ScanError(Exception):
+    """The content of the UVL file is not supported by the scan (e.g., imports)."""
+    pass
+
+
+def scan_uvl(fm_filepath: str) -> dict[str, Any]:
+    """Lightweight scan of a UVL file, without the UVL parser.
+
+    Return the language level (major level and minor levels, as flamapy's FMLanguageLevel) and
+    the number of features and constraints. Raise ScanError if the file cannot be scanned.
+    """
+    with open(fm_filepath, 'r', encoding='utf8') as file:
+        content = file.read()
+    # Remove the comments, keeping the quoted names and strings
+    content = COMMENTS_REGEX.sub(lambda m: m.group(0) if m.group(0)[0] in '"\'' else '', content)
+    major = BOOLEAN_LEVEL
+    minors = set()
+    features = 0
+    constraints = 0
+    section = None
+    depth = 0  # Nesting of the braces of the attributes, which can span several lines
+    groups: list[list[Any]] = []  # Open cardinality groups: [indent, min, max, children indent, children]
+
+    def close_groups(indent: int) -> None:
+        while groups and groups[-1][0] >= indent:
+            _, card_min, card_max, _, children = groups.pop()
+            if is_cardinal_group(card_min, card_max, children):
+                minors.add(GROUP_CARDINALITY)
+
+    for raw_line in content.splitlines():
+        line = raw_line.strip()
+        if not line:
+            continue
+        if depth > 0:
+            depth += line.count('{') - line.count('}')
+            continue
+        indent = len(raw_line) - len(raw_line.lstrip())
+        keyword = line.split()[0]
+        if keyword in SECTIONS:
+            close_groups(0)
+            section = keyword
+            if section == 'imports':
+                raise ScanError('imports are not supported.')
+            continue
+        if section == 'features':
+            close_groups(indent)
+            if keyword in GROUP_KEYWORDS and len(line.split()) == 1:
+                continue
+            cardinality_match = GROUP_CARDINALITY_REGEX.match(line)
+            if cardinality_match is not None:
+                card_min, _, card_max = cardinality_match.groups()
+                groups.append([indent, int(card_min), card_min if card_max is None else card_max, None, 0])
+                continue
+            if groups:  # Children of the innermost cardinality group
+                if groups[-1][3] is None:
+                    groups[-1][3] = indent
+                if groups[-1][3] == indent:
+                    groups[-1][4] += 1
+            match = FEATURE_REGEX.match(line)
+            if match is None:
+                raise ScanError(f'unexpected feature declaration: {line}')
+            feature_type, _, cardinality, attributes = match.groups()
+            if feature_type is not None and feature_type != BOOLEAN_TYPE:
+                if feature_type not in NON_BOOLEAN_TYPES:
+                    raise ScanError(f'unexpected feature type: {feature_type}')
+                major = TYPE_LEVEL
+            if cardinality is not None:
+                minors.add(FEATURE_CARDINALITY)
+            if attributes is not None:
+                depth = attributes.count('{') - attributes.count('}')
+            features += 1
+        elif section == 'constraints':
+            constraints += 1
+            expression = NAMES_REGEX.sub(' ', line)
+            if STRINGS_REGEX.search(expression):
+                minors.add(STRING_CONSTRAINTS)
+            expression = STRINGS_REGEX.sub(' ', expression)
+            functions = FUNCTION_REGEX.findall(expression)
+            if any(f in AGGREGATE_FUNCTIONS for f in functions):
+                minors.add(AGGREGATE_FUNCTION)
+            if 'len' in functions:
+                minors.add(STRING_CONSTRAINTS)
+            expression = expression.replace('<=>', ' ').replace('=>', ' ')
+            if functions or ARITHMETIC_REGEX.search(expression):
+                if major == BOOLEAN_LEVEL:
+                    major = ARITHMETIC_LEVEL
+        elif section is None:
+            raise ScanError(f'unexpected content outside the sections: {line}')
+    close_groups(0)
+    return {'major': major, 'minors': sorted(minors), 'features': features, 'constraints': constraints}
+
+
+def is_cardinal_group(card_min: int, card_max: str, children: int) -> bool:
+    """Return whether a group cardinality is not an or, alternative or mutex group (as flamapy's
+    Relation.is_cardinal). The maximum '*' is unbounded."""
+    maximum = -1 if card_max == '*' else int(card_max)
+    return children > 1 and (card_min, maximum) not in ((1, 1), (1, children), (0, 1))
+
+
+def level_str(entry: dict[str, Any]) -> str:
+    """Language level of a manifest entry, as flamapy's LanguageLevel."""
+    return f'Major: {entry["major"]}, Minor: {{{", ".join(entry["minors"])}}}'
+
+
+def is_boolean(entry: Optional[dict[str, Any]]) -> bool:
+    """Return False only if the entry is known to be a non-Boolean FM.
+
+    Models not scanned (e.g., with imports) are considered Boolean: the full transformation
+    decides.
+    """
+    return entry is None or entry.get('major') in (None, BOOLEAN_LEVEL)
+
+
+def _scan_entry(fm_filepath: str) -> dict[str, Any]:
+    stat = os.stat(fm_filepath)
+    entry: dict[str, Any] = {'size': stat.st_size, 'mtime': stat.st_mtime_ns, 'version': MANIFEST_VERSION}
+    try:
+        entry.update(scan_uvl(fm_filepath))
+    except (ScanError, UnicodeDecodeError) as e:
+        entry.update({'major': None, 'error': str(e)})
+    return entry
+
+
+def read_manifest(manifest_filepath: str = MANIFEST_FILE) -> dict[str, dict[str, Any]]:
+    if not pathlib.Path(manifest_filepath).exists():
+        return {}
+    with open(manifest_filepath, 'r', encoding='utf8') as file:
+        return json.load(file)
+
+
+def write_manifest(manifest: dict[str, dict[str, Any]], manifest_filepath: str = MANIFEST_FILE) -> None:
+    path = pathlib.Path(manifest_filepath)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile('w', dir=path.parent, delete=False, encoding='utf8') as file:
+        json.dump(manifest, file, indent=1)
+    os.replace(file.name, manifest_filepath)
+
+
+def update_manifest(fm_filepaths: list[str],
+                    manifest_filepath: str = MANIFEST_FILE,
+                    workers: Optional[int] = None) -> dict[str, dict[str, Any]]:
+    """Scan in parallel the models not in the manifest or modified since they were scanned,
+    and return the (updated) manifest with an entry per model path."""
+    manifest = read_manifest(manifest_filepath)
+    pending = []
+    for fm_filepath in fm_filepaths:
+        entry = manifest.get(fm_filepath)
+        stat = os.stat(fm_filepath)
+        if (entry is None or entry.get('version') != MANIFEST_VERSION
+                or entry.get('size') != stat.st_size or entry.get('mtime') != stat.st_mtime_ns):
+            pending.append(fm_filepath)
+    if pending:
+        LOGGER.info('Scanning the language level of %s models...', len(pending))
+        if len(pending) == 1 or workers == 1:
+            entries = [_scan_entry(fm_filepath) for fm_filepath in pending]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                entries = list(executor.map(_scan_entry, pending, chunksize=SCAN_CHUNKSIZE))
+        manifest.update(zip(pending, entries))
+        write_manifest(manifest, manifest_filepath)
+    return manifest
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Scan the language level and size of the UVL models of a directory, and write a manifest.')
+    parser.add_argument(metavar='path', dest='path', type=str, help='Directory with the feature models (.uvl).')
+    parser.add_argument('-manifest', metavar='manifest', dest='manifest', type=str, required=False, default=MANIFEST_FILE, help=f'Manifest file (default: {MANIFEST_FILE}).')
+    parser.add_argument('-workers', metavar='workers', dest='workers', type=int, required=False, help='Number of processes (default: number of CPUs).')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    manifest = update_manifest(utils.get_filepaths(args.path, ['uvl']), args.manifest, args.workers)
+    levels: dict[str, int] = {}
+    for entry in manifest.values():
+        levels[str(entry['major'])] = levels.get(str(entry['major']), 0) + 1
+    for level, count in sorted(levels.items()):
+        print(f'{level}: {count}')
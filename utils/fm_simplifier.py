@@ -0,0 +1,327 @@
+import copy
+import logging
+from typing import Optional, Union, cast
+
+from flamapy.core.models import VariabilityModel
+from flamapy.core.models.ast import AST, Node, ASTOperation, LOGICAL_OPERATORS
+from flamapy.core.transformations import ModelToModel
+from flamapy.metamodels.fm_metamodel.models import FeatureModel, Relation
+
+
+LOGGER = logging.getLogger(__name__)
+
+MAX_ITERATIONS = 100
+
+
+class FMSimplifier(ModelToModel):
+    """Given a feature model, it returns a simplified feature model with the same configurations
+    (up to the mapping of the features).
+
+    It applies the following simplifications until no more changes are possible:
+        - Unit constraints (e.g., 'A' or 'not A') are propagated through the feature tree to
+          obtain core and dead features (e.g., the parent of a core feature is core, the siblings
+          of a core feature in an alternative group are dead, the children of a dead feature
+          are dead...), and then they are removed.
+        - Dead features are removed from the feature tree.
+        - Mandatory features (including core features) are collapsed with their parents, so that
+          each equivalence class of features is represented by a single feature.
+        - Constraints are rewritten with the representatives of the features and simplified
+          with the values of the core and dead features. Constraints that become true,
+          that are implied by the feature tree (a feature requires an ancestor), or that are
+          duplicated are removed.
+
+    The class exposes a mapping between the original feature names and the name of the
+    representative feature (None for dead features).
+    If the feature model is void, the feature model is not simplified.
+    """
+
+    @staticmethod
+    def get_source_extension() -> str:
+        return 'fm'
+
+    @staticmethod
+    def get_destination_extension() -> str:
+        return 'fm'
+
+    def __init__(self, source_model: VariabilityModel) -> None:
+        self.feature_model = cast(FeatureModel, source_model)
+        self.mapping_features: dict[str, Optional[str]] = {}
+
+    def transform(self) -> FeatureModel:
+        self.mapping_features = {f.name: f.name for f in self.feature_model.get_features()}
+        if self.feature_model.root is None:
+            return copy.deepcopy(self.feature_model)
+        new_feature_model = copy.deepcopy(self.feature_model)
+        known_core: set[str] = set()
+        known_dead: set[str] = set()
+        for _ in range(MAX_ITERATIONS):
+            core, dead = get_unit_constraints_features(new_feature_model)
+            core.add(new_feature_model.root.name)
+            core, dead = propagate(new_feature_model, core, dead)
+            if core & dead:
+                return self._void_model()
+            if core <= known_core and dead <= known_dead:
+                break  # No progress (e.g., unit constraints of core features that cannot be collapsed)
+            known_core |= core
+            known_dead |= dead
+            remove_dead_features(new_feature_model, core, dead)
+            representatives = collapse_mandatory_features(new_feature_model)
+            mapping: dict[str, Optional[str]] = dict(representatives)
+            mapping.update({name: None for name in dead})
+            if not simplify_constraints(new_feature_model, mapping):
+                return self._void_model()
+            self.mapping_features = {name: (None if rep is None else mapping.get(rep, rep))
+                                     for name, rep in self.mapping_features.items()}
+        return new_feature_model
+
+    def _void_model(self) -> FeatureModel:
+        LOGGER.warning('Void feature model. It has not been simplified.')
+        self.mapping_features = {f.name: f.name for f in self.feature_model.get_features()}
+        return copy.deepcopy(self.feature_model)
+
+
+def get_unit_constraints_features(feature_model: FeatureModel) -> tuple[set[str], set[str]]:
+    """Return the features that are selected (core) or deselected (dead) by unit constraints."""
+    core = set()
+    dead = set()
+    for constraint in feature_model.get_constraints():
+        node = constraint.ast.root
+        if node.is_unique_term():
+            core.add(node.data)
+        elif node.data == ASTOperation.NOT and node.left.is_unique_term():
+            dead.add(node.left.data)
+    return (core, dead)
+
+
+def propagate(feature_model: FeatureModel, core: set[str], dead: set[str]) -> tuple[set[str], set[str]]:
+    """Propagate the core and dead features through the feature tree.
+
+    Return all the core and dead features. They overlap if the feature model is void.
+    """
+    features = {f.name: f for f in feature_model.get_features()}
+    relation_of = {child.name: r for f in features.values() for r in f.get_relations() for child in r.children}
+    result: dict[bool, set[str]] = {True: set(), False: set()}
+    worklist = [(name, True) for name in core if name in features]
+    worklist.extend((name, False) for name in dead if name in features)
+    while worklist:
+        name, selected = worklist.pop()
+        if name in result[selected]:
+            continue
+        result[selected].add(name)
+        if name in result[not selected]:
+            break  # Void feature model
+        feature = features[name]
+        relation = relation_of.get(name)
+        if selected:
+            if relation is not None:
+                worklist.append((relation.parent.name, True))
+                selected_children = sum(c.name in result[True] for c in relation.children)
+                if selected_children >= relation.card_max:  # E.g., alternative or mutex
+                    worklist.extend((c.name, False) for c in relation.children if c.name not in result[True])
+        else:
+            worklist.extend((c.name, False) for c in feature.get_children())
+            if relation is not None:
+                alive = [c for c in relation.children if c.name not in result[False]]
+                if len(alive) < relation.card_min:
+                    worklist.append((relation.parent.name, False))
+    return (result[True], result[False])
+
+
+def remove_dead_features(feature_model: FeatureModel, core: set[str], dead: set[str]) -> None:
+    """Remove the dead features from the feature tree, and make mandatory the core features."""
+    for feature in feature_model.get_features():
+        relations = []
+        for relation in feature.get_relations():
+            relation.children = [c for c in relation.children if c.name not in dead]
+            if not relation.children:
+                continue
+            relation.card_min = min(relation.card_min, len(relation.children))
+            relation.card_max = min(relation.card_max, len(relation.children))
+            relations.extend(split_core_children(relation, core))
+        feature.relations = relations
+
+
+def split_core_children(relation: Relation, core: set[str]) -> list[Relation]:
+    """Split the core children of the relation in mandatory relations.
+
+    The other children of a group keep the remaining cardinality (as optional features if it
+    does not constrain them, e.g., in an or-group with a core child).
+    """
+    core_children = [c for c in relation.children if c.name in core]
+    others = [c for c in relation.children if c.name not in core]
+    card_min = max(relation.card_min - len(core_children), 0)
+    card_max = min(relation.card_max - len(core_children), len(others))
+    if not core_children or (others and card_max <= 0):
+        return [relation]
+    relations = [Relation(relation.parent, [child], 1, 1) for child in core_children]
+    if card_min == 0 and card_max == len(others):
+        relations.extend(Relation(relation.parent, [child], 0, 1) for child in others)
+    elif others:
+        relations.append(Relation(relation.parent, others, card_min, card_max))
+    return relations
+
+
+def collapse_mandatory_features(feature_model: FeatureModel) -> dict[str, str]:
+    """Collapse each mandatory feature with its parent.
+
+    The relations of the mandatory feature are moved to the parent.
+    Return the mapping of each collapsed feature to its representative.
+    """
+    representatives = {}
+    features = [feature_model.root]
+    while features:
+        feature = features.pop()
+        i = 0
+        while i < len(feature.relations):
+            relation = feature.relations[i]
+            if relation.is_mandatory():
+                child = relation.children[0]
+                representatives[child.name] = feature.name
+                feature.relations.pop(i)
+                for child_relation in child.get_relations():
+                    child_relation.parent = feature
+                    for grandchild in child_relation.children:
+                        grandchild.parent = feature
+                    feature.relations.append(child_relation)
+            else:
+                features.extend(relation.children)
+                i += 1
+    return representatives
+
+
+def simplify_constraints(feature_model: FeatureModel, mapping: dict[str, Optional[str]]) -> bool:
+    """Rewrite the constraints with the representatives of the features and simplify them.
+
+    The mapping gives the representative of each feature (None for dead features).
+    Return False if a constraint is never satisfied (void feature model).
+    """
+    root_name = feature_model.root.name
+    values = {root_name: True}
+    values.update({name: False for name, rep in mapping.items() if rep is None})
+    ancestors = get_ancestors(feature_model)
+    constraints = []
+    constraints_str = set()
+    for constraint in feature_model.get_constraints():
+        rename_ast_terms(constraint.ast, mapping)
+        simplified = simplify_node(constraint.ast.root, values)
+        if simplified is True:
+            continue
+        if simplified is False:
+            LOGGER.warning('Constraint %s is never satisfied.', constraint.name)
+            return False
+        constraint.ast = AST(simplified)
+        if is_implied_by_tree(simplified, ancestors):
+            continue
+        constraint_str = simplified.pretty_str()
+        if constraint_str in constraints_str:
+            continue
+        constraints_str.add(constraint_str)
+        constraints.append(constraint)
+    feature_model.ctcs = constraints
+    return True
+
+
+def rename_ast_terms(ast: AST, mapping: dict[str, Optional[str]]) -> None:
+    """Rename the terms of the AST with the representatives of the features.
+
+    The terms of dead features are not renamed (they are simplified with their value).
+    """
+    stack = [ast.root]
+    while stack:
+        node = stack.pop()
+        if node.is_unique_term():
+            rep = mapping.get(node.data, node.data)
+            if rep is not None:
+                node.data = rep
+        elif node.is_unary_op():
+            stack.append(node.left)
+        elif node.is_binary_op():
+            stack.append(node.right)
+            stack.append(node.left)
+
+
+def simplify_node(node: Node, values: dict[str, bool]) -> Union[Node, bool]:
+    """Simplify the logical operations of the node given the values of some features.
+
+    Return True or False if the node is simplified to a constant.
+    Non-logical operations are not simplified.
+    """
+    if node.is_unique_term():
+        return values.get(node.data, node)
+    if not node.is_op() or node.data not in LOGICAL_OPERATORS:
+        return node
+    if node.data == ASTOperation.NOT:
+        return negate(simplify_node(node.left, values))
+    left = simplify_node(node.left, values)
+    right = simplify_node(node.right, values)
+    if node.data == ASTOperation.AND:
+        if left is False or right is False:
+            return False
+        if left is True:
+            return right
+        if right is True:
+            return left
+    elif node.data == ASTOperation.OR:
+        if left is True or right is True:
+            return True
+        if left is False:
+            return right
+        if right is False:
+            return left
+    elif node.data in (ASTOperation.IMPLIES, ASTOperation.REQUIRES):
+        if left is False or right is True:
+            return True
+        if left is True:
+            return right
+        if right is False:
+            return negate(left)
+    elif node.data == ASTOperation.EXCLUDES:
+        if left is False or right is False:
+            return True
+        if left is True:
+            return negate(right)
+        if right is True:
+            return negate(left)
+    elif node.data in (ASTOperation.EQUIVALENCE, ASTOperation.XOR):
+        equivalence = node.data == ASTOperation.EQUIVALENCE
+        if isinstance(left, bool) and isinstance(right, bool):
+            return (left == right) == equivalence
+        if isinstance(left, bool):
+            return right if left == equivalence else negate(right)
+        if isinstance(right, bool):
+            return left if right == equivalence else negate(left)
+    return Node(node.data, left, right)
+
+
+def negate(node: Union[Node, bool]) -> Union[Node, bool]:
+    if isinstance(node, bool):
+        return not node
+    if node.data == ASTOperation.NOT:
+        return node.left
+    return Node(ASTOperation.NOT, node)
+
+
+def get_ancestors(feature_model: FeatureModel) -> dict[str, set[str]]:
+    """Return the ancestors of each feature (including the feature itself)."""
+    ancestors = {feature_model.root.name: {feature_model.root.name}}
+    features = [feature_model.root]
+    while features:
+        feature = features.pop()
+        for child in feature.get_children():
+            ancestors[child.name] = ancestors[feature.name] | {child.name}
+            features.append(child)
+    return ancestors
+
+
+def is_implied_by_tree(node: Node, ancestors: dict[str, set[str]]) -> bool:
+    """Return whether the constraint is a feature requiring one of its ancestors."""
+    if node.data not in (ASTOperation.IMPLIES, ASTOperation.REQUIRES):
+        return False
+    if not node.left.is_unique_term() or not node.right.is_unique_term():
+        return False
+    return node.right.data in ancestors.get(node.left.data, set())
+
+
+def expand_frequencies(frequencies: dict[str, int], mapping_features: dict[str, Optional[str]]) -> dict[str, int]:
+    """Expand the frequencies of the features of a simplified feature model to the original features."""
+    return {name: (0 if rep is None else frequencies[rep]) for name, rep in mapping_features.items()}
@@ -0,0 +1,43 @@
+import re
+
+
+LOGIC_KEYWORDS = {'not', 'and', 'or', 'XOR', 'MUX'}
+VARIABLE_REGEX = re.compile(r'[A-Za-z0-9_]+')
+
+
+def read_variables(var_filepath: str) -> list[str]:
+    """Return the variables of a .var file (or an order file) in the order they appear."""
+    with open(var_filepath, 'r', encoding='utf8') as file:
+        return file.read().split()
+
+
+def read_expressions(exp_filepath: str) -> list[str]:
+    """Return the non-empty expressions (lines) of a .exp file."""
+    with open(exp_filepath, 'r', encoding='utf8') as file:
+        return [line.strip() for line in file if line.strip()]
+
+
+def write_variables(variables: list[str], filepath: str) -> None:
+    """Write the variables in the format of the .var files (also valid as an order file)."""
+    with open(filepath, 'w', encoding='utf8') as file:
+        file.write(' '.join(variables))
+
+
+def write_expressions(expressions: list[str], filepath: str) -> None:
+    """Write the expressions in the format of the .exp files (one expression per line)."""
+    with open(filepath, 'w', encoding='utf8') as file:
+        file.write('\n'.join(expressions) + '\n')
+
+
+def get_expression_variables(expression: str) -> list[str]:
+    """Return the variables of an expression, without duplicates and in order of appearance."""
+    variables = {}
+    for token in VARIABLE_REGEX.findall(expression):
+        if token not in LOGIC_KEYWORDS:
+            variables[token] = None
+    return list(variables)
+
+
+def read_expressions_variables(exp_filepath: str) -> list[list[str]]:
+    """Return, for each expression of a .exp file, the list of variables it contains."""
+    return [get_expression_variables(exp) for exp in read_expressions(exp_filepath)]
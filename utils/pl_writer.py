@@ -1,4 +1,5 @@
 import re
+import array
 import itertools
 from enum import Enum
 
@@ -43,124 +44,146 @@ class PLWriter(ModelToText):
         return expressions_str
 
 
+NOT = PLWriter.LogicConnective.NOT.value
+AND = PLWriter.LogicConnective.AND.value
+OR = PLWriter.LogicConnective.OR.value
+IMPLIES = PLWriter.LogicConnective.IMPLIES.value
+EQUIVALENCE = PLWriter.LogicConnective.EQUIVALENCE.value
+AND_SEP = f' {AND} '
+OR_SEP = f' {OR} '
+
+# Translation of the operators of the constraints (done in a single pass)
+CONSTRAINT_OPERATORS = {
+    ASTOperation.XOR.value: PLWriter.LogicConnective.XOR.value,
+    ASTOperation.NOT.value: NOT,
+    ASTOperation.AND.value: AND,
+    ASTOperation.OR.value: OR,
+    ASTOperation.IMPLIES.value: IMPLIES,
+    ASTOperation.EQUIVALENCE.value: EQUIVALENCE,
+    ASTOperation.REQUIRES.value: IMPLIES,
+    ASTOperation.EXCLUDES.value: f'{IMPLIES} {NOT}',
+}
+CONSTRAINT_OPERATORS_REGEX = re.compile(rf"\b({'|'.join(CONSTRAINT_OPERATORS)})\b")
+
+
+# Kinds of relations in the integer-encoded feature tree
+MANDATORY, OPTIONAL, OR_GROUP, ALTERNATIVE_GROUP, MUTEX_GROUP, CARDINALITY_GROUP = range(6)
+
+
 def to_exp(feature_model: FeatureModel) -> list[str]:
     """Traverse the feature tree and constraints and return a list of propositional formulas."""
     if feature_model is None or feature_model.root is None:
         return []
     
+    names, relations = encode_feature_tree(feature_model)
     formulas: list[str] = []
-    formulas.append(feature_model.root.name)  # The root is always present
-    features: list[Feature] = []
-    features.append(feature_model.root)
-    while features:
-        feature = features.pop()
-        for relation in feature.get_relations():
-            formulas.append(get_relation_formula(relation))
-            features.extend(relation.children)
+    formulas.append(names[0])  # The root is always present
+    formulas.extend(render_relations(names, relations))
     for constraint in feature_model.get_constraints():
         formulas.append(get_constraint_formula(constraint))
     return formulas
 
 
-def get_relation_formula(relation: Relation) -> str:
-    result = ''
+def encode_feature_tree(feature_model: FeatureModel) -> tuple[list[str], array.array]:
+    """Assign an integer id to each feature and encode the relations of the feature tree.
+
+    Return the names of the features (indexed by id, the root is 0) and a flat buffer with the
+    relations in traversal order. Each relation is encoded as:
+        kind, parent, card_min, card_max, number of children, children...
+    """
+    names: list[str] = [feature_model.root.name]
+    relations = array.array('l')
+    features: list[tuple[int, Feature]] = [(0, feature_model.root)]
+    while features:
+        parent_id, feature = features.pop()
+        for relation in feature.get_relations():
+            relations.extend((get_relation_kind(relation), parent_id, relation.card_min, relation.card_max, len(relation.children)))
+            for child in relation.children:
+                child_id = len(names)
+                names.append(child.name)
+                relations.append(child_id)
+                features.append((child_id, child))
+    return (names, relations)
+
+
+def get_relation_kind(relation: Relation) -> int:
     if relation.is_mandatory():
-        result = get_mandatory_formula(relation)
+        return MANDATORY
     elif relation.is_optional():
-        result = get_optional_formula(relation)
+        return OPTIONAL
     elif relation.is_or():
-        result = get_or_formula(relation)
+        return OR_GROUP
     elif relation.is_alternative():
-        result = get_alternative_formula(relation)
+        return ALTERNATIVE_GROUP
     elif relation.is_mutex():
-        result = get_mutex_formula(relation)
-    elif relation.is_cardinal():
-        result = get_cardinality_formula(relation)
-    return result
+        return MUTEX_GROUP
+    return CARDINALITY_GROUP
+
+
+def render_relations(names: list[str], relations: array.array) -> list[str]:
+    """Render the encoded relations as propositional formulas."""
+    formulas = []
+    i = 0
+    while i < len(relations):
+        kind, parent, card_min, card_max, n_children = relations[i:i + 5]
+        children = [names[child] for child in relations[i + 5:i + 5 + n_children]]
+        formulas.append(RENDERERS[kind](names[parent], children, card_min, card_max))
+        i += 5 + n_children
+    return formulas
 
 
-def get_mandatory_formula(relation: Relation) -> str:
-    parent = relation.parent.name
-    child = relation.children[0].name
-    return f'{parent} {PLWriter.LogicConnective.EQUIVALENCE.value} {child}'
+def get_relation_formula(relation: Relation) -> str:
+    children = [child.name for child in relation.children]
+    return RENDERERS[get_relation_kind(relation)](relation.parent.name, children, relation.card_min, relation.card_max)
 
 
-def get_optional_formula(relation: Relation) -> str:
-    parent = relation.parent.name
-    child = relation.children[0].name
-    return f'{child} {PLWriter.LogicConnective.IMPLIES.value} {parent}'
+def render_mandatory(parent: str, children: list[str], card_min: int, card_max: int) -> str:
+    return f'{parent} {EQUIVALENCE} {children[0]}'
 
 
-def get_or_formula(relation: Relation) -> str:
-    parent = relation.parent.name
-    children = f" {PLWriter.LogicConnective.OR.value} ".join(child.name for child in relation.children)
-    return f'{parent} {PLWriter.LogicConnective.EQUIVALENCE.value} ({children})'
+def render_optional(parent: str, children: list[str], card_min: int, card_max: int) -> str:
+    return f'{children[0]} {IMPLIES} {parent}'
 
 
-def get_alternative_formula(relation: Relation) -> str:
-    formula = []
-    parent = relation.parent.name
-    children = {child.name for child in relation.children}
-    for child in children:
-        children_negatives = children - {child}
-        formula.append(f'{child} {PLWriter.LogicConnective.EQUIVALENCE.value} '
-                       f'({f" {PLWriter.LogicConnective.AND.value} ".join(f"{PLWriter.LogicConnective.NOT.value} " + ch for ch in children_negatives)} '
-                           f'{PLWriter.LogicConnective.AND.value} {parent})')
-    return f" {PLWriter.LogicConnective.AND.value} ".join(f'({f})' for f in formula)
+def render_or(parent: str, children: list[str], card_min: int, card_max: int) -> str:
+    return f'{parent} {EQUIVALENCE} ({OR_SEP.join(children)})'
 
 
-def get_mutex_formula(relation: Relation) -> str:
+def render_alternative(parent: str, children: list[str], card_min: int, card_max: int) -> str:
+    negatives = [f'{NOT} {child}' for child in children]
     formula = []
-    parent = relation.parent.name
-    children = {child.name for child in relation.children}
-    for child in children:
-        children_negatives = children - {child}
-        formula.append(f'{child} {PLWriter.LogicConnective.EQUIVALENCE.value} '
-                       f'({f" {PLWriter.LogicConnective.AND.value} ".join(f"{PLWriter.LogicConnective.NOT.value} " + cn for cn in children_negatives)} '
-                           f'{PLWriter.LogicConnective.AND.value} {parent})')
-    formula_str = f" {PLWriter.LogicConnective.AND.value} ".join(f'({f})' for f in formula)
-    return f'({parent} {PLWriter.LogicConnective.EQUIVALENCE.value} ' \
-        f'{PLWriter.LogicConnective.NOT.value} ({f" {PLWriter.LogicConnective.OR.value} ".join(child for child in children)})) {PLWriter.LogicConnective.OR.value} ({formula_str})'
-
-
-def get_cardinality_formula(relation: Relation) -> str:
-    parent = relation.parent.name
-    children = {child.name for child in relation.children}
+    for i, child in enumerate(children):
+        children_negatives = AND_SEP.join(negatives[:i] + negatives[i + 1:])
+        formula.append(f'({child} {EQUIVALENCE} ({children_negatives} {AND} {parent}))')
+    return AND_SEP.join(formula)
+
+
+def render_mutex(parent: str, children: list[str], card_min: int, card_max: int) -> str:
+    formula_str = render_alternative(parent, children, card_min, card_max)
+    return f'({parent} {EQUIVALENCE} {NOT} ({OR_SEP.join(children)})) {OR} ({formula_str})'
+
+
+def render_cardinality(parent: str, children: list[str], card_min: int, card_max: int) -> str:
+    negatives = [f'{NOT} {child}' for child in children]
+    indexes = range(len(children))
     or_ctc = []
-    for k in range(relation.card_min, relation.card_max + 1):
-        combi_k = list(itertools.combinations(children, k))
-        for positives in combi_k:
-            negatives = children - set(positives)
-            positives_and_ctc = f'{f" {PLWriter.LogicConnective.AND.value} ".join(positives)}'
-            negatives_and_ctc = f'{f" {PLWriter.LogicConnective.AND.value} ".join(f"{PLWriter.LogicConnective.NOT.value} " + f for f in negatives)}'
-            if positives_and_ctc and negatives_and_ctc:
-                and_ctc = f'{positives_and_ctc} {PLWriter.LogicConnective.AND.value} {negatives_and_ctc}'
-            else:
-                and_ctc = f'{positives_and_ctc}{negatives_and_ctc}'
-            or_ctc.append(and_ctc) 
-    formula_or_ctc = f'{f" {PLWriter.LogicConnective.OR.value} ".join(or_ctc)}'
-    return f'{parent} {PLWriter.LogicConnective.EQUIVALENCE.value} {formula_or_ctc}'
+    for k in range(card_min, card_max + 1):
+        for positives in itertools.combinations(indexes, k):
+            positives_set = set(positives)
+            literals = [children[i] for i in positives]
+            literals.extend(negatives[i] for i in indexes if i not in positives_set)
+            or_ctc.append(AND_SEP.join(literals))
+    return f'{parent} {EQUIVALENCE} {OR_SEP.join(or_ctc)}'
+
+
+RENDERERS = {MANDATORY: render_mandatory,
+             OPTIONAL: render_optional,
+             OR_GROUP: render_or,
+             ALTERNATIVE_GROUP: render_alternative,
+             MUTEX_GROUP: render_mutex,
+             CARDINALITY_GROUP: render_cardinality}
 
 
 def get_constraint_formula(ctc: Constraint) -> str:
     constraint_str = ctc.ast.pretty_str()
-    constraint_str = re.sub(rf"\b{ASTOperation.XOR.value}\b", 
-                            PLWriter.LogicConnective.XOR.value, constraint_str)
-    constraint_str = re.sub(rf"\b{ASTOperation.NOT.value}\b", 
-                            PLWriter.LogicConnective.NOT.value, constraint_str)
-    constraint_str = re.sub(rf"\b{ASTOperation.AND.value}\b", 
-                            PLWriter.LogicConnective.AND.value, constraint_str)
-    constraint_str = re.sub(rf"\b{ASTOperation.OR.value}\b", 
-                            PLWriter.LogicConnective.OR.value, constraint_str)
-    constraint_str = re.sub(rf"\b{ASTOperation.IMPLIES.value}\b", 
-                            PLWriter.LogicConnective.IMPLIES.value, constraint_str)
-    constraint_str = re.sub(rf"\b{ASTOperation.EQUIVALENCE.value}\b", 
-                            PLWriter.LogicConnective.EQUIVALENCE.value, constraint_str)
-    constraint_str = re.sub(rf"\b{ASTOperation.REQUIRES.value}\b", 
-                            PLWriter.LogicConnective.IMPLIES.value, constraint_str)
-    constraint_str = re.sub(
-        rf"\b{ASTOperation.EXCLUDES.value}\b",
-        f'{PLWriter.LogicConnective.IMPLIES.value} {PLWriter.LogicConnective.NOT.value}',
-        constraint_str
-    )
-    return constraint_str
+    return CONSTRAINT_OPERATORS_REGEX.sub(lambda match: CONSTRAINT_OPERATORS[match.group(0)], constraint_str)
@@ -0,0 +1,73 @@
+import random
+import pathlib
+
+from flamapy.core.models.ast import AST, ASTOperation
+from flamapy.metamodels.fm_metamodel.models import FeatureModel, Feature, Relation, Constraint
+from flamapy.metamodels.fm_metamodel.transformations import UVLWriter
+
+
+# Probabilities of the kinds of relations of the generated feature trees
+RELATION_KINDS = {'mandatory': 0.2, 'optional': 0.4, 'or': 0.2, 'alternative': 0.2}
+MAX_RELATIONS = 4  # Maximum number of relations of a feature
+MAX_GROUP_SIZE = 5  # Maximum number of children of a group
+
+
+def generate_feature_model(n_features: int, n_constraints: int = 0, seed: int = 0) -> FeatureModel:
+    """Generate a random Boolean feature model with the given number of features and constraints.
+
+    The feature tree is built in breadth-first order with mandatory, optional, or and
+    alternative relations. The constraints are requires and excludes between random features.
+    """
+    rng = random.Random(seed)
+    root = Feature('F0')
+    features = [root]
+    queue = [root]
+    head = 0
+    while len(features) < n_features:
+        if head == len(queue):  # All features expanded: keep expanding from the leaves
+            queue = features[:]
+            head = 0
+        parent = queue[head]
+        head += 1
+        for _ in range(rng.randint(1, MAX_RELATIONS)):
+            if len(features) >= n_features:
+                break
+            kind = rng.choices(list(RELATION_KINDS), weights=list(RELATION_KINDS.values()))[0]
+            n_children = 1 if kind in ('mandatory', 'optional') else rng.randint(2, MAX_GROUP_SIZE)
+            n_children = min(n_children, n_features - len(features))
+            if n_children < 2 and kind in ('or', 'alternative'):
+                kind = 'optional'
+            children = []
+            for _ in range(n_children):
+                child = Feature(f'F{len(features)}', parent=parent)
+                features.append(child)
+                queue.append(child)
+                children.append(child)
+            card_min, card_max = {'mandatory': (1, 1),
+                                  'optional': (0, 1),
+                                  'or': (1, n_children),
+                                  'alternative': (1, 1)}[kind]
+            parent.add_relation(Relation(parent, children, card_min, card_max))
+    constraints = []
+    for i in range(n_constraints if len(features) > 1 else 0):
+        left, right = rng.sample(features[1:], 2) if len(features) > 2 else (features[1], features[0])
+        operation = rng.choice([ASTOperation.REQUIRES, ASTOperation.EXCLUDES])
+        ast = AST.create_simple_binary_operation(operation, left.name, right.name)
+        constraints.append(Constraint(f'C{i}', ast))
+    return FeatureModel(root, constraints)
+
+
+def write_uvl_models(dirpath: str, sizes: list[int], constraints_ratio: float = 0.1, seeds: int = 1) -> list[str]:
+    """Generate synthetic feature models of the given sizes and write them as UVL files.
+
+    The models are named synthetic-<features>-<seed>.uvl. Return the paths of the UVL files.
+    """
+    pathlib.Path(dirpath).mkdir(parents=True, exist_ok=True)
+    filepaths = []
+    for n_features in sizes:
+        for seed in range(seeds):
+            fm = generate_feature_model(n_features, int(n_features * constraints_ratio), seed)
+            filepath = str(pathlib.Path(dirpath) / f'synthetic-{n_features}-{seed}.uvl')
+            UVLWriter(filepath, fm).transform()
+            filepaths.append(filepath)
+    return filepaths
@@ -0,0 +1,243 @@
+import os
+import json
+import time
+import pathlib
+import threading
+import contextlib
+from typing import Any, Iterator, Optional
+
+try:
+    import pyinstrument
+except ImportError:
+    pyinstrument = None
+
+
+# Export formats of the traces
+JSONL_FORMAT = 'jsonl'  # A JSON object per span and line
+CHROME_FORMAT = 'chrome'  # Chrome trace event format (chrome://tracing, Perfetto)
+FORMATS = [JSONL_FORMAT, CHROME_FORMAT]
+
+# Profilers of the stages
+CPROFILE = 'cprofile'
+PYINSTRUMENT = 'pyinstrument'
+PROFILERS = [CPROFILE, PYINSTRUMENT]
+PROFILES_DIR = 'profiles'
+
+# Stages (spans) of the pipeline
+MODEL = 'model'
+UVL_PARSING = 'uvl_parsing'
+LANGUAGE_LEVEL = 'language_level'
+SECURE_NAMING = 'secure_naming'
+SIMPLIFICATION = 'simplification'
+EXPRESSION_WRITING = 'expression_writing'
+ORDERING = 'ordering'
+BDD_BUILDING = 'bdd_building'
+DECOMPOSITION = 'decomposition'
+DDDMP_PARSING = 'dddmp_parsing'
+COUNTING = 'counting'
+ANALYSIS = 'analysis'
+STAGES = [MODEL, UVL_PARSING, LANGUAGE_LEVEL, SECURE_NAMING, SIMPLIFICATION, EXPRESSION_WRITING,
+          ORDERING, BDD_BUILDING, DECOMPOSITION, DDDMP_PARSING, COUNTING, ANALYSIS]
+
+
+class Span():
+    """Timed stage of the pipeline, with its parent span and some attributes (e.g., the model)."""
+
+    def __init__(self, span_id: int, name: str, parent_id: Optional[int], attributes: dict[str, Any]) -> None:
+        self.id = span_id
+        self.name = name
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.pid = os.getpid()
+        self.tid = threading.get_ident()
+        self.start = time.time()  # Wall-clock (epoch) time in seconds
+        self.duration: Optional[float] = None  # in seconds
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {'id': self.id, 'name': self.name, 'parent': self.parent_id,
+                'start': self.start, 'duration': self.duration, 'pid': self.pid, 'tid': self.tid,
+                'error': self.error, 'attributes': self.attributes}
+
+    def to_chrome_event(self) -> dict[str, Any]:
+        args = dict(self.attributes)
+        if self.error is not None:
+            args['error'] = self.error
+        return {'name': self.name, 'ph': 'X', 'ts': self.start * 1e6, 'dur': (self.duration or 0) * 1e6,
+                'pid': self.pid, 'tid': self.tid, 'args': args}
+
+
+class Tracer():
+    """Records the spans of the stages of the pipeline and exports them to a trace file.
+
+    The spans are nested per thread. Optionally, the given stages are profiled (cProfile or
+    pyinstrument) and a profile per span is written in the profiles directory.
+    Spans are buffered and appended to the trace file with flush() (e.g., after each model), so
+    that a long run can be inspected while it is running and is not lost if it is interrupted.
+    """
+
+    def __init__(self,
+                 filepath: Optional[str] = None,
+                 format: str = JSONL_FORMAT,
+                 profile_stages: Optional[list[str]] = None,
+                 profiler: str = CPROFILE,
+                 profiles_dir: str = PROFILES_DIR) -> None:
+        if format not in FORMATS:
+            raise ValueError(f'Unknown trace format: {format}.')
+        if profiler not in PROFILERS:
+            raise ValueError(f'Unknown profiler: {profiler}.')
+        if profiler == PYINSTRUMENT and profile_stages and pyinstrument is None:
+            raise ValueError('The pyinstrument library is required (pip install pyinstrument).')
+        self.filepath = filepath
+        self.format = format
+        self.profile_stages = set(profile_stages or [])
+        self.profiler = profiler
+        self.profiles_dir = profiles_dir
+        self.spans: list[Span] = []  # Finished spans not flushed yet
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._chrome_started = False
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        stack = self._stack()
+        with self._lock:
+            self._next_id += 1
+            span_id = self._next_id
+        span = Span(span_id, name, stack[-1].id if stack else None, attributes)
+        stack.append(span)
+        model = attributes.get('model', next((s.attributes['model'] for s in reversed(stack[:-1])
+                                              if 'model' in s.attributes), ''))
+        start = time.perf_counter()
+        try:
+            with self._profile(span, str(model)):
+                yield span
+        except BaseException as e:
+            span.error = repr(e)
+            raise
+        finally:
+            span.duration = time.perf_counter() - start
+            stack.pop()
+            with self._lock:
+                self.spans.append(span)
+
+    def flush(self) -> None:
+        """Append the finished spans to the trace file."""
+        with self._lock:
+            spans, self.spans = self.spans, []
+        if self.filepath is None or not spans:
+            return
+        with open(self.filepath, 'a', encoding='utf8') as file:
+            if self.format == JSONL_FORMAT:
+                for span in spans:
+                    file.write(json.dumps(span.to_dict(), default=str) + '\n')
+            else:
+                # JSON array format of the Chrome trace events: the closing bracket is optional
+                if not self._chrome_started and file.tell() == 0:
+                    file.write('[\n')
+                self._chrome_started = True
+                for span in spans:
+                    file.write(json.dumps(span.to_chrome_event(), default=str) + ',\n')
+
+    def _stack(self) -> list[Span]:
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextlib.contextmanager
+    def _profile(self, span: Span, model: str) -> Iterator[None]:
+        if span.name not in self.profile_stages or getattr(self._local, 'profiling', False):
+            yield  # Profilers cannot be nested: the outermost profiled stage includes the inner ones
+            return
+        self._local.profiling = True
+        pathlib.Path(self.profiles_dir).mkdir(parents=True, exist_ok=True)
+        filepath = str(pathlib.Path(self.profiles_dir) / f'{pathlib.Path(model).stem}-{span.name}-{span.id}')
+        if self.profiler == PYINSTRUMENT:
+            profiler = pyinstrument.Profiler()
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                self._local.profiling = False
+                with open(f'{filepath}.html', 'w', encoding='utf8') as file:
+                    file.write(profiler.output_html())
+        else:
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+                self._local.profiling = False
+                profiler.dump_stats(f'{filepath}.prof')
+
+
+_tracer: Optional[Tracer] = None
+
+
+def configure(filepath: Optional[str] = None,
+              format: str = JSONL_FORMAT,
+              profile_stages: Optional[list[str]] = None,
+              profiler: str = CPROFILE,
+              profiles_dir: str = PROFILES_DIR) -> Tracer:
+    """Enable the tracing of the pipeline. Without calling it, the spans are no-ops."""
+    global _tracer
+    _tracer = Tracer(filepath, format, profile_stages, profiler, profiles_dir)
+    return _tracer
+
+
+def get_tracer() -> Optional[Tracer]:
+    return _tracer
+
+
+def span(name: str, **attributes: Any) -> contextlib.AbstractContextManager:
+    """Context manager that records a span of the stage if the tracing is enabled."""
+    if _tracer is None:
+        return contextlib.nullcontext()
+    return _tracer.span(name, **attributes)
+
+
+def flush() -> None:
+    if _tracer is not None:
+        _tracer.flush()
+
+
+def read_spans(filepath: str) -> list[dict[str, Any]]:
+    """Read the spans of a trace file (JSON lines or Chrome trace events) as dicts with, at
+    least, the name and the duration (in seconds) of each span."""
+    with open(filepath, 'r', encoding='utf8') as file:
+        content = file.read().strip()
+    if content.startswith('['):  # Chrome trace events
+        events = json.loads(content.rstrip(',]') + ']')
+        return [{'name': e['name'], 'duration': e['dur'] / 1e6, 'attributes': e.get('args', {})} for e in events]
+    return [json.loads(line) for line in content.splitlines() if line.strip()]
+
+
+def summarize(filepath: str) -> dict[str, dict[str, float]]:
+    """Return the count, total, mean, median, 95th percentile and maximum duration of each stage."""
+    durations: dict[str, list[float]] = {}
+    for span in read_spans(filepath):
+        durations.setdefault(span['name'], []).append(span['duration'])
+    summary = {}
+    for name, values in durations.items():
+        values.sort()
+        summary[name] = {'count': len(values), 'total': sum(values), 'mean': sum(values) / len(values),
+                         'median': values[len(values) // 2], 'p95': values[min(len(values) - 1, int(len(values) * 0.95))],
+                         'max': values[-1]}
+    return summary
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Summary of the time spent in each stage of a trace file.')
+    parser.add_argument(metavar='tracefile', dest='tracefile', type=str, help='Trace file (JSON lines or Chrome trace events).')
+    args = parser.parse_args()
+
+    summary = summarize(args.tracefile)
+    print(f'{"Stage":<20} {"Count":>7} {"Total (s)":>11} {"Mean (s)":>10} {"Median (s)":>11} {"P95 (s)":>10} {"Max (s)":>10}')
+    for name, stats in sorted(summary.items(), key=lambda item: -item[1]['total']):
+        print(f'{name:<20} {stats["count"]:>7} {stats["total"]:>11.3f} {stats["mean"]:>10.3f} {stats["median"]:>11.3f} {stats["p95"]:>10.3f} {stats["max"]:>10.3f}')
@@ -1,5 +1,18 @@
 import os
+import re
+import math
+import pathlib
 import subprocess
+from typing import Any
+
+
+# Name of a version of a model: family name and a version or timestamp
+# (e.g., uClibc-Pett2023-2015-03-24_00-11-21, linux-2.6.28)
+VERSION_REGEX = re.compile(r'^(?P<family>.+?)[-_]v?(?P<version>\d[\w.\-]*)$')
+
+# Conversions of ints to and from strings without the limit of digits of Python (4300 by default)
+MAX_STR_DIGITS = 4000
+MAX_STR_BITS = 13000  # Less than MAX_STR_DIGITS decimal digits
 
 
 def get_filepaths(dir: str, extensions_filter: list[str] = []) -> list[str]:
@@ -14,12 +27,64 @@ def get_filepaths(dir: str, extensions_filter: list[str] = []) -> list[str]:
 
 
 def int2sci(n: int, precision: int = 2) -> str:
-    """Convert a large int into scientific notation."""
+    """Convert a large int into scientific notation.
+
+    The mantissa is rounded with integer arithmetic (no float conversion, which loses digits
+    and overflows above 1e308).
+    """
     if n == 0:
         return '0e0'
-    exp = len(str(abs(n))) - 1
-    mantissa = n / (10 ** exp)
-    return f'{mantissa:.{precision}f}e{exp}'
+    sign = '-' if n < 0 else ''
+    n = abs(n)
+    exp = exponent10(n)
+    shift = exp - precision
+    if shift >= 0:
+        mantissa = (2 * n + 10 ** shift) // (2 * 10 ** shift)  # Rounded half up
+    else:
+        mantissa = n * 10 ** -shift
+    if mantissa == 10 ** (precision + 1):  # Rounded up to the next power of 10
+        mantissa //= 10
+        exp += 1
+    digits = str(mantissa)
+    return f'{sign}{digits[0]}.{digits[1:]}e{exp}' if precision > 0 else f'{sign}{digits}e{exp}'
+
+
+def exponent10(n: int) -> int:
+    """Exponent of a positive int in scientific notation (floor of log10), exact for big ints."""
+    exp = int(math.log10(n))
+    while 10 ** exp > n:
+        exp -= 1
+    while 10 ** (exp + 1) <= n:
+        exp += 1
+    return exp
+
+
+def log10(n: int) -> float:
+    """Logarithm in base 10 of a non-negative int (-inf for 0), without float overflow."""
+    return math.log10(n) if n > 0 else float('-inf')
+
+
+def int2str(n: int) -> str:
+    """Exact decimal representation of an int of any size (str(n) is limited to
+    sys.get_int_max_str_digits() digits since Python 3.11)."""
+    if n < 0:
+        return '-' + int2str(-n)
+    if n.bit_length() <= MAX_STR_BITS:
+        return str(n)
+    half = (exponent10(n) + 1) // 2
+    high, low = divmod(n, 10 ** half)
+    return int2str(high) + int2str(low).zfill(half)
+
+
+def str2int(s: str) -> int:
+    """Parse the exact decimal representation of an int of any size (see int2str)."""
+    s = s.strip()
+    if s.startswith('-'):
+        return -str2int(s[1:])
+    if len(s) <= MAX_STR_DIGITS:
+        return int(s)
+    half = len(s) // 2
+    return str2int(s[:-half]) * 10 ** half + str2int(s[-half:])
 
 
 def float2exp(n: float, precision: int = 2) -> str:
@@ -32,8 +97,35 @@ def float2exp(n: float, precision: int = 2) -> str:
     return f"{rounded}"
 
 
+def read_bdd_nodes(bdd_filepath: str) -> int:
+    """Return the number of nodes of a BDD from the header of its .dddmp (or binary .bddb) file."""
+    with open(bdd_filepath, 'rb') as file:
+        if file.read(4) == b'BDDB':
+            from utils import dddmp
+            return dddmp.read_binary_header(bdd_filepath)[2]
+    with open(bdd_filepath, 'r') as file:
+        for line in file:
+            if line.startswith('.nnodes'):
+                return int(line.split()[1].strip())
+            if line.startswith('.nodes'):
+                break
+    raise ValueError(f'Number of nodes not found in {bdd_filepath}.')
+
+
 def count_configurations(bdd_filepath: str) -> int:
     command = ['../bdds/bin/counter', bdd_filepath]
     process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
     stdout, stderr = process.communicate()
-    return int(stdout.strip())
+    return str2int(stdout.strip())  # Exact count (arbitrary precision)
+
+
+def family_name(filepath: str) -> str:
+    """Return the name of the family of a model (its name without the version or timestamp)."""
+    name = pathlib.Path(filepath).stem
+    match = VERSION_REGEX.match(name)
+    return match.group('family') if match is not None else name
+
+
+def version_key(filepath: str) -> list[Any]:
+    """Natural sort key of the versions of a model (e.g., 2.6.9 before 2.6.10)."""
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', pathlib.Path(filepath).stem)]
@@ -0,0 +1,201 @@
+from typing import Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from flamapy.metamodels.fm_metamodel.models import FeatureModel
+
+
+FORCE_MAX_ITERATIONS = 50
+SPAN_MAX_PASSES = 5
+
+
+def dfs_order(feature_model: 'FeatureModel', mapping_names: Optional[dict[str, str]] = None) -> list[str]:
+    """Return the pre-order (depth-first search) of the feature tree.
+
+    If the mapping of the feature names to the variables names is given, the variable names are
+    returned instead of the feature names.
+    """
+    if feature_model is None or feature_model.root is None:
+        return []
+    order = []
+    features = [feature_model.root]
+    while features:
+        feature = features.pop()
+        order.append(feature.name if mapping_names is None else mapping_names.get(feature.name, feature.name))
+        features.extend(reversed(feature.get_children()))
+    return order
+
+
+def appearance_order(variables: list[str], expressions_vars: list[list[str]]) -> list[str]:
+    """Return the variables in order of first appearance in the expressions.
+
+    The relations of the feature tree are the first expressions, so this is a traversal of the
+    feature tree when the feature model is not available.
+    """
+    order = {}
+    for vars in expressions_vars:
+        for var in vars:
+            order[var] = None
+    for var in variables:
+        order[var] = None
+    return list(order)
+
+
+def complete_order(order: list[str], variables: list[str]) -> list[str]:
+    """Return the order restricted to the given variables, adding at the end the missing ones."""
+    variables_set = set(variables)
+    result = [var for var in dict.fromkeys(order) if var in variables_set]
+    included = set(result)
+    result.extend(var for var in variables if var not in included)
+    return result
+
+
+def project_order(order: list[str], variables: list[str], expressions_vars: list[list[str]]) -> list[str]:
+    """Project the order of a previous version of the model onto the variables of a new version.
+
+    The removed variables are dropped, and each new variable is inserted right after the mean
+    position of the variables it shares expressions with (e.g., its parent and siblings). The new
+    variables without placed neighbours (e.g., a new subtree) are placed in later passes, and the
+    remaining ones at the end.
+    """
+    variables_set = set(variables)
+    position: dict[str, float] = {var: i for i, var in enumerate(dict.fromkeys(v for v in order if v in variables_set))}
+    neighbours: dict[str, set[str]] = {var: set() for var in variables if var not in position}
+    for vars in expressions_vars:
+        for var in vars:
+            if var in neighbours:
+                neighbours[var].update(v for v in vars if v != var)
+    pending = list(neighbours)
+    offset = 0.5
+    while pending:
+        remaining = []
+        for var in pending:
+            placed = [position[v] for v in neighbours[var] if v in position]
+            if placed:
+                position[var] = sum(placed) / len(placed) + offset
+            else:
+                remaining.append(var)
+        if len(remaining) == len(pending):
+            for i, var in enumerate(remaining):
+                position[var] = len(variables) + i
+            break
+        pending = remaining
+        offset /= 2  # The variables placed in later passes go closer to their neighbours
+    return sorted(position, key=lambda var: position[var])
+
+
+def union_order(orders: list[list[str]]) -> list[str]:
+    """Merge the orders of several versions of a model into an order of all their variables.
+
+    The first order is kept, and each variable of the next orders not included yet is inserted
+    right after its predecessor in its own order (or at the beginning), so that the relative
+    order of the variables of each version is preserved as much as possible.
+    """
+    result: list[str] = []
+    included: set[str] = set()
+    for order in orders:
+        if not result:
+            result = list(dict.fromkeys(order))
+            included = set(result)
+            continue
+        new_vars = [var for var in order if var not in included]
+        if not new_vars:
+            continue
+        # New variables grouped by their predecessor in the merged order (None: at the beginning)
+        insertions: dict[Optional[str], list[str]] = {}
+        predecessor = None
+        for var in order:
+            if var in included:
+                predecessor = var
+            else:
+                insertions.setdefault(predecessor, []).append(var)
+                included.add(var)
+        merged = insertions.get(None, [])
+        for var in result:
+            merged.append(var)
+            merged.extend(insertions.get(var, []))
+        result = merged
+    return result
+
+
+def total_span(order: list[str], expressions_vars: list[list[str]]) -> int:
+    """Sum of the spans (distance between the first and last variable) of the expressions."""
+    position = {var: i for i, var in enumerate(order)}
+    span = 0
+    for vars in expressions_vars:
+        if len(vars) > 1:
+            positions = [position[var] for var in vars]
+            span += max(positions) - min(positions)
+    return span
+
+
+def force_order(variables: list[str], expressions_vars: list[list[str]],
+                initial_order: Optional[list[str]] = None,
+                max_iterations: int = FORCE_MAX_ITERATIONS) -> list[str]:
+    """FORCE heuristic: move each variable to the mean center of gravity of its expressions.
+
+    It iterates while the total span of the expressions decreases.
+    """
+    order = complete_order(initial_order if initial_order is not None else variables, variables)
+    edges = [vars for vars in expressions_vars if len(vars) > 1]
+    var_edges: dict[str, list[int]] = {var: [] for var in order}
+    for i, vars in enumerate(edges):
+        for var in vars:
+            var_edges[var].append(i)
+    best_order = order
+    best_span = total_span(order, edges)
+    for _ in range(max_iterations):
+        position = {var: i for i, var in enumerate(order)}
+        cogs = [sum(position[var] for var in vars) / len(vars) for vars in edges]
+        new_position = {var: (sum(cogs[e] for e in var_edges[var]) / len(var_edges[var])
+                              if var_edges[var] else position[var])
+                        for var in order}
+        order = sorted(order, key=lambda var: (new_position[var], position[var]))
+        span = total_span(order, edges)
+        if span >= best_span:
+            break
+        best_order, best_span = order, span
+    return best_order
+
+
+def span_order(variables: list[str], expressions_vars: list[list[str]],
+               initial_order: Optional[list[str]] = None,
+               max_passes: int = SPAN_MAX_PASSES) -> list[str]:
+    """Constraint-span minimization by local search of adjacent transpositions.
+
+    Starting from the FORCE order (or the given order), it swaps adjacent variables while the
+    total span of the expressions decreases.
+    """
+    if initial_order is None:
+        initial_order = force_order(variables, expressions_vars)
+    order = complete_order(initial_order, variables)
+    edges = [vars for vars in expressions_vars if len(vars) > 1]
+    var_edges: dict[str, list[int]] = {var: [] for var in order}
+    for i, vars in enumerate(edges):
+        for var in vars:
+            var_edges[var].append(i)
+    position = {var: i for i, var in enumerate(order)}
+
+    def edges_span(edges_ids: set[int]) -> int:
+        span = 0
+        for e in edges_ids:
+            positions = [position[var] for var in edges[e]]
+            span += max(positions) - min(positions)
+        return span
+
+    for _ in range(max_passes):
+        improved = False
+        for i in range(len(order) - 1):
+            a, b = order[i], order[i + 1]
+            affected = set(var_edges[a]) | set(var_edges[b])
+            if not affected:
+                continue
+            before = edges_span(affected)
+            position[a], position[b] = i + 1, i
+            if edges_span(affected) < before:
+                order[i], order[i + 1] = b, a
+                improved = True
+            else:
+                position[a], position[b] = i, i + 1
+        if not improved:
+            break
+    return order
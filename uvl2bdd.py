@@ -1,32 +1,32 @@
+import io
 import os
+import sys
+import json
 import argparse
 import pathlib
 import logging
+import socketserver
 from enum import Enum
-from typing import Any
+from typing import Any, Optional, TextIO, Iterable
 
-import codetiming
-
-from flamapy.core.exceptions import FlamaException
-from flamapy.metamodels.fm_metamodel.transformations import UVLReader
-from flamapy.metamodels.fm_metamodel.operations import FMLanguageLevel, MajorLevel
-
-import fm2logic
 import logic2bdd
-from utils.csv_logger import CSVLogger
-from utils import utils
+import decompose
+import difficulty
+import dd_backend
+from difficulty import DifficultyEstimator
+from utils.csv_writer import CSVWriter
+from utils import utils, var_order, conjunction_schedule, tracing, fm_scan, exact_counts, logic_reader
+
+# The heavy modules (flamapy and its UVL parser, dd, codetiming, fm2logic) are imported in the 
+# stages that need them, so that the startup of short-lived invocations is fast.
 
 
-logging.basicConfig(filename='uvl2bdd.log', 
-                    encoding='utf-8', 
-                    level=logging.DEBUG,
-                    format='%(asctime)s %(levelname)-8s %(message)s',
-                    datefmt='%Y-%m-%d %H:%M:%S')
 LOGGER = logging.getLogger(__name__)    
 
 TIMEOUT = 3600  # in seconds, 1 hour
-TIMEOUT_STR = f'Timeout ({TIMEOUT}s)'
+TIMEOUT_STR = 'Timeout ({}s)'
 ERROR_STR = 'Error'
+DEFERRED_STR = 'Deferred'
 CSV_FILE_RESULTS = 'results.csv'
 PRECISION = 4
 
@@ -45,130 +45,392 @@ class CSVHeader(Enum):
     INFO = 'Info'
 
 
-def main(fm_filepath: str) -> dict[str, Any]:
+def main(fm_filepath: str, 
+         estimator: Optional[DifficultyEstimator] = None,
+         order_method: str = logic2bdd.FASTORDER_METHOD,
+         decomposition: bool = False,
+         simplify: bool = False,
+         backend: str = dd_backend.LOGIC2BDD_BACKEND,
+         schedule: Optional[str] = None,
+         analysis: bool = False,
+         resume: bool = False) -> dict[str, Any]:
+    """Transform the feature model to logic and build its BDD.
+
+    The schedule of the conjunctions defaults to the file order for Logic2BDD and to the bucket
+    schedule for the dd backend.
+    With analysis, the core features, dead features and atomic sets of the model are computed
+    from the BDD and written in a .analysis.json file next to it.
+    With resume, the construction of the dd backend is checkpointed and resumed from the
+    checkpoint of a previous run (e.g., after a timeout).
+    """
     path = pathlib.Path(fm_filepath)
     filename = path.stem
 
     csv_entry = {}
     csv_entry[CSVHeader.MODEL.value] = path
 
+    import codetiming
     timer = codetiming.Timer(logger=None)  # A timer to get execution time
 
     # Read the feature model
+    from flamapy.core.exceptions import FlamaException
     try:
-        LOGGER.debug(f'Reading feature model {path}')
-        fm = UVLReader(fm_filepath).transform()
+        LOGGER.debug('Reading feature model %s', path)
+        with tracing.span(tracing.UVL_PARSING):
+            from utils import fm_cache
+            fm = fm_cache.read_feature_model(fm_filepath)
     except FlamaException as e:
-        LOGGER.error(f'Error reading feature model {path}: {e}')
+        LOGGER.error('Error reading feature model %s: %s', path, e)
         return csv_entry
     csv_entry[CSVHeader.FEATURES.value] = len(fm.get_features())
     csv_entry[CSVHeader.CONSTRAINTS.value] = len(fm.get_constraints())
 
     # Check if the FM is a Boolean FM
-    language_level = FMLanguageLevel().execute(fm).get_result()
+    with tracing.span(tracing.LANGUAGE_LEVEL):
+        from flamapy.metamodels.fm_metamodel.operations import FMLanguageLevel, MajorLevel
+        language_level = FMLanguageLevel().execute(fm).get_result()
     if language_level.major != MajorLevel.BOOLEAN:
-        LOGGER.warning(f'Skipped non-Boolean FM {path} (level: {language_level}).')
+        LOGGER.warning('Skipped non-Boolean FM %s (level: %s).', path, language_level)
         csv_entry[CSVHeader.INFO.value] = f'Skipped non-Boolean FM (level: {language_level}).'
         return csv_entry
 
-    # Convert the FM to logic
+    # Convert the FM to logic. The dd backend builds the BDD from the logic FM in-process, and the
+    # .exp file is only written for the stages that read it (fastOrder, difficulty, decomposition)
+    in_process = backend == dd_backend.DD_BACKEND
+    expressions = None
     try:
-        LOGGER.debug(f'Converting FM to logic...')
+        LOGGER.debug('Converting FM to logic...')
         timer.start()
-        var_filepath, exp_filepath, securevars_filepath = fm2logic.fm2logic(fm_filepath, fm)
+        import fm2logic
+        if in_process:
+            logic_fm, var_filepath, securevars_filepath = fm2logic.fm2logic_model(fm_filepath, fm, simplify)
+            with tracing.span(tracing.EXPRESSION_WRITING):
+                from utils.pl_writer import to_exp
+                expressions = to_exp(logic_fm)
+                exp_filepath = None
+                if decomposition or estimator is not None or order_method not in logic2bdd.ORDER_HEURISTICS:
+                    exp_filepath = str(pathlib.Path(var_filepath).with_suffix('.exp'))
+                    logic_reader.write_expressions(expressions, exp_filepath)
+        else:
+            var_filepath, exp_filepath, securevars_filepath = fm2logic.fm2logic(fm_filepath, fm, simplify)
         elapsed_time = timer.stop()
     except Exception as e:
-        LOGGER.error(f'Error converting FM to logic {path}: {e}')
+        LOGGER.error('Error converting FM to logic %s: %s', path, e)
         csv_entry[CSVHeader.UVL2LOGIC_TIME.value] = ERROR_STR
         return csv_entry
-    LOGGER.debug(f'Generated logic files: {var_filepath}, {exp_filepath}, {securevars_filepath}')
+    LOGGER.debug('Generated logic files: %s, %s, %s', var_filepath, exp_filepath, securevars_filepath)
     # Get number of variables and clauses
     with open(var_filepath, 'r') as file:
         num_variables = len(file.read().split())
-    with open(exp_filepath, 'rb') as file:
-        num_lines = sum(1 for _ in file)
+    if expressions is not None:
+        num_lines = len(expressions)
+    else:
+        with open(exp_filepath, 'rb') as file:
+            num_lines = sum(1 for _ in file)
     csv_entry[CSVHeader.VARIABLES.value] = num_variables
     csv_entry[CSVHeader.CLAUSES.value] = num_lines
     csv_entry[CSVHeader.UVL2LOGIC_TIME.value] = utils.float2exp(elapsed_time, PRECISION)
 
+    # Estimate the difficulty of the model to set the timeout and the settings
+    timeout = TIMEOUT
+    fastorder_options = logic2bdd.FASTORDER_OPTIONS
+    min_nodes = logic2bdd.MIN_NODES
+    if estimator is not None:
+        estimate = estimator.predict(difficulty.get_model_metrics(var_filepath, exp_filepath))
+        LOGGER.debug('Estimated difficulty: %s', estimate)
+        if estimate.deferred:
+            LOGGER.warning('Deferred FM %s likely infeasible (estimated difficulty: %s).', path, estimate)
+            csv_entry[CSVHeader.INFO.value] = f'{DEFERRED_STR} (predicted time: {round(estimate.build_time)}s).'
+            return csv_entry
+        timeout = estimate.timeout
+        if estimate.large:
+            fastorder_options = logic2bdd.FASTORDER_OPTIONS_LARGE
+            min_nodes = max(logic2bdd.MIN_NODES, int(estimate.bdd_nodes))
+
+    if decomposition:
+        return main_decomposition(csv_entry, var_filepath, exp_filepath, timeout, order_method)
+
     # Get initial order of variables
+    order = None
     try:
-        LOGGER.debug(f'Getting initial order...')
+        LOGGER.debug('Getting initial order...')
         timer.start()
-        sifting_filepath = logic2bdd.get_initial_order(var_filepath, exp_filepath, TIMEOUT)
+        with tracing.span(tracing.ORDERING, method=order_method):
+            if exp_filepath is None:  # In-process heuristic over the logic FM
+                mapping_names = fm2logic.read_mapping_variables_file(securevars_filepath) if securevars_filepath else None
+                expressions_vars = [logic_reader.get_expression_variables(exp) for exp in expressions]
+                order = logic2bdd.heuristic_order([f.name for f in logic_fm.get_features()], expressions_vars, order_method,
+                                                  var_order.dfs_order(fm, mapping_names))
+                sifting_filepath = None
+            elif order_method == logic2bdd.FASTORDER_METHOD:
+                sifting_filepath = logic2bdd.get_initial_order(var_filepath, exp_filepath, timeout, fastorder_options)
+            elif order_method == logic2bdd.REUSE_METHOD:
+                sifting_filepath = logic2bdd.get_reused_order(var_filepath, exp_filepath)
+                if sifting_filepath is None:
+                    LOGGER.debug('No previous version to reuse its order. Using fastOrder.')
+                    sifting_filepath = logic2bdd.get_initial_order(var_filepath, exp_filepath, timeout, fastorder_options)
+            else:
+                mapping_names = fm2logic.read_mapping_variables_file(securevars_filepath) if securevars_filepath else None
+                tree_order = var_order.dfs_order(fm, mapping_names)
+                sifting_filepath = logic2bdd.get_heuristic_order(var_filepath, exp_filepath, order_method, tree_order)
         elapsed_time = timer.stop()
     except Exception as e:
-        LOGGER.error(f'Error getting initial order for files {var_filepath}, {exp_filepath}: {e}')
+        LOGGER.error('Error getting initial order for files %s, %s: %s', var_filepath, exp_filepath, e)
         csv_entry[CSVHeader.FASTORDER_TIME.value] = ERROR_STR
         return csv_entry
-    if sifting_filepath is None:
-        LOGGER.warning(f'Timeout getting initial order for files {var_filepath}, {exp_filepath}')
-        csv_entry[CSVHeader.FASTORDER_TIME.value] = TIMEOUT_STR
+    if order is None and sifting_filepath is None:
+        LOGGER.warning('Timeout getting initial order for files %s, %s', var_filepath, exp_filepath)
+        csv_entry[CSVHeader.FASTORDER_TIME.value] = TIMEOUT_STR.format(timeout)
         return csv_entry
-    LOGGER.debug(f'Generated order file: {sifting_filepath}')
+    LOGGER.debug('Generated order: %s', sifting_filepath or 'in-process')
     csv_entry[CSVHeader.FASTORDER_TIME.value] = utils.float2exp(elapsed_time, PRECISION)
 
     # Build the BDD
+    if schedule is None:
+        schedule = conjunction_schedule.BUCKET_SCHEDULE if backend == dd_backend.DD_BACKEND else conjunction_schedule.FILE_SCHEDULE
     try:
-        LOGGER.debug(f'Building BDD...')
+        LOGGER.debug('Building BDD...')
         timer.start()
-        bdd_filepath = logic2bdd.build_bdd(var_filepath, exp_filepath, sifting_filepath, TIMEOUT)
+        with tracing.span(tracing.BDD_BUILDING, backend=backend, schedule=schedule):
+            if in_process:
+                if order is None:
+                    order = logic_reader.read_variables(sifting_filepath)
+                var_path = pathlib.Path(var_filepath)
+                bdd_filepath = str(var_path.parent.parent / f'bdd/{var_path.stem}.dddmp')
+                result = dd_backend.build_bdd_from_fm(logic_fm, bdd_filepath, order, timeout, schedule,
+                                                      checkpoint=resume, resume=resume)
+                if result is None:
+                    bdd_filepath = None
+            else:
+                bdd_filepath = logic2bdd.build_bdd(var_filepath, exp_filepath, sifting_filepath, timeout, min_nodes, schedule)
         elapsed_time = timer.stop()
     except Exception as e:
-        LOGGER.error(f'Error building the BDD for files {var_filepath}, {exp_filepath}, {sifting_filepath}: {e}')
+        LOGGER.error('Error building the BDD for files %s, %s, %s: %s', var_filepath, exp_filepath, sifting_filepath, e)
         csv_entry[CSVHeader.LOGIC2BDD_TIME.value] = ERROR_STR
         return csv_entry
     if bdd_filepath is None:
-        LOGGER.warning(f'Timeout building the BDD for files {var_filepath}, {exp_filepath}')
-        csv_entry[CSVHeader.LOGIC2BDD_TIME.value] = TIMEOUT_STR
+        LOGGER.warning('Timeout building the BDD for files %s, %s', var_filepath, exp_filepath)
+        csv_entry[CSVHeader.LOGIC2BDD_TIME.value] = TIMEOUT_STR.format(timeout)
         return csv_entry
-    LOGGER.debug(f'Generated BDD file: {bdd_filepath}')
+    LOGGER.debug('Generated BDD file: %s', bdd_filepath)
     csv_entry[CSVHeader.LOGIC2BDD_TIME.value] = utils.float2exp(elapsed_time, PRECISION)
     # Analyze the BDD
-    with open(bdd_filepath, 'r') as file:
-        nnodes_line = [line for line in file.readlines() if line.startswith('.nnodes')][0]
-        num_nodes = int(nnodes_line.split()[1].strip())
+    with tracing.span(tracing.DDDMP_PARSING):
+        num_nodes = utils.read_bdd_nodes(bdd_filepath)
     csv_entry[CSVHeader.BDD_NODES.value] = num_nodes
-    nof_configs = utils.count_configurations(bdd_filepath)
+    with tracing.span(tracing.COUNTING):
+        if in_process:
+            builder, root = result
+            nof_configs = builder.count(root)
+        else:
+            nof_configs = utils.count_configurations(bdd_filepath)
+        exact_counts.write_count(exact_counts.count_filepath(bdd_filepath), nof_configs)
     csv_entry[CSVHeader.CONFIGURATIONS.value] = utils.int2sci(nof_configs) if nof_configs > 1e6 else nof_configs
+    if analysis:
+        try:
+            with tracing.span(tracing.ANALYSIS):
+                from utils import bdd_analysis
+                simplification_filepath = str(pathlib.Path(var_filepath).with_suffix('.simplification')) if simplify else None
+                analysis_filepath = bdd_analysis.analyze_file(bdd_filepath, securevars_filepath, simplification_filepath)
+            LOGGER.debug('Generated analysis file: %s', analysis_filepath)
+        except Exception as e:
+            LOGGER.error('Error analyzing the BDD %s: %s', bdd_filepath, e)
 
     csv_entry[CSVHeader.INFO.value] = 'OK'
     return csv_entry
 
 
-def main_dir(dirpath: str) -> None:
-    csv_logger = CSVLogger(CSV_FILE_RESULTS, [h.value for h in CSVHeader])
+def main_decomposition(csv_entry: dict[str, Any], 
+                       var_filepath: str, 
+                       exp_filepath: str, 
+                       timeout: int, 
+                       order_method: str) -> dict[str, Any]:
+    """Build the BDDs of the independent components of the model (instead of a single BDD).
+
+    The ordering and building time of all components is reported as the Logic2BDD time.
+    """
+    import codetiming
+    timer = codetiming.Timer(logger=None)
+    try:
+        LOGGER.debug('Building BDDs of the independent components...')
+        timer.start()
+        with tracing.span(tracing.DECOMPOSITION, method=order_method):
+            product = decompose.build_product(var_filepath, exp_filepath, timeout, order_method)
+        elapsed_time = timer.stop()
+    except Exception as e:
+        LOGGER.error('Error building the BDDs of the components for files %s, %s: %s', var_filepath, exp_filepath, e)
+        csv_entry[CSVHeader.LOGIC2BDD_TIME.value] = ERROR_STR
+        return csv_entry
+    if product is None:
+        LOGGER.warning('Timeout building the BDDs of the components for files %s, %s', var_filepath, exp_filepath)
+        csv_entry[CSVHeader.LOGIC2BDD_TIME.value] = TIMEOUT_STR.format(timeout)
+        return csv_entry
+    csv_entry[CSVHeader.LOGIC2BDD_TIME.value] = utils.float2exp(elapsed_time, PRECISION)
+    csv_entry[CSVHeader.BDD_NODES.value] = product.nodes()
+    nof_configs = product.configurations()
+    path = pathlib.Path(var_filepath)
+    exact_counts.write_count(str(path.parent.parent / f'bdd/{path.stem}{exact_counts.COUNT_EXTENSION}'), nof_configs)
+    csv_entry[CSVHeader.CONFIGURATIONS.value] = utils.int2sci(nof_configs) if nof_configs > 1e6 else nof_configs
+    csv_entry[CSVHeader.INFO.value] = f'OK ({len(product.components)} components)'
+    return csv_entry
+
+
+def non_boolean_entry(path: pathlib.Path, entry: dict[str, Any]) -> dict[str, Any]:
+    """CSV entry of a model skipped by the pre-classification of the language level (see fm_scan)."""
+    return {CSVHeader.MODEL.value: path,
+            CSVHeader.FEATURES.value: entry['features'],
+            CSVHeader.CONSTRAINTS.value: entry['constraints'],
+            CSVHeader.INFO.value: f'Skipped non-Boolean FM (level: {fm_scan.level_str(entry)}).'}
+
+
+def main_dir(dirpath: str, 
+             estimator: Optional[DifficultyEstimator] = None,
+             order_method: str = logic2bdd.FASTORDER_METHOD,
+             decomposition: bool = False,
+             simplify: bool = False,
+             backend: str = dd_backend.LOGIC2BDD_BACKEND,
+             schedule: Optional[str] = None,
+             analysis: bool = False,
+             resume: bool = False) -> None:
+    csv_writer = CSVWriter(CSV_FILE_RESULTS, [h.value for h in CSVHeader])
     with open(CSV_FILE_RESULTS, 'r') as results_file:
         lines = results_file.readlines()
     processed_models = 0
     skipped_models = 0
+    deferred_models = 0
+    non_boolean_models = 0
     models_filepaths = utils.get_filepaths(dirpath, ['uvl'])
+    if order_method == logic2bdd.REUSE_METHOD:
+        models_filepaths.sort(key=utils.version_key)  # The previous versions are built first
     n_models = len(models_filepaths)
-    LOGGER.info(f'#Models to be processed: {n_models}')
+    LOGGER.info('#Models to be processed: %s', n_models)
+    # Pre-classification of the language level to skip the non-Boolean FMs without parsing them
+    manifest = fm_scan.update_manifest(models_filepaths, fm_scan.MANIFEST_FILE)
     for i, uvl_filepath in enumerate(models_filepaths, 1):
         path = pathlib.Path(uvl_filepath)
         filename = path.stem
         # if any(filename in line and (not 'Timeout' in line or ',,' not in line) for line in lines):  # repite timeouts.
-        if any(filename in line for line in lines):  # omite timeouts.
-            LOGGER.info(f'Skipped model {uvl_filepath} ({i}/{n_models}, {round(i/n_models*100,2)}%).')  
+        if any(filename in line and not (resume and 'Timeout' in line) for line in lines):  # omite timeouts (unless resumed).
+            LOGGER.info('Skipped model %s (%s/%s, %.2f%%).', uvl_filepath, i, n_models, i / n_models * 100)  
             skipped_models += 1  
+        elif not fm_scan.is_boolean(manifest.get(uvl_filepath)):
+            LOGGER.warning('Skipped non-Boolean FM %s (level: %s).', path, fm_scan.level_str(manifest[uvl_filepath]))
+            csv_writer.write_row(non_boolean_entry(path, manifest[uvl_filepath]))
+            non_boolean_models += 1
         else:
-            LOGGER.debug(f'Processing model {uvl_filepath} ({i}/{n_models}, {round(i/n_models*100,2)}%).')
+            LOGGER.debug('Processing model %s (%s/%s, %.2f%%).', uvl_filepath, i, n_models, i / n_models * 100)
+            with tracing.span(tracing.MODEL, model=uvl_filepath):
+                csv_entry = main(uvl_filepath, estimator, order_method, decomposition, simplify, backend, schedule, analysis, resume)
+            tracing.flush()
+            if str(csv_entry.get(CSVHeader.INFO.value, '')).startswith(DEFERRED_STR):
+                deferred_models += 1  # Not logged so that they are processed in later runs
+                continue
             processed_models += 1
-            csv_entry = main(uvl_filepath)
-            csv_logger.log(csv_entry)
-    csv_logger.close()
-    LOGGER.info(f'#Models processed: {processed_models}.')
-    LOGGER.info(f'#Models skipped: {skipped_models}.')
+            csv_writer.write_row(csv_entry)
+    LOGGER.info('#Models processed: %s.', processed_models)
+    LOGGER.info('#Models skipped: %s.', skipped_models)
+    LOGGER.info('#Models deferred: %s.', deferred_models)
+    LOGGER.info('#Models non-Boolean: %s.', non_boolean_models)
+
+
+def warm_up(backend: str = dd_backend.LOGIC2BDD_BACKEND) -> None:
+    """Import the heavy modules of the pipeline before the first model (worker mode)."""
+    import codetiming
+    import fm2logic
+    from utils import fm_cache
+    from flamapy.metamodels.fm_metamodel.operations import FMLanguageLevel
+    if backend == dd_backend.DD_BACKEND:
+        from dd import cudd
+
+
+def serve(requests: Iterable[str], output: TextIO, options: dict[str, Any]) -> None:
+    """Worker mode: process the models whose paths are read from the requests (one per line).
+
+    The result of each model is written in the output as a JSON line (the CSV entry), and
+    appended to the results file (except for deferred models). The options are the arguments
+    of main.
+    """
+    csv_writer = CSVWriter(CSV_FILE_RESULTS, [h.value for h in CSVHeader])
+    for request in requests:
+        fm_filepath = request.strip()
+        if not fm_filepath:
+            continue
+        try:
+            with tracing.span(tracing.MODEL, model=fm_filepath):
+                csv_entry = main(fm_filepath, **options)
+        except Exception as e:
+            LOGGER.error('Error processing model %s: %s', fm_filepath, e)
+            csv_entry = {CSVHeader.MODEL.value: fm_filepath, CSVHeader.INFO.value: f'{ERROR_STR}: {e}'}
+        tracing.flush()
+        if not str(csv_entry.get(CSVHeader.INFO.value, '')).startswith(DEFERRED_STR):
+            csv_writer.write_row(csv_entry)
+        output.write(json.dumps(csv_entry, default=str) + '\n')
+        output.flush()
+
+
+class WorkerRequestHandler(socketserver.StreamRequestHandler):
+    """Worker mode over a Unix socket: each connection sends model paths (one per line) and
+    receives a JSON line per model."""
+
+    def handle(self) -> None:
+        output = io.TextIOWrapper(self.wfile, encoding='utf8', write_through=True)
+        serve((line.decode('utf8') for line in self.rfile), output, self.server.options)
+
+
+def serve_socket(socket_path: str, options: dict[str, Any]) -> None:
+    """Worker mode: serve the requests of a Unix socket (one connection at a time) forever."""
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    with socketserver.UnixStreamServer(socket_path, WorkerRequestHandler) as server:
+        server.options = options
+        LOGGER.info('Worker listening on %s.', socket_path)
+        server.serve_forever()
 
 
 if __name__ == '__main__':
+    logging.basicConfig(filename='uvl2bdd.log', 
+                        encoding='utf-8', 
+                        level=logging.DEBUG,
+                        format='%(asctime)s %(levelname)-8s %(message)s',
+                        datefmt='%Y-%m-%d %H:%M:%S')
+
     parser = argparse.ArgumentParser(description='UVL2BDD: Create a BDD from a UVL feature model.')
-    parser.add_argument(metavar='path', dest='path', type=str, help='Input feature model (.uvl) or directory with models.')
+    parser.add_argument(metavar='path', dest='path', type=str, nargs='?', help='Input feature model (.uvl) or directory with models.')
+    parser.add_argument('-worker', dest='worker', action='store_true', help='Worker mode: read model paths from stdin (one per line) and write a JSON line per model to stdout, keeping the modules loaded.')
+    parser.add_argument('-socket', metavar='socket', dest='socket', type=str, required=False, help='Worker mode listening on a Unix socket instead of stdin.')
+    parser.add_argument('-estimator', metavar='estimator', dest='estimator', type=str, required=False, help='Difficulty estimator (.json) to set per-model timeouts and settings, and to defer likely infeasible models.')
+    parser.add_argument('-order', metavar='method', dest='order', type=str, required=False, default=logic2bdd.FASTORDER_METHOD, choices=[logic2bdd.FASTORDER_METHOD, logic2bdd.REUSE_METHOD] + logic2bdd.ORDER_HEURISTICS, help='Variable ordering method: the fastOrder tool (default), the order of the nearest previously built version of the model (reuse), or an in-process heuristic.')
+    parser.add_argument('-decompose', dest='decompose', action='store_true', help='Build the BDDs of the independent components of the model in parallel instead of a single BDD.')
+    parser.add_argument('-simplify', dest='simplify', action='store_true', help='Simplify the feature model (core, dead and mandatory features, and redundant constraints) before the transformation to logic.')
+    parser.add_argument('-analyze', dest='analyze', action='store_true', help='Compute the core features, dead features and atomic sets of the model from its BDD (.analysis.json file).')
+    parser.add_argument('-resume', dest='resume', action='store_true', help='Checkpoint the construction of the dd backend and resume it from the checkpoints of previous runs (the timed-out models are processed again).')
+    parser.add_argument('-backend', metavar='backend', dest='backend', type=str, required=False, default=dd_backend.LOGIC2BDD_BACKEND, choices=dd_backend.BACKENDS, help='Construction backend of the BDD: the Logic2BDD tool (default) or in-process with the dd library.')
+    parser.add_argument('-schedule', metavar='schedule', dest='schedule', type=str, required=False, choices=conjunction_schedule.SCHEDULES, help='Order to conjoin the expressions (default: file for Logic2BDD, bucket for dd).')
+    parser.add_argument('-trace', metavar='tracefile', dest='trace', type=str, required=False, help='Trace file with the time spent in each stage of each model.')
+    parser.add_argument('-trace-format', metavar='format', dest='trace_format', type=str, required=False, default=tracing.JSONL_FORMAT, choices=tracing.FORMATS, help='Format of the trace file: JSON lines (default) or Chrome trace events (chrome://tracing, Perfetto).')
+    parser.add_argument('-profile', metavar='stage', dest='profile', type=str, nargs='+', required=False, choices=tracing.STAGES, help=f'Stages to profile. A profile per model and stage is written in the {tracing.PROFILES_DIR} folder.')
+    parser.add_argument('-profiler', metavar='profiler', dest='profiler', type=str, required=False, default=tracing.CPROFILE, choices=tracing.PROFILERS, help='Profiler of the stages: cProfile (default, .prof files) or pyinstrument (.html files).')
     args = parser.parse_args()
 
-    if os.path.isdir(args.path):
-        main_dir(args.path)
+    if args.trace or args.profile:
+        tracing.configure(args.trace, args.trace_format, args.profile, args.profiler)
+    estimator = DifficultyEstimator.load(args.estimator) if args.estimator else None
+    if args.resume:
+        dd_backend.install_stop_handler()
+    if args.worker or args.socket:
+        options = {'estimator': estimator, 'order_method': args.order, 'decomposition': args.decompose, 
+                   'simplify': args.simplify, 'backend': args.backend, 'schedule': args.schedule, 'analysis': args.analyze, 'resume': args.resume}
+        warm_up(args.backend)
+        if args.socket:
+            serve_socket(args.socket, options)
+        else:
+            serve(sys.stdin, sys.stdout, options)
+    elif args.path is None:
+        parser.error('A path or the worker mode is required.')
+    elif os.path.isdir(args.path):
+        main_dir(args.path, estimator, args.order, args.decompose, args.simplify, args.backend, args.schedule, args.analyze, args.resume)
     else:
-        csv_entry = main(args.path)
+        with tracing.span(tracing.MODEL, model=args.path):
+            csv_entry = main(args.path, estimator, args.order, args.decompose, args.simplify, args.backend, args.schedule, args.analyze, args.resume)
+        tracing.flush()
         
@@ -2,15 +2,14 @@ import os
 import argparse
 import pathlib
 import logging
+from typing import TYPE_CHECKING
 
-from flamapy.core.exceptions import FlamaException
-from flamapy.metamodels.fm_metamodel.models import FeatureModel
-from flamapy.metamodels.fm_metamodel.transformations import UVLReader
-
-from utils.fm_secure_features_names import FMSecureFeaturesNames
-from utils.pl_writer import PLWriter
 from utils.utils import get_filepaths
 
+# flamapy (and its UVL parser) is imported in the functions that need it for a fast startup
+if TYPE_CHECKING:
+    from flamapy.metamodels.fm_metamodel.models import FeatureModel
+
 
 def create_mapping_variables_file(mapping_names: dict[str, str], filepath: str) -> None:
     with open(filepath, 'w', encoding='utf8') as f:
@@ -23,11 +22,13 @@ def create_variables_file(variables: list[str], filepath: str) -> None:
         f.write(' '.join(var for var in variables))
 
 
-def create_expressions_file(fm: FeatureModel, filepath: str) -> None:
+def create_expressions_file(fm: 'FeatureModel', filepath: str) -> None:
+    from utils.pl_writer import PLWriter
     PLWriter(filepath, fm).transform()
 
 
 def transform_models(dirpath: str) -> None:
+    from flamapy.core.exceptions import FlamaException
     total_models = 0
     models_with_errors = 0
     for i, fm_filepath in enumerate(get_filepaths(dirpath, ['uvl']), 1):
@@ -48,7 +49,9 @@ def transform_model(fm_filepath: str) -> None:
     filename = path.stem
     dir = path.parent
 
-    fm = UVLReader(fm_filepath).transform()
+    from utils import fm_cache
+    from utils.fm_secure_features_names import FMSecureFeaturesNames
+    fm = fm_cache.read_feature_model(fm_filepath)
 
     fmsfn = FMSecureFeaturesNames(fm)
     secure_fm = fmsfn.transform()
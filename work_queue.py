@@ -0,0 +1,333 @@
+import os
+import csv
+import json
+import time
+import socket
+import sqlite3
+import pathlib
+import logging
+import argparse
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+import uvl2bdd
+import logic2bdd
+import dd_backend
+from difficulty import DifficultyEstimator
+from utils.csv_writer import CSVWriter
+from utils import utils, conjunction_schedule, tracing, fm_scan
+
+
+LOGGER = logging.getLogger(__name__)
+
+QUEUE_FILE = 'queue.db'
+LEASE_TIME = 300  # in seconds without heartbeat before a leased job is given to another worker
+HEARTBEAT_INTERVAL = 60  # in seconds
+POLL_INTERVAL = 10  # in seconds, waiting for jobs when the queue is empty but jobs are still leased
+MAX_ATTEMPTS = 3  # Leases of a job (e.g., its workers died) before it is marked as failed
+BUSY_TIMEOUT = 60  # in seconds, waiting for the lock of the database
+
+# Status of the jobs
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+DEFERRED = 'deferred'  # Deferred by the difficulty estimator: not written in the results
+FAILED = 'failed'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    path TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    collected INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, position);
+CREATE TABLE IF NOT EXISTS options (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+
+class WorkQueue():
+    """Durable queue of models to be processed by workers on any node (SQLite database).
+
+    The workers lease the jobs and renew their leases with heartbeats while processing them. The
+    jobs whose lease expires (e.g., the worker died) are leased again by other workers, up to
+    MAX_ATTEMPTS times. The results (CSV entries of uvl2bdd.main) are stored in the database and
+    collected by the coordinator. The options of uvl2bdd.main are stored in the database so that
+    all workers use the same settings.
+    """
+
+    def __init__(self, filepath: str = QUEUE_FILE, lease_time: int = LEASE_TIME) -> None:
+        self.filepath = filepath
+        self.lease_time = lease_time
+        # Autocommit mode: the transactions are explicit (BEGIN IMMEDIATE to lease jobs)
+        self.connection = sqlite3.connect(filepath, timeout=BUSY_TIMEOUT, isolation_level=None)
+        self.connection.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.connection.close()
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Transaction holding the write lock of the database from its beginning."""
+        self.connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield self.connection
+        except BaseException:
+            self.connection.execute('ROLLBACK')
+            raise
+        self.connection.execute('COMMIT')
+
+    def set_options(self, options: dict[str, Any]) -> None:
+        with self.transaction():
+            self.connection.executemany('INSERT OR REPLACE INTO options (key, value) VALUES (?, ?)',
+                                        [(key, json.dumps(value)) for key, value in options.items()])
+
+    def options(self) -> dict[str, Any]:
+        return {key: json.loads(value) for key, value in self.connection.execute('SELECT key, value FROM options')}
+
+    def enqueue(self, paths: list[str], status: str = PENDING, results: Optional[list[dict[str, Any]]] = None) -> int:
+        """Add the jobs of the models (in order) that are not in the queue. Return the number of
+        jobs added."""
+        results = results or [None] * len(paths)
+        with self.transaction():
+            position = self.connection.execute('SELECT COALESCE(MAX(position), 0) FROM jobs').fetchone()[0]
+            cursor = self.connection.executemany(
+                'INSERT OR IGNORE INTO jobs (path, position, status, result) VALUES (?, ?, ?, ?)',
+                [(path, position + i, status, json.dumps(result, default=str) if result is not None else None)
+                 for i, (path, result) in enumerate(zip(paths, results), 1)])
+        return cursor.rowcount
+
+    def lease(self, worker: str) -> Optional[str]:
+        """Lease the next pending job (or a job whose lease has expired). Return its model, or None
+        if there are no jobs available."""
+        while True:
+            now = time.time()
+            with self.transaction():
+                row = self.connection.execute(
+                    'SELECT path, status, attempts FROM jobs '
+                    'WHERE status = ? OR (status = ? AND lease_expires < ?) ORDER BY position LIMIT 1',
+                    (PENDING, LEASED, now)).fetchone()
+                if row is None:
+                    return None
+                path, status, attempts = row
+                if status == LEASED:
+                    LOGGER.warning('Lease of %s expired (attempt %s).', path, attempts)
+                if attempts < MAX_ATTEMPTS:
+                    self.connection.execute(
+                        'UPDATE jobs SET status = ?, worker = ?, lease_expires = ?, attempts = attempts + 1 WHERE path = ?',
+                        (LEASED, worker, now + self.lease_time, path))
+                    return path
+                result = {uvl2bdd.CSVHeader.MODEL.value: path,
+                          uvl2bdd.CSVHeader.INFO.value: f'{uvl2bdd.ERROR_STR}: worker lost {attempts} times'}
+                self.connection.execute('UPDATE jobs SET status = ?, worker = NULL, result = ? WHERE path = ?',
+                                        (FAILED, json.dumps(result), path))
+
+    def heartbeat(self, path: str, worker: str) -> bool:
+        """Renew the lease of a job. Return False if the worker does not hold the lease anymore."""
+        with self.transaction():
+            cursor = self.connection.execute(
+                'UPDATE jobs SET lease_expires = ? WHERE path = ? AND worker = ? AND status = ?',
+                (time.time() + self.lease_time, path, worker, LEASED))
+        return cursor.rowcount == 1
+
+    def complete(self, path: str, worker: str, result: dict[str, Any]) -> bool:
+        """Store the result of a job. Return False if the worker does not hold the lease anymore
+        (the result is discarded)."""
+        deferred = str(result.get(uvl2bdd.CSVHeader.INFO.value, '')).startswith(uvl2bdd.DEFERRED_STR)
+        with self.transaction():
+            cursor = self.connection.execute(
+                'UPDATE jobs SET status = ?, result = ?, lease_expires = NULL WHERE path = ? AND worker = ? AND status = ?',
+                (DEFERRED if deferred else DONE, json.dumps(result, default=str), path, worker, LEASED))
+        return cursor.rowcount == 1
+
+    def collect(self, results_filepath: str = uvl2bdd.CSV_FILE_RESULTS) -> int:
+        """Append the results of the finished jobs not collected yet to the results file.
+
+        The jobs are marked as collected in the same transaction that reads them, and their results
+        are written after the commit, so that each result is written once (also with several
+        collectors). Return the number of results written.
+        """
+        csv_writer = CSVWriter(results_filepath, [h.value for h in uvl2bdd.CSVHeader])
+        with self.transaction():
+            rows = self.connection.execute('SELECT path, result FROM jobs WHERE status IN (?, ?) AND collected = 0 ORDER BY position',
+                                           (DONE, FAILED)).fetchall()
+            self.connection.executemany('UPDATE jobs SET collected = 1 WHERE path = ?', [(path,) for path, _ in rows])
+        for _, result in rows:
+            csv_writer.write_row(json.loads(result))
+        return len(rows)
+
+    def status(self) -> dict[str, int]:
+        """Number of jobs by status."""
+        return dict(self.connection.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
+
+    def active(self) -> int:
+        """Number of jobs pending or leased."""
+        return self.connection.execute('SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)', (PENDING, LEASED)).fetchone()[0]
+
+
+class Heartbeat(threading.Thread):
+    """Thread that renews the lease of a job while it is being processed (with its own connection)."""
+
+    def __init__(self, queue_filepath: str, path: str, worker: str, interval: int = HEARTBEAT_INTERVAL) -> None:
+        super().__init__(daemon=True)
+        self.queue_filepath = queue_filepath
+        self.path = path
+        self.worker = worker
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        queue = WorkQueue(self.queue_filepath)
+        try:
+            while not self._stop_event.wait(self.interval):
+                if not queue.heartbeat(self.path, self.worker):
+                    LOGGER.warning('Lease of %s lost by worker %s.', self.path, self.worker)
+                    return
+        finally:
+            queue.close()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+def processed_models(results_filepath: str) -> set[str]:
+    """Names of the models of the results file (as main_dir, the models are compared by name,
+    so that they are recognized in other directories or paths of the dataset)."""
+    if not pathlib.Path(results_filepath).exists():
+        return set()
+    with open(results_filepath, 'r', newline='') as file:
+        return {pathlib.Path(row[uvl2bdd.CSVHeader.MODEL.value]).stem for row in csv.DictReader(file)}
+
+
+def enqueue_dir(queue: WorkQueue, dirpath: str, results_filepath: str = uvl2bdd.CSV_FILE_RESULTS) -> int:
+    """Coordinator: enqueue the models of the directory that are not in the results file.
+
+    The non-Boolean models (see fm_scan) are added as finished jobs with their results.
+    Return the number of jobs added.
+    """
+    processed = processed_models(results_filepath)
+    models_filepaths = [f for f in utils.get_filepaths(dirpath, ['uvl']) if pathlib.Path(f).stem not in processed]
+    if queue.options().get('order_method') == logic2bdd.REUSE_METHOD:
+        models_filepaths.sort(key=utils.version_key)  # The previous versions are leased first
+    manifest = fm_scan.update_manifest(models_filepaths, fm_scan.MANIFEST_FILE)
+    boolean = [f for f in models_filepaths if fm_scan.is_boolean(manifest.get(f))]
+    non_boolean = [f for f in models_filepaths if not fm_scan.is_boolean(manifest.get(f))]
+    added = queue.enqueue(boolean)
+    added += queue.enqueue(non_boolean, DONE, [uvl2bdd.non_boolean_entry(pathlib.Path(f), manifest[f]) for f in non_boolean])
+    return added
+
+
+def run_worker(queue_filepath: str = QUEUE_FILE, wait: bool = True) -> int:
+    """Worker: process the jobs of the queue until there are no jobs pending or leased.
+
+    With wait, the worker waits for the jobs leased by other workers (they may be leased again
+    if their workers die). Return the number of jobs processed.
+    """
+    worker = f'{socket.gethostname()}:{os.getpid()}'
+    queue = WorkQueue(queue_filepath)
+    options = queue.options()
+    estimator_filepath = options.pop('estimator', None)
+    options['estimator'] = DifficultyEstimator.load(estimator_filepath) if estimator_filepath else None
+    uvl2bdd.warm_up(options.get('backend', dd_backend.LOGIC2BDD_BACKEND))
+    if options.get('resume'):
+        dd_backend.install_stop_handler()
+    LOGGER.info('Worker %s started.', worker)
+    processed = 0
+    while True:
+        path = queue.lease(worker)
+        if path is None:
+            if not wait or queue.active() == 0:
+                break
+            time.sleep(POLL_INTERVAL)
+            continue
+        LOGGER.debug('Worker %s processing model %s.', worker, path)
+        heartbeat = Heartbeat(queue_filepath, path, worker)
+        heartbeat.start()
+        try:
+            with tracing.span(tracing.MODEL, model=path):
+                csv_entry = uvl2bdd.main(path, **options)
+        except Exception as e:
+            LOGGER.error('Error processing model %s: %s', path, e)
+            csv_entry = {uvl2bdd.CSVHeader.MODEL.value: path, uvl2bdd.CSVHeader.INFO.value: f'{uvl2bdd.ERROR_STR}: {e}'}
+        finally:
+            heartbeat.stop()
+        tracing.flush()
+        if not queue.complete(path, worker, csv_entry):
+            LOGGER.warning('Result of %s discarded: the lease was lost.', path)
+        processed += 1
+    queue.close()
+    LOGGER.info('Worker %s finished (%s models).', worker, processed)
+    return processed
+
+
+def run_workers(queue_filepath: str = QUEUE_FILE, processes: int = 1) -> None:
+    """Run several local worker processes on the queue."""
+    workers = [multiprocessing.Process(target=run_worker, args=(queue_filepath,)) for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def run_collector(queue: WorkQueue, results_filepath: str = uvl2bdd.CSV_FILE_RESULTS, wait: bool = False) -> int:
+    """Coordinator: collect the results in the results file (until the queue is finished with wait).
+
+    Return the number of results written.
+    """
+    collected = queue.collect(results_filepath)
+    while wait and queue.active() > 0:
+        time.sleep(POLL_INTERVAL)
+        collected += queue.collect(results_filepath)
+        LOGGER.info('Queue status: %s.', queue.status())
+    return collected
+
+
+if __name__ == '__main__':
+    logging.basicConfig(filename='work_queue.log',
+                        encoding='utf-8',
+                        level=logging.DEBUG,
+                        format='%(asctime)s %(process)d %(levelname)-8s %(message)s',
+                        datefmt='%Y-%m-%d %H:%M:%S')
+
+    parser = argparse.ArgumentParser(description='Work queue: process the models of a corpus with workers on several nodes sharing a queue (SQLite).')
+    parser.add_argument(metavar='command', dest='command', type=str, choices=['enqueue', 'worker', 'collect', 'status'], help='enqueue: add the models of a directory (coordinator), worker: process the jobs, collect: write the results in the results file (coordinator), status: number of jobs by status.')
+    parser.add_argument(metavar='path', dest='path', type=str, nargs='?', help='Directory with the models (.uvl) to enqueue.')
+    parser.add_argument('-queue', metavar='queuefile', dest='queue', type=str, required=False, default=QUEUE_FILE, help=f'Queue database (default: {QUEUE_FILE}), in a shared storage for several nodes.')
+    parser.add_argument('-processes', metavar='processes', dest='processes', type=int, required=False, default=1, help='Number of local worker processes (default: 1).')
+    parser.add_argument('-wait', dest='wait', action='store_true', help='Collect the results until all the jobs are finished.')
+    parser.add_argument('-estimator', metavar='estimator', dest='estimator', type=str, required=False, help='Difficulty estimator (.json), stored with the queue for all workers.')
+    parser.add_argument('-order', metavar='method', dest='order', type=str, required=False, default=logic2bdd.FASTORDER_METHOD, choices=[logic2bdd.FASTORDER_METHOD, logic2bdd.REUSE_METHOD] + logic2bdd.ORDER_HEURISTICS, help='Variable ordering method (default: fastorder).')
+    parser.add_argument('-decompose', dest='decompose', action='store_true', help='Build the BDDs of the independent components of the models.')
+    parser.add_argument('-simplify', dest='simplify', action='store_true', help='Simplify the feature models before the transformation to logic.')
+    parser.add_argument('-analyze', dest='analyze', action='store_true', help='Compute the core features, dead features and atomic sets of the models.')
+    parser.add_argument('-resume', dest='resume', action='store_true', help='Checkpoint the constructions of the dd backend, so that the models of dead or preempted workers are resumed.')
+    parser.add_argument('-backend', metavar='backend', dest='backend', type=str, required=False, default=dd_backend.LOGIC2BDD_BACKEND, choices=dd_backend.BACKENDS, help='Construction backend of the BDDs (default: logic2bdd).')
+    parser.add_argument('-schedule', metavar='schedule', dest='schedule', type=str, required=False, choices=conjunction_schedule.SCHEDULES, help='Order to conjoin the expressions.')
+    args = parser.parse_args()
+
+    if args.command == 'worker':
+        if args.processes > 1:
+            run_workers(args.queue, args.processes)
+        else:
+            run_worker(args.queue)
+    else:
+        queue = WorkQueue(args.queue)
+        if args.command == 'enqueue':
+            if args.path is None:
+                parser.error('The directory with the models is required.')
+            queue.set_options({'estimator': os.path.abspath(args.estimator) if args.estimator else None,
+                               'order_method': args.order, 'decomposition': args.decompose, 'simplify': args.simplify,
+                               'backend': args.backend, 'schedule': args.schedule, 'analysis': args.analyze,
+                               'resume': args.resume})
+            print(f'{enqueue_dir(queue, args.path)} models enqueued.')
+        elif args.command == 'collect':
+            print(f'{run_collector(queue, uvl2bdd.CSV_FILE_RESULTS, args.wait)} results collected.')
+        print(f'Queue status: {queue.status()}')
+        queue.close()